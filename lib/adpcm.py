@@ -0,0 +1,205 @@
+"""
+ADPCM Module
+
+Decodificador IMA-ADPCM (WAV formato 0x11, mono) em streaming para o mixer.
+
+Cada bloco do arquivo tem um cabeçalho de 4 bytes (preditor int16, índice
+do passo, reservado) seguido de amostras de 4 bits, nibble baixo primeiro.
+Um bloco de 256 bytes guarda 505 amostras: 4x menos leitura do SD que o
+PCM de 16 bits. A voz lê um bloco por vez com readinto para um buffer fixo
+e decodifica em outro, então a memória não depende do tamanho do áudio.
+
+Os arquivos são gerados no PC por tools/adpcm_encoder.py.
+"""
+
+from array import array
+from lib.mixer import read_wav_header, SAMPLE_RATE, UNITY_VOLUME, WavVoice
+from lib.native import VIPER
+
+WAVE_FORMAT_IMA_ADPCM = 0x11
+BLOCK_HEADER_SIZE = 4
+
+STEP_TABLE = array('H', (
+    7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37, 41, 45,
+    50, 55, 60, 66, 73, 80, 88, 97, 107, 118, 130, 143, 157, 173, 190, 209, 230,
+    253, 279, 307, 337, 371, 408, 449, 494, 544, 598, 658, 724, 796, 876, 963,
+    1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066, 2272, 2499, 2749, 3024, 3327,
+    3660, 4026, 4428, 4871, 5358, 5894, 6484, 7132, 7845, 8630, 9493, 10442,
+    11487, 12635, 13899, 15289, 16818, 18500, 20350, 22385, 24623, 27086, 29794,
+    32767))
+
+INDEX_TABLE = (-1, -1, -1, -1, 2, 4, 6, 8, -1, -1, -1, -1, 2, 4, 6, 8)
+
+
+def samples_per_block(block_align):
+    """Amostras em um bloco mono de block_align bytes (a do cabeçalho + 2 por byte)."""
+    return 1 + (block_align - BLOCK_HEADER_SIZE) * 2
+
+
+def decode_nibble(code, predictor, index):
+    """Aplica um código de 4 bits. Retorna (novo preditor, novo índice)."""
+    step = STEP_TABLE[index]
+    diff = step >> 3
+    if code & 4:
+        diff += step
+    if code & 2:
+        diff += step >> 1
+    if code & 1:
+        diff += step >> 2
+    if code & 8:
+        predictor -= diff
+        if predictor < -32768:
+            predictor = -32768
+    else:
+        predictor += diff
+        if predictor > 32767:
+            predictor = 32767
+    index += INDEX_TABLE[code]
+    if index < 0:
+        index = 0
+    elif index > 88:
+        index = 88
+    return predictor, index
+
+
+def _decode_block_py(block, n, out):
+    """Decodifica n bytes de um bloco em out (int16). Retorna o número de amostras (versão para o PC)."""
+    if n < BLOCK_HEADER_SIZE:
+        return 0
+    predictor = block[0] | (block[1] << 8)
+    if predictor & 0x8000:
+        predictor -= 0x10000
+    index = min(block[2], 88)
+    out[0] = predictor
+    j = 1
+    for i in range(BLOCK_HEADER_SIZE, n):
+        byte = block[i]
+        predictor, index = decode_nibble(byte & 0x0F, predictor, index)
+        out[j] = predictor
+        predictor, index = decode_nibble(byte >> 4, predictor, index)
+        out[j + 1] = predictor
+        j += 2
+    return j
+
+
+decode_block = _decode_block_py
+
+if VIPER: # Viper no aparelho, Python no PC (ver lib/native.py)
+    import micropython
+
+    @micropython.viper
+    def _decode_block_viper(block, n: int, out) -> int:
+        if n < 4:
+            return 0
+        src = ptr8(block)
+        dst = ptr16(out)
+        steps = ptr16(STEP_TABLE)
+        predictor = src[0] | (src[1] << 8)
+        if predictor & 0x8000:
+            predictor -= 0x10000
+        index = src[2]
+        if index > 88:
+            index = 88
+        dst[0] = predictor & 0xFFFF
+        j = 1
+        for i in range(4, n):
+            byte = src[i]
+            for shift in range(0, 8, 4):
+                code = (byte >> shift) & 0x0F
+                step = steps[index]
+                diff = step >> 3
+                if code & 4:
+                    diff += step
+                if code & 2:
+                    diff += step >> 1
+                if code & 1:
+                    diff += step >> 2
+                if code & 8:
+                    predictor -= diff
+                    if predictor < -32768:
+                        predictor = -32768
+                else:
+                    predictor += diff
+                    if predictor > 32767:
+                        predictor = 32767
+                magnitude = code & 7
+                if magnitude < 4:
+                    index -= 1
+                    if index < 0:
+                        index = 0
+                else:
+                    index += (magnitude - 3) * 2
+                    if index > 88:
+                        index = 88
+                dst[j] = predictor & 0xFFFF
+                j += 1
+        return j
+
+    decode_block = _decode_block_viper
+
+
+class AdpcmVoice:
+    """Voz do mixer que decodifica um WAV IMA-ADPCM do SD bloco a bloco."""
+
+    in_memory = False
+
+    def __init__(self, path, volume=UNITY_VOLUME, loop=False):
+        self.volume = volume
+        self.loop = loop
+        self._file = open(path, 'rb')
+        try:
+            audio_format, channels, rate, bits, block_align, self._data_start, self._data_size = \
+                read_wav_header(self._file)
+            if audio_format != WAVE_FORMAT_IMA_ADPCM or channels != 1 or bits != 4 \
+                    or rate != SAMPLE_RATE or block_align <= BLOCK_HEADER_SIZE:
+                raise ValueError(f"WAV precisa ser IMA-ADPCM mono {SAMPLE_RATE} Hz")
+        except Exception:
+            self._file.close()
+            raise
+        self._remaining = self._data_size
+        self._block = bytearray(block_align)
+        self._block_mv = memoryview(self._block)
+        self._pcm = array('h', bytes(2 * samples_per_block(block_align)))
+        self._pcm_mv = memoryview(self._pcm)
+        self._avail = 0 # amostras decodificadas no bloco atual
+        self._pos = 0
+
+    def _next_block(self):
+        if self._remaining <= 0:
+            if not (self.loop and self._data_size):
+                return False
+            self._file.seek(self._data_start)
+            self._remaining = self._data_size
+        count = min(len(self._block), self._remaining)
+        got = self._file.readinto(self._block_mv[:count])
+        if not got:
+            self._remaining = 0
+            return False
+        self._remaining -= got
+        self._avail = decode_block(self._block, got, self._pcm)
+        self._pos = 0
+        return self._avail > 0
+
+    def read(self, buf, n):
+        out = memoryview(buf)
+        written = 0
+        while written < n:
+            if self._pos >= self._avail and not self._next_block():
+                break
+            take = min(n - written, self._avail - self._pos)
+            out[written:written + take] = self._pcm_mv[self._pos:self._pos + take]
+            written += take
+            self._pos += take
+        return written
+
+    def close(self):
+        self._file.close()
+
+
+def open_wav(path, volume=UNITY_VOLUME, loop=False):
+    """Abre um WAV PCM ou IMA-ADPCM como voz do mixer, conforme o formato do arquivo."""
+    with open(path, 'rb') as f:
+        audio_format = read_wav_header(f)[0]
+    if audio_format == WAVE_FORMAT_IMA_ADPCM:
+        return AdpcmVoice(path, volume, loop)
+    return WavVoice(path, volume, loop)
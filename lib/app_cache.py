@@ -0,0 +1,85 @@
+"""
+App Cache Module
+
+Mantém instâncias de apps suspensos em memória para que voltar a um app usado
+recentemente não precise re-executar o script nem recarregar seus dados.
+
+Ciclo de vida (opcional para os apps):
+    - Ao sair do run(), o runner chama app.suspend(). Se retornar True, a
+      instância fica no cache (LRU por caminho do app).
+    - No próximo lançamento do mesmo app, o runner chama app.resume() e
+      depois app.run() de novo, sem executar o script.
+    - Apps sem suspend() (ou que retornam False) são descartados como antes.
+
+Sempre que a memória livre cai abaixo da marca d'água configurada, os apps
+suspensos menos usados são descartados (chamando app.close(), se existir).
+"""
+
+import gc
+
+APP_CACHE_CONFIG_FILE = '/sd/config/app_cache.conf'
+DEFAULT_WATERMARK = 60_000 # bytes livres mínimos mantidos no heap
+DEFAULT_MAX_APPS = 3
+
+
+class AppCache:
+    def __init__(self, watermark=None, max_apps=DEFAULT_MAX_APPS):
+        self.watermark = watermark if watermark is not None else self._load_watermark()
+        self.max_apps = max_apps
+        self._apps = [] # [(app_path, instância)], do mais antigo ao mais recente
+
+    def _load_watermark(self):
+        """Lê a marca d'água (em bytes) do arquivo de configuração."""
+        try:
+            with open(APP_CACHE_CONFIG_FILE, 'r') as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return DEFAULT_WATERMARK
+
+    def __contains__(self, app_path):
+        for path, _ in self._apps:
+            if path == app_path:
+                return True
+        return False
+
+    def paths(self):
+        """Caminhos dos apps suspensos, do mais recente ao mais antigo."""
+        return [path for path, _ in reversed(self._apps)]
+
+    def take(self, app_path):
+        """Remove e retorna a instância suspensa do app, ou None."""
+        for i, (path, instance) in enumerate(self._apps):
+            if path == app_path:
+                del self._apps[i]
+                return instance
+        return None
+
+    def put(self, app_path, instance):
+        """Guarda uma instância suspensa e aplica o orçamento de memória."""
+        self.take(app_path)
+        self._apps.append((app_path, instance))
+        while len(self._apps) > self.max_apps:
+            self._evict_oldest()
+        self.trim()
+
+    def trim(self):
+        """Descarta apps suspensos até a memória livre voltar acima da marca d'água."""
+        gc.collect()
+        while self._apps and gc.mem_free() < self.watermark:
+            self._evict_oldest()
+            gc.collect()
+
+    def _evict_oldest(self):
+        path, instance = self._apps.pop(0)
+        print(f"Descartando app suspenso: {path}")
+        close = getattr(instance, 'close', None)
+        if close:
+            try:
+                close()
+            except Exception as e:
+                print(f"Erro ao fechar app suspenso '{path}': {e}")
+
+    def clear(self):
+        while self._apps:
+            self._evict_oldest()
+        gc.collect()
@@ -0,0 +1,179 @@
+"""
+App Index Module
+
+Mantém um índice persistente dos apps instalados em /sd/app, para que o
+launcher não precise listar o SD card (um listdir por app) a cada boot ou a
+cada retorno de um app.
+
+O índice é um JSON em /sd/app/.index com o mtime do diretório /sd/app no
+momento da construção e uma entrada por app:
+    {'name', 'path', 'init_file', 'icon_path', 'icon_size', 'icon_mtime', 'size', 'mtime'}
+
+O updater chama update_index() com os apps que mudaram; o launcher só faz a
+varredura completa quando o índice não existe, está corrompido ou o mtime
+do diretório não confere. No FAT o mtime de um diretório não muda quando um
+arquivo dentro dele é substituído, então load_index() também confere o
+__init__.py e o ícone de cada entrada com um stat e reescaneia só os apps
+que mudaram (apagando o atlas de ícones, que o launcher então regenera).
+"""
+
+import os as _os # Importa 'os' com um alias para evitar conflitos
+import json
+from lib.icon_atlas import ATLAS_FILE
+
+APP_BASE_PATH = '/sd/app'
+INDEX_FILE = f'{APP_BASE_PATH}/.index'
+INDEX_VERSION = 2
+
+_ICON_CANDIDATES = ('__icon__.p4', '__icon__.bmp')
+
+
+def _dir_mtime(path):
+    try:
+        return _os.stat(path)[8]
+    except OSError:
+        return None
+
+
+def _icon_size(icon_path):
+    """Lê as dimensões de um ícone .p4 (dois primeiros bytes do arquivo)."""
+    if not icon_path.endswith('.p4'):
+        return None
+    try:
+        with open(icon_path, 'rb') as f:
+            dims = f.read(2)
+        if len(dims) == 2:
+            return [dims[0], dims[1]]
+    except OSError:
+        pass
+    return None
+
+
+def scan_app(dir_name):
+    """Monta a entrada de índice de um app, ou None se não for um app válido."""
+    app_full_path = f"{APP_BASE_PATH}/{dir_name}"
+    try:
+        dir_contents = _os.listdir(app_full_path)
+    except OSError:
+        return None # Não é um diretório (ou foi removido)
+    if '__init__.py' not in dir_contents:
+        return None
+
+    init_file = f'{app_full_path}/__init__.py'
+    try:
+        st = _os.stat(init_file)
+    except OSError:
+        return None
+
+    icon_path = None
+    for candidate in _ICON_CANDIDATES:
+        if candidate in dir_contents:
+            icon_path = f'{app_full_path}/{candidate}'
+            break
+    icon_mtime = _dir_mtime(icon_path) if icon_path else None
+
+    return {
+        'name': dir_name,
+        'path': app_full_path,
+        'init_file': init_file,
+        'icon_path': icon_path,
+        'icon_size': _icon_size(icon_path) if icon_path else None,
+        'icon_mtime': icon_mtime,
+        'size': st[6],
+        'mtime': st[8],
+    }
+
+
+def _save_index(apps):
+    data = {
+        'version': INDEX_VERSION,
+        'dir_mtime': _dir_mtime(APP_BASE_PATH),
+        'apps': apps,
+    }
+    try:
+        with open(INDEX_FILE, 'w') as f:
+            json.dump(data, f)
+    except OSError as e:
+        print(f"Erro ao salvar índice de apps: {e}")
+
+
+def build_index():
+    """Varre /sd/app por completo e grava um novo índice. Retorna a lista de apps."""
+    apps = []
+    for dir_name in sorted(_os.listdir(APP_BASE_PATH)):
+        if dir_name.startswith('.'):
+            continue
+        entry = scan_app(dir_name)
+        if entry:
+            apps.append(entry)
+    _save_index(apps)
+    return apps
+
+
+def _read_index():
+    try:
+        with open(INDEX_FILE, 'r') as f:
+            data = json.load(f)
+        if data.get('version') == INDEX_VERSION:
+            return data
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _entry_is_stale(entry):
+    """True se o __init__.py ou o ícone do app mudou desde que a entrada foi feita."""
+    try:
+        st = _os.stat(entry['init_file'])
+    except OSError:
+        return True
+    if st[6] != entry['size'] or st[8] != entry['mtime']:
+        return True
+    return entry['icon_path'] is not None and _dir_mtime(entry['icon_path']) != entry['icon_mtime']
+
+
+def load_index():
+    """
+    Retorna a lista de apps do índice, reconstruindo-o se estiver ausente ou
+    desatualizado. Levanta OSError se /sd/app não existir.
+    """
+    dir_mtime = _dir_mtime(APP_BASE_PATH)
+    if dir_mtime is None:
+        raise OSError(2, APP_BASE_PATH) # ENOENT, como o listdir faria
+
+    data = _read_index()
+    if data and data.get('dir_mtime') == dir_mtime:
+        stale = [app['name'] for app in data['apps'] if _entry_is_stale(app)]
+        if not stale:
+            return data['apps']
+        print(f"Apps alterados desde o índice: {stale}")
+        try:
+            _os.remove(ATLAS_FILE)
+        except OSError:
+            pass
+        return update_index(stale)
+
+    print("Índice de apps ausente ou desatualizado, reconstruindo...")
+    return build_index()
+
+
+def update_index(app_names):
+    """
+    Atualiza incrementalmente as entradas dos apps informados (instalados,
+    atualizados ou removidos) sem varrer os demais. Retorna a lista de apps.
+    """
+    data = _read_index()
+    if data is None:
+        return build_index()
+
+    apps = {app['name']: app for app in data['apps']}
+    for name in app_names:
+        entry = scan_app(name)
+        if entry:
+            apps[name] = entry
+        elif name in apps:
+            del apps[name]
+
+    apps = [apps[name] for name in sorted(apps)]
+    _save_index(apps)
+    return apps
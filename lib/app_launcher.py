@@ -3,17 +3,23 @@
 import os as _os # Importa 'os' com um alias para evitar conflitos
 import gc  # Importar o Garbage Collector
 import time
+import uasyncio as asyncio
 import tft_config as tft
 import st7789py as st7789
 from romfonts import vga1_8x8 as font
 from lib.app_runner import run_app  # Importa o novo runner
+from lib import app_index
+from lib import icon_atlas
+from lib.app_cache import AppCache
+from lib.telemetry import Telemetry
+from lib.events import get_input, wait_event
+from lib.keyboard import get_keyboard
+from lib.power import PowerGovernor
+from lib.status_bar import get_status_bar, STATUS_BAR_HEIGHT
 from lib.touch import Touch
 from lib.trackball import Trackball
 from lib.sound import SoundManager
 
-# --- Constantes para a Barra de Status ---
-STATUS_BAR_HEIGHT = 20
-STATUS_BAR_BG_COLOR = st7789.color565(10, 10, 15) # Cor de fundo da barra de status
 
 
 class AppLauncher:
@@ -27,30 +33,27 @@ class AppLauncher:
         self.selected_index = 0
         self.scroll_offset = 0 # Índice do primeiro app visível na tela
         self.visible_items = 4 # Ajustado para acomodar a barra de status e título
+        self.atlas = None # Atlas de ícones pré-renderizados (lib/icon_atlas.py)
+        self.app_cache = AppCache() # Apps suspensos, retomados instantaneamente
+        self.telemetry = Telemetry(probe_heap=True) # Métricas por lançamento (lib/telemetry.py)
+        # Entrada orientada a eventos (lib/events.py): trackball, teclado e
+        # touch alimentam a fila pelas IRQs e o loop do launcher dorme até
+        # chegar algo. Os apps usam a mesma fila (get_input).
+        self.keyboard = get_keyboard(i2c)
+        self.input = get_input(trackball, i2c, touch)
+        self.events = self.input.queue
+        self.input_service = self.input.service
+        # Reduz o backlight e a CPU com o aparelho parado (lib/power.py)
+        self.power = PowerGovernor(display.backlight, display, wake_pin=trackball.tb_click,
+                                   pollers=(self.keyboard,))
+        # Barra de status incremental, compartilhada com os apps (lib/status_bar.py)
+        self.status_bar = get_status_bar(display)
 
     def scan_apps(self):
-        """Scan /sd/app directory for valid apps (directories with __init__.py)"""
+        """Carrega a lista de apps do índice persistente (ver lib/app_index.py)"""
         self.apps = []
-        app_base_path = '/sd/app'
         try:
-            app_dirs = _os.listdir(app_base_path)
-            for dir_name in app_dirs:
-                app_full_path = f"{app_base_path}/{dir_name}"
-                # Verifica se é um diretório e tem __init__.py
-                dir_contents = _os.listdir(app_full_path)
-                if '__init__.py' in dir_contents:
-                    icon_path = None
-                    if '__icon__.p4' in dir_contents:
-                        icon_path = f'{app_full_path}/__icon__.p4'
-                    elif '__icon__.bmp' in dir_contents:
-                        icon_path = f'{app_full_path}/__icon__.bmp'
-
-                    self.apps.append({
-                        'name': dir_name,
-                        'path': app_full_path,
-                        'init_file': f'{app_full_path}/__init__.py',
-                        'icon_path': icon_path
-                    })
+            self.apps = app_index.load_index()
         except OSError as e:
             # Se o diretório /sd/app não existir (ENOENT), não é um erro fatal.
             # Apenas significa que não há apps para listar.
@@ -58,21 +61,33 @@ class AppLauncher:
                 print("Diretório de apps '/sd/app' não encontrado. Verifique o SD card.")
             else:
                 print(f"Erro de I/O ao escanear diretório de apps: {e}")
+        self._open_atlas()
+
+    def _open_atlas(self):
+        """Abre o atlas de ícones, gerando-o se faltar algum ícone."""
+        if self.atlas:
+            self.atlas.close()
+            self.atlas = None
+        with_icons = [app['name'] for app in self.apps if (app['icon_path'] or '').endswith('.p4')]
+        for attempt in range(2):
+            try:
+                self.atlas = icon_atlas.IconAtlas()
+                if self.atlas.needs_swap == self.display.needs_swap and all(name in self.atlas for name in with_icons):
+                    return
+                self.atlas.close()
+                self.atlas = None
+            except (OSError, ValueError):
+                pass
+            if attempt == 0:
+                try:
+                    icon_atlas.build_atlas(self.apps, self.display.needs_swap)
+                except OSError as e:
+                    print(f"Erro ao gerar atlas de ícones: {e}")
+                    return
 
     def draw_status_bar(self):
-        """Desenha apenas a barra de status superior."""
-        self.display.fill_rect(0, 0, self.display.width, STATUS_BAR_HEIGHT, STATUS_BAR_BG_COLOR)
-
-        # Data e Hora
-        now = time.localtime()
-        date_time_str = f"{now[2]:02d}/{now[1]:02d} {now[3]:02d}:{now[4]:02d}"
-        self.display.text(font, date_time_str, 5, 5, st7789.WHITE, STATUS_BAR_BG_COLOR)
-
-        # Status da Bateria (Placeholder)
-        # Para uma implementação real, você precisaria de hardware para ler o nível da bateria
-        battery_str = "Bat: 85%" # Placeholder
-        battery_x = self.display.width - (len(battery_str) * font.WIDTH) - 5
-        self.display.text(font, battery_str, battery_x, 5, st7789.WHITE, STATUS_BAR_BG_COLOR)
+        """Desenha a barra de status superior inteira."""
+        self.status_bar.draw()
 
     def draw_app_item(self, index):
         """Desenha um único item da lista de aplicativos na tela."""
@@ -110,19 +125,23 @@ class AppLauncher:
         # Desenha o ícone
         if app['icon_path']:
             icon_y = y + (item_height - icon_size) // 2
-            if app['icon_path'].endswith('.p4'):
+            if self.atlas and self.atlas.draw(self.display, app['name'], x + 2, icon_y):
+                pass
+            elif app['icon_path'].endswith('.p4'):
                 self.display.draw_p4_transparent(app['icon_path'], x + 2, icon_y)
 
         # Desenha o nome do app
         self.display.text(font, app['name'][:25], x + icon_size + 10, y + 10, color, bg_color)
 
+        # Indica apps suspensos (voltam instantaneamente ao serem abertos)
+        if app['init_file'] in self.app_cache:
+            self.display.text(font, "em uso", x + icon_size + 10, y + 22, st7789.GREEN, bg_color)
+
     def draw_app_list(self):
         """Draw the vertical list of available apps"""
         self.display.fill(st7789.color565(20, 20, 20))  # Dark background
 
         # --- Desenha a Barra de Status ---
-        self.display.fill_rect(0, 0, self.display.width, STATUS_BAR_HEIGHT, STATUS_BAR_BG_COLOR)
-
         self.draw_status_bar() # Chama a função dedicada para a barra de status
 
         if not self.apps:
@@ -169,9 +188,8 @@ class AppLauncher:
         return False
 
     def reset_icon_cache(self):
-        """Reset icon loaded cache for all apps"""
-        # This method is no longer needed as icons are drawn directly
-        pass
+        """Reabre o atlas de ícones (ex.: após instalar apps)"""
+        self._open_atlas()
 
     def launch_selected_app(self):
         """Launch the selected app"""
@@ -190,15 +208,47 @@ class AppLauncher:
         }
 
         # Chama o runner para executar o app
-        return run_app(selected_app_data['init_file'], hardware_globals)
+        return run_app(selected_app_data['init_file'], hardware_globals, self.app_cache, self.telemetry)
+
+    async def show_telemetry(self):
+        """Mostra os apps mais lentos e os que mais consomem memória."""
+        bg_color = st7789.color565(20, 20, 20)
+        self.display.fill(bg_color)
+        stats = self.telemetry.summary()
+        if not stats:
+            self.display.text(font, "Sem dados de telemetria", 10, 10, st7789.GRAY, bg_color)
+        else:
+            names = list(stats)
+            y = 10
+            for title, key, unit in (("Mais lentos (1o desenho)", 0, "ms"), ("Mais memoria (pico)", 1, "KB")):
+                self.display.text(font, title, 10, y, st7789.CYAN, bg_color)
+                y += 14
+                for name in sorted(names, key=lambda n: stats[n][key], reverse=True)[:5]:
+                    value = stats[name][key] if unit == "ms" else stats[name][key] // 1024
+                    self.display.text(font, f"{name[:16]:16} {value:6}{unit} x{stats[name][2]}", 10, y, st7789.WHITE, bg_color)
+                    y += 12
+                y += 10
+        self.display.text(font, "Clique para voltar", 10, self.display.height - 15, st7789.GRAY, bg_color)
+
+        # Qualquer movimento ou clique volta para a lista
+        self.events.clear()
+        await self.events.get()
+        self.events.clear()
+        self.sound.play_navigation()
 
     def run_launcher(self):
         """Main launcher loop"""
+        asyncio.run(self._run_launcher())
+
+    async def _run_launcher(self):
+        """Loop do launcher: aguarda eventos de entrada ou o tick do relógio."""
+        # Lê e mixa o áudio em streaming fora da IRQ do I2S (ver lib/mixer.py)
+        asyncio.create_task(self.sound.mixer.run())
         self.scan_apps()
         
         if not self.apps:
             self.draw_app_list() # Desenha a mensagem "Nenhum app encontrado"
-            while True: time.sleep_ms(100) # Wait indefinitely
+            while True: await asyncio.sleep_ms(60_000) # Wait indefinitely
 
         self.selected_index = 0
         self.select_app(self.selected_index) # Garante que o scroll_offset está correto
@@ -207,18 +257,51 @@ class AppLauncher:
         last_status_update = time.ticks_ms()
 
         while True:
-            key = None # Sem entrada de teclado para o launcher
-            direction, click = self.trackball.get_direction()
+            self.power.update()
+            if not self.power.screen_on:
+                # Tela desligada: lightsleep até um clique, tecla ou giro. O
+                # Timer do teclado está parado, então ele é lido uma vez aqui.
+                self.telemetry.flush()
+                self.power.sleep()
+                if self.events or self.keyboard.drain() or self.keyboard.available() \
+                        or self.power.wake_requested():
+                    self.power.activity()
+                    # A entrada que acordou o aparelho não navega
+                    self.trackball.get_motion()
+                    self.keyboard.clear()
+                    self.events.clear()
+                    self.draw_app_list()
+                    last_status_update = time.ticks_ms()
+                await asyncio.sleep_ms(0)
+                continue
+
+            # Dorme até chegar um evento, a hora de atualizar o relógio ou a
+            # próxima transição de energia
+            wait_ms = max(0, 1000 - time.ticks_diff(time.ticks_ms(), last_status_update))
+            wait_ms = min(wait_ms, self.power.next_deadline_ms())
+            if await wait_event(self.events, wait_ms) is not None:
+                self.power.activity()
+            # A fila só acorda o loop; o movimento (já acelerado pela
+            # velocidade do giro) vem dos acumuladores do trackball.
+            self.events.clear()
+            dx, dy, click = self.trackball.get_motion()
 
             # Lida com a entrada do trackball
-            if direction:
+            if dx or dy:
                 old_selected_index = self.selected_index
                 num_apps = len(self.apps)
 
-                if direction == 'up':
-                    self.selected_index = (self.selected_index - 1 + num_apps) % num_apps
-                elif direction == 'down':
-                    self.selected_index = (self.selected_index + 1) % num_apps
+                if abs(dy) >= abs(dx):
+                    if abs(dy) == 1:
+                        # Um passo: navega em círculo, como antes
+                        self.selected_index = (self.selected_index + dy) % num_apps
+                    else:
+                        # Giro rápido: pula vários itens, parando nas pontas
+                        self.selected_index = max(0, min(num_apps - 1, self.selected_index + dy))
+                elif dx < 0:
+                    # Tela de telemetria: apps mais lentos e mais pesados
+                    await self.show_telemetry()
+                    self.draw_app_list()
                 
                 if self.selected_index != old_selected_index:
                     self.sound.play_navigation()
@@ -232,20 +315,24 @@ class AppLauncher:
 
             if click:
                 self.sound.play_confirm()
+                # Descarta o estado acumulado no trackball para o app não
+                # receber o clique que o abriu.
+                self.trackball.get_motion()
+                self.keyboard.clear()
                 # Lança o app, e se ele rodar com sucesso...
-                if self.launch_selected_app():
+                launched = self.launch_selected_app()
+                # Eventos gerados enquanto o app rodava pertencem a ele
+                self.events.clear()
+                self.power.activity()
+                if launched:
                     # ...reseta a seleção e redesenha a tela do launcher.
                     gc.collect() # Força a coleta de lixo para liberar memória
-                    self.scan_apps() # Re-escaneia os apps caso algo tenha mudado
-                    # Garante que o selected_index ainda é válido após o scan
-                    if self.selected_index >= len(self.apps):
-                        self.selected_index = max(0, len(self.apps) - 1)
+                    # A lista de apps só muda via updater (que reconstrói o
+                    # índice e reinicia), então não há o que re-escanear aqui.
                     self.select_app(self.selected_index) # Re-seleciona para atualizar o estado e o scroll
                     self.draw_app_list() # Redesenha a tela após o app fechar
 
-            # Atualiza a barra de status (relógio) a cada segundo sem redesenhar tudo
-            if time.ticks_diff(time.ticks_ms(), last_status_update) > 1000:
-                self.draw_status_bar()
+            # Atualiza a barra de status a cada segundo; só os glifos que mudaram
+            if time.ticks_diff(time.ticks_ms(), last_status_update) >= 1000:
+                self.status_bar.update()
                 last_status_update = time.ticks_ms()
-
-            time.sleep_ms(50)
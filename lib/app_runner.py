@@ -4,15 +4,235 @@ App Runner Module
 Executa aplicativos de forma isolada, gerenciando memória e o ciclo de vida.
 Esta versão é projetada para funcionar com aplicativos baseados em classes,
 garantindo um ambiente de execução limpo a cada vez.
+
+Cache de bytecode:
+    Ao lado de cada app pode existir um '__app__.mpy' (gerado pelo mpy-cross
+    no PC durante o upload) e um '__app__.key' com a chave do fonte que o
+    originou, no formato "<tamanho> <sha256> <mtime>". Se a chave bater com o
+    '__init__.py' atual, o app é carregado direto do bytecode, sem compilar
+    o fonte no ESP32. Caso contrário, o runner volta para o fonte.
+
+Suspensão:
+    Se um AppCache (lib/app_cache.py) for passado, a instância global 'app'
+    criada pelo script pode ser suspensa ao sair e retomada no próximo
+    lançamento, sem re-executar o script.
 """
 
 import gc
 import sys
 import time
+import os as _os # Importa 'os' com um alias para evitar conflitos
 import st7789py as st7789
 from romfonts import vga1_8x8 as font
+from lib.telemetry import (LaunchRecord, EXIT_ERROR, EXIT_MEMORY, EXIT_SUSPENDED,
+                           FLAG_BYTECODE, FLAG_RESUMED, PROBE_LIMIT, largest_free_block)
+
+try:
+    import hashlib
+    from binascii import hexlify
+except ImportError:
+    hashlib = None
+
+BYTECODE_MODULE = '__app__'
+BYTECODE_FILE = BYTECODE_MODULE + '.mpy'
+BYTECODE_KEY_FILE = BYTECODE_MODULE + '.key'
+
+_HASH_CHUNK_SIZE = 512
+
+
+def source_hash(path):
+    """Calcula o sha256 (hex) de um arquivo lendo em blocos fixos."""
+    h = hashlib.sha256()
+    buf = bytearray(_HASH_CHUNK_SIZE)
+    mv = memoryview(buf)
+    with open(path, 'rb') as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            h.update(mv[:n])
+    return hexlify(h.digest()).decode()
+
+
+def _read_cache_key(key_path):
+    """Lê a chave do cache. Retorna (tamanho, hash, mtime) ou None."""
+    try:
+        with open(key_path, 'r') as f:
+            parts = f.read().split()
+        return int(parts[0]), parts[1], int(parts[2])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _write_cache_key(key_path, size, digest, mtime):
+    try:
+        with open(key_path, 'w') as f:
+            f.write(f"{size} {digest} {mtime}")
+    except OSError:
+        pass # Cartão somente leitura ou cheio: só perdemos o atalho do mtime
+
+
+def bytecode_is_fresh(app_dir, source_path):
+    """
+    Verifica se o bytecode em cache corresponde ao fonte atual.
+
+    A comparação é feita do mais barato para o mais caro: tamanho, depois
+    mtime (registrado no dispositivo após a primeira validação) e, só se o
+    mtime for diferente, o hash do conteúdo.
+    """
+    key_path = f"{app_dir}/{BYTECODE_KEY_FILE}"
+    key = _read_cache_key(key_path)
+    if key is None:
+        return False
+
+    try:
+        _os.stat(f"{app_dir}/{BYTECODE_FILE}")
+        st = _os.stat(source_path)
+    except OSError:
+        return False
+
+    size, digest, mtime = key
+    if st[6] != size:
+        return False
+    if mtime and st[8] == mtime:
+        return True
+    if hashlib is None or source_hash(source_path) != digest:
+        return False
+
+    # Fonte confere: guarda o mtime para pular o hash nos próximos lançamentos
+    _write_cache_key(key_path, size, digest, st[8])
+    return True
+
+
+def _run_bytecode(app_dir, hardware_globals):
+    """
+    Importa o '__app__.mpy' do app.
+
+    Módulos importados não recebem um dicionário de globais como o exec,
+    então as instâncias de hardware são expostas via 'builtins' enquanto o
+    app roda: o app deve usá-las pelo nome (como 'display'), nunca via
+    globals(). Retorna os globais do módulo, ou None se não for possível
+    (builtins somente leitura ou bytecode incompatível com o firmware).
+    """
+    import builtins
+    try:
+        for name, value in hardware_globals.items():
+            setattr(builtins, name, value)
+    except (AttributeError, TypeError):
+        return None
 
-def run_app(app_path, hardware_globals):
+    sys.path.insert(0, app_dir)
+    try:
+        module = __import__(BYTECODE_MODULE)
+    except (ValueError, ImportError) as e:
+        # .mpy de outra versão/arquitetura (ou sumido): o carregador recusa o
+        # arquivo antes de executar o app. Erros do próprio app sobem normalmente.
+        message = str(e)
+        if '.mpy' not in message and BYTECODE_MODULE not in message:
+            raise
+        print(f"Bytecode incompatível: {message}")
+        try:
+            _os.remove(f"{app_dir}/{BYTECODE_KEY_FILE}") # Não tenta de novo até o próximo upload
+        except OSError:
+            pass
+        return None
+    finally:
+        sys.path.pop(0)
+        if BYTECODE_MODULE in sys.modules:
+            del sys.modules[BYTECODE_MODULE]
+        for name in hardware_globals:
+            try:
+                delattr(builtins, name)
+            except AttributeError:
+                pass
+    return module.__dict__
+
+
+def _run_source(app_path, hardware_globals, launch=None):
+    """Compila e executa o fonte do app, medindo o custo da compilação."""
+    start = time.ticks_ms()
+    with open(app_path) as f:
+        code = compile(f.read(), app_path, 'exec')
+    compile_ms = time.ticks_diff(time.ticks_ms(), start)
+    if launch:
+        launch.load_ms = compile_ms
+        _sample_heap(launch)
+    gc.collect()
+    print(f"Fonte compilado em {compile_ms} ms (memória livre: {gc.mem_free()} bytes)")
+    exec(code, hardware_globals)
+    return hardware_globals
+
+
+def _suspend_app(app_path, namespace, app_cache):
+    """Oferece a instância 'app' ao cache se ela suportar suspensão."""
+    instance = namespace.get('app') if namespace else None
+    suspend = getattr(instance, 'suspend', None)
+    if suspend is None:
+        return False
+    try:
+        if suspend():
+            app_cache.put(app_path, instance)
+            print(f"App suspenso: {app_path}")
+            return True
+    except Exception as e:
+        print(f"Erro ao suspender app '{app_path}': {e}")
+    return False
+
+
+# --- Telemetria ---
+
+HEAP_SAMPLE_MS = 100 # Intervalo mínimo entre amostras de heap nos ganchos do display
+
+_heap_total = 0
+_min_free = 0
+
+
+def _sample_heap(launch):
+    """Amostra a memória livre; o menor valor visto define o pico de heap."""
+    global _min_free
+    free = gc.mem_free()
+    if free < _min_free:
+        _min_free = free
+        launch.heap_peak = _heap_total - free
+
+
+def _watch_display(display, launch, start):
+    """
+    Intercepta fill_rect/blit_buffer da instância do display para medir o
+    tempo até o primeiro desenho do app e, enquanto ele roda, amostrar o
+    heap a cada desenho (no máximo a cada HEAP_SAMPLE_MS, pois mem_free()
+    percorre a tabela do heap). Retorna a função que remove os ganchos.
+    """
+    names = ('fill_rect', 'blit_buffer')
+    last_sample = start
+
+    def unwatch():
+        for name in names:
+            try:
+                delattr(display, name)
+            except AttributeError:
+                pass
+
+    def make_hook(original):
+        def hook(*args):
+            nonlocal last_sample
+            now = time.ticks_ms()
+            if not launch.first_frame_ms:
+                launch.first_frame_ms = max(1, time.ticks_diff(now, start))
+                last_sample = now
+                _sample_heap(launch)
+            elif time.ticks_diff(now, last_sample) >= HEAP_SAMPLE_MS:
+                last_sample = now
+                _sample_heap(launch)
+            return original(*args)
+        return hook
+
+    for name in names:
+        setattr(display, name, make_hook(getattr(display, name)))
+    return unwatch
+
+
+def run_app(app_path, hardware_globals, app_cache=None, telemetry=None):
     """
     Executa um aplicativo, garantindo um ambiente limpo.
 
@@ -20,9 +240,13 @@ def run_app(app_path, hardware_globals):
         app_path (str): O caminho para o arquivo __init__.py do aplicativo.
         hardware_globals (dict): Um dicionário contendo as instâncias de hardware
                                  (display, touch, etc.) para passar para o app.
+        app_cache (AppCache): Cache de apps suspensos (opcional).
+        telemetry (Telemetry): Log de métricas por lançamento (opcional).
     """
+    global _heap_total, _min_free
     display = hardware_globals.get('display')
     sound = hardware_globals.get('sound')
+    app_dir = app_path.rsplit('/', 1)[0]
 
     # --- Etapa 1: Limpeza do ambiente ---
     # Converte o caminho do arquivo em um nome de módulo (ex: /sd/app/wifi -> app.wifi)
@@ -35,23 +259,75 @@ def run_app(app_path, hardware_globals):
     gc.collect()
     print(f"Memória livre antes de carregar o app: {gc.mem_free()} bytes")
 
+    launch = None
+    unwatch = None
+    if telemetry:
+        launch = LaunchRecord(app_dir.rsplit('/', 1)[-1])
+        _min_free = gc.mem_free()
+        _heap_total = _min_free + gc.mem_alloc()
+
     # --- Etapa 2: Execução do App ---
+    start = time.ticks_ms()
     try:
         if sound:
             sound.play_confirm()
         if display:
             display.fill(st7789.BLACK)
             display.text(font, "Carregando app...", 10, 100, st7789.WHITE, st7789.BLACK)
+            if launch:
+                start = time.ticks_ms()
+                unwatch = _watch_display(display, launch, start)
+
+        # Um app suspenso é retomado sem re-executar o script
+        instance = app_cache.take(app_path) if app_cache else None
+        if instance is not None:
+            print(f"Retomando app suspenso: {app_path}")
+            if launch:
+                launch.flags |= FLAG_RESUMED
+            resume = getattr(instance, 'resume', None)
+            if resume:
+                resume()
+            instance.run()
+            if launch:
+                _sample_heap(launch)
+            if _suspend_app(app_path, {'app': instance}, app_cache) and launch:
+                launch.exit_reason = EXIT_SUSPENDED
+            return True
 
         # O app deve definir e instanciar uma classe 'App' e chamar seu método 'run'.
         # As variáveis em hardware_globals estarão disponíveis globalmente para o script.
-        print(f"Executando script: {app_path}")
-        exec(open(app_path).read(), hardware_globals)
-        
+        namespace = None
+        if bytecode_is_fresh(app_dir, app_path):
+            if launch:
+                launch.load_ms = time.ticks_diff(time.ticks_ms(), start)
+                launch.flags |= FLAG_BYTECODE
+            print(f"Executando bytecode: {app_dir}/{BYTECODE_FILE}")
+            namespace = _run_bytecode(app_dir, hardware_globals)
+            if namespace is not None:
+                print(f"App (bytecode) executado em {time.ticks_diff(time.ticks_ms(), start)} ms")
+            else:
+                print("Bytecode indisponível, usando o fonte.")
+                if launch:
+                    launch.flags &= ~FLAG_BYTECODE
+
+        if namespace is None:
+            print(f"Executando script: {app_path}")
+            namespace = _run_source(app_path, hardware_globals, launch)
+            print(f"App (fonte) executado em {time.ticks_diff(time.ticks_ms(), start)} ms")
+
+        if launch:
+            _sample_heap(launch)
+        if app_cache and _suspend_app(app_path, namespace, app_cache) and launch:
+            launch.exit_reason = EXIT_SUSPENDED
+
         return True
 
     except Exception as e:
         print(f"!!! ERRO AO EXECUTAR APP '{app_path}': {e}")
+        if launch:
+            launch.exit_reason = EXIT_MEMORY if isinstance(e, MemoryError) else EXIT_ERROR
+        if unwatch:
+            unwatch()
         # Exibe uma tela de erro clara no display
         if display:
             display.fill(st7789.color565(100, 0, 0))  # Fundo vermelho escuro
@@ -67,6 +343,14 @@ def run_app(app_path, hardware_globals):
     finally:
         # --- Etapa 3: Limpeza Pós-Execução ---
         # Garante que a memória seja liberada mesmo que o app falhe.
+        if unwatch:
+            unwatch()
+        if app_cache:
+            app_cache.trim()
         gc.collect()
         print(f"App finalizado. Memória livre: {gc.mem_free()} bytes")
-
+        if launch:
+            launch.run_ms = time.ticks_diff(time.ticks_ms(), start)
+            if telemetry.probe_heap:
+                launch.largest_free = largest_free_block(min(gc.mem_free(), PROBE_LIMIT))
+            telemetry.record(launch)
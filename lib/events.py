@@ -0,0 +1,320 @@
+"""
+Events Module
+
+Subsistema central de entrada baseado em uasyncio. As fontes de entrada
+(IRQs do trackball, touch e teclado) empurram eventos tipados numa fila
+circular pré-alocada, e quem consome faz 'await' em vez de girar em loops
+com sleep_ms.
+
+    queue = EventQueue()
+    service = InputService(queue, trackball, touch, i2c)
+    service.start(keyboard=True)
+    kind, a, b, c = await queue.get()
+
+Os apps rodam de forma síncrona (dentro do loop do launcher), então usam
+PollingInput: a mesma interface de polling de antes (get_direction(),
+get_key(), read_touch()), mais wait(timeout_ms), que dorme até chegar um
+evento na fila em vez de girar com sleep_ms entre as leituras.
+
+    inp = get_input(trackball, i2c, touch)
+    while True:
+        direction, click = inp.get_direction()
+        key = inp.get_key()
+        ...
+        inp.wait(50) # Volta assim que houver entrada
+
+Eventos (kind, a, b, c):
+    EV_MOVE:  a=dx, b=dy (passos do trackball)
+    EV_CLICK: clique do trackball
+    EV_KEY:   a=código da tecla
+    EV_TOUCH: a=x, b=y, c=tipo do evento do Touch (TAP, LONG_TAP, DRAG;
+              NONE para uma amostra crua entregue pela IRQ do INT)
+"""
+
+import time
+import select
+from array import array
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+try:
+    from micropython import const
+except ImportError:
+    const = lambda x: x
+
+EV_NONE = const(0)
+EV_MOVE = const(1)
+EV_CLICK = const(2)
+EV_KEY = const(3)
+EV_TOUCH = const(4)
+
+DEFAULT_QUEUE_SIZE = const(32)
+KBD_I2C_ADDR = const(0x55)
+KEY_POLL_MS = const(10)
+TOUCH_POLL_MS = const(10)
+
+
+class EventQueue:
+    """
+    Fila circular de eventos com armazenamento pré-alocado.
+
+    push() não aloca memória e pode ser chamado de dentro de uma IRQ; quando
+    a fila está cheia o evento mais novo é descartado (e contado em dropped).
+    """
+
+    def __init__(self, size=DEFAULT_QUEUE_SIZE):
+        self.size = size
+        self._kind = bytearray(size)
+        self._a = array('h', bytes(2 * size))
+        self._b = array('h', bytes(2 * size))
+        self._c = array('h', bytes(2 * size))
+        self._ts = array('I', bytes(4 * size)) # ticks_us no momento do push
+        self.last_timestamp = 0 # ticks_us do último evento retirado
+        self._head = 0 # próximo a ler
+        self._tail = 0 # próximo a escrever
+        self.dropped = 0
+        self._flag = asyncio.ThreadSafeFlag()
+        self._poller = None # Criado no primeiro wait_ms()
+
+    def __len__(self):
+        return (self._tail - self._head) % self.size
+
+    def push(self, kind, a=0, b=0, c=0):
+        """Enfileira um evento. Seguro para IRQ (sem alocação)."""
+        nxt = (self._tail + 1) % self.size
+        if nxt == self._head:
+            self.dropped += 1
+            return False
+        i = self._tail
+        self._kind[i] = kind
+        self._a[i] = a
+        self._b[i] = b
+        self._c[i] = c
+        self._ts[i] = time.ticks_us()
+        self._tail = nxt
+        self._flag.set()
+        return True
+
+    def pop(self):
+        """Retira o evento mais antigo como (kind, a, b, c), ou None."""
+        if self._head == self._tail:
+            return None
+        i = self._head
+        event = (self._kind[i], self._a[i], self._b[i], self._c[i])
+        self.last_timestamp = self._ts[i]
+        self._head = (i + 1) % self.size
+        return event
+
+    def clear(self):
+        self._head = self._tail
+
+    async def get(self):
+        """Aguarda e retorna o próximo evento."""
+        while self._head == self._tail:
+            await self._flag.wait()
+        return self.pop()
+
+    def wait_ms(self, timeout_ms):
+        """
+        Versão síncrona de get() para quem não roda no asyncio: dorme no
+        poll da ThreadSafeFlag (os callbacks agendados continuam rodando)
+        até chegar um evento ou passar timeout_ms. Retorna True se há evento.
+        """
+        if self._head == self._tail:
+            if self._poller is None:
+                self._poller = select.poll()
+                self._poller.register(self._flag, select.POLLIN)
+            self._poller.poll(timeout_ms)
+        self._flag.clear()
+        return self._head != self._tail
+
+
+class InputService:
+    """
+    Conecta as fontes de entrada à fila de eventos.
+
+    O trackball e o serviço de teclado (lib/keyboard.py) empurram eventos
+    direto das suas rotinas de interrupção. Sem o serviço de teclado, teclado
+    e touch, que precisam de I2C (proibido em IRQ), são lidos por tarefas
+    asyncio que só ocupam a CPU enquanto estão ativas.
+    """
+
+    def __init__(self, queue, trackball=None, touch=None, i2c=None, keyboard=None):
+        self.queue = queue
+        self.trackball = trackball
+        self.touch = touch
+        self.i2c = i2c
+        self.keyboard = keyboard
+        self._tasks = []
+        self._key_buf = bytearray(1)
+        if trackball is not None:
+            trackball.event_queue = queue
+        if keyboard is not None:
+            keyboard.event_queue = queue
+
+    def start(self, keyboard=False, touch=False):
+        """Inicia as tarefas de leitura das fontes sem IRQ própria."""
+        self.stop()
+        if keyboard and self.keyboard is None and self.i2c is not None:
+            self._tasks.append(asyncio.create_task(self._keyboard_task()))
+        if touch and self.touch is not None:
+            self._tasks.append(asyncio.create_task(self._touch_task()))
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    def poll_keyboard(self):
+        """Lê uma tecla do teclado e a enfileira. Retorna True se havia tecla."""
+        if self.keyboard is not None:
+            return self.keyboard.drain() > 0
+        try:
+            self.i2c.readfrom_into(KBD_I2C_ADDR, self._key_buf)
+        except OSError:
+            return False
+        if self._key_buf[0]:
+            self.queue.push(EV_KEY, self._key_buf[0])
+            return True
+        return False
+
+    def poll_touch(self):
+        """Lê o touch e enfileira o evento, se houver."""
+        kind, x, y = self.touch.read()
+        if kind:
+            self.queue.push(EV_TOUCH, x, y, kind)
+            return True
+        return False
+
+    async def _keyboard_task(self):
+        while True:
+            self.poll_keyboard()
+            await asyncio.sleep_ms(KEY_POLL_MS)
+
+    async def _touch_task(self):
+        while True:
+            self.poll_touch()
+            await asyncio.sleep_ms(TOUCH_POLL_MS)
+
+
+class PollingInput:
+    """
+    Adaptador para o estilo de polling dos apps, apoiado na fila de eventos.
+
+    As leituras são as mesmas dos drivers (trackball.get_direction(),
+    keyboard.get_key(), touch.read()); a fila só serve para wait() acordar
+    na hora em que chega entrada, como no loop do launcher.
+    """
+
+    def __init__(self, service):
+        self.service = service
+        self.queue = service.queue
+        self.trackball = service.trackball
+        self.keyboard = service.keyboard
+        self.touch = service.touch
+        if self.touch is not None:
+            self.touch.event_queue = self.queue # Cada amostra do INT acorda wait()
+
+    def get_direction(self):
+        """Mesmo retorno que Trackball.get_direction(): (direção, clique)."""
+        if self.trackball is None:
+            return None, False
+        return self.trackball.get_direction()
+
+    def get_motion(self):
+        """Mesmo retorno que Trackball.get_motion(): (dx, dy, clique) acelerados."""
+        if self.trackball is None:
+            return 0, 0, False
+        return self.trackball.get_motion()
+
+    def get_key(self):
+        """Mesmo retorno que get_key_simple(): bytes de 1 tecla ou None."""
+        if self.keyboard is None:
+            return None
+        return self.keyboard.get_key()
+
+    def read_touch(self):
+        """Mesmo retorno que Touch.read(): (tipo, x, y)."""
+        if self.touch is None:
+            return (0, 0, 0)
+        return self.touch.read()
+
+    def pending(self):
+        """True se há entrada ainda não lida (teclas no buffer ou amostras do touch)."""
+        if self.keyboard is not None and self.keyboard.available():
+            return True
+        return self.touch is not None and self.touch.pending() > 0
+
+    def wait(self, timeout_ms):
+        """
+        Substitui o sleep_ms do fim de cada volta: dorme até chegar entrada
+        ou passar timeout_ms. Retorna True se chegou entrada.
+        """
+        woke = self.pending() or self.queue.wait_ms(timeout_ms)
+        self.queue.clear()
+        return woke
+
+
+_shared = None
+
+
+def get_input(trackball, i2c, touch=None):
+    """Retorna o PollingInput compartilhado (a mesma fila do launcher), criando-o na primeira vez."""
+    global _shared
+    if _shared is None:
+        from lib.keyboard import get_keyboard
+        _shared = PollingInput(InputService(EventQueue(), trackball, touch, i2c, get_keyboard(i2c)))
+    return _shared
+
+
+async def wait_event(queue, timeout_ms):
+    """Aguarda um evento por até timeout_ms. Retorna None se expirar."""
+    try:
+        return await asyncio.wait_for_ms(queue.get(), timeout_ms)
+    except asyncio.TimeoutError:
+        return None
+
+
+def benchmark(samples=100, poll_period_ms=50):
+    """
+    Mede a latência de entrada: eventos disparados por um Timer (contexto de
+    IRQ) são consumidos (a) por uma tarefa que faz 'await queue.get()' e
+    (b) por um loop de polling com sleep_ms(poll_period_ms), como nos apps.
+    Imprime a latência média e máxima de cada modo em microssegundos.
+    """
+    from machine import Timer
+
+    queue = EventQueue()
+    timer = Timer(0)
+
+    def fire(_):
+        queue.push(EV_CLICK)
+
+    def report(label, latencies):
+        print(f"{label}: média {sum(latencies) // len(latencies)} us, máx {max(latencies)} us")
+
+    async def consume_async():
+        latencies = []
+        while len(latencies) < samples:
+            await queue.get()
+            latencies.append(time.ticks_diff(time.ticks_us(), queue.last_timestamp))
+        return latencies
+
+    timer.init(period=7, mode=Timer.PERIODIC, callback=fire)
+    try:
+        report("await", asyncio.run(consume_async()))
+
+        queue.clear()
+        latencies = []
+        while len(latencies) < samples:
+            if queue.pop() is not None:
+                # O evento mais antigo pendente é o que esperou mais
+                latencies.append(time.ticks_diff(time.ticks_us(), queue.last_timestamp))
+                queue.clear()
+            time.sleep_ms(poll_period_ms)
+        report(f"polling {poll_period_ms} ms", latencies)
+    finally:
+        timer.deinit()
@@ -13,6 +13,7 @@ from lib.touch import Touch
 from lib.trackball import Trackball
 from lib.sound import SoundManager
 from lib.sdcard import _SDCard
+from lib.keyboard import get_keyboard
 
 # Define const para otimização do MicroPython
 try:
@@ -67,6 +68,8 @@ def init_hardware():
     touch = tft.config_touch(i2c)
     trackball = Trackball()
     sound = SoundManager()
+    # Serviço de teclado compartilhado: bufferiza teclas desde o boot
+    get_keyboard(i2c)
 
     # Inicializa e monta o cartão SD
     try:
@@ -0,0 +1,156 @@
+"""
+Icon Atlas Module
+
+Empacota os ícones .p4 de todos os apps em um único arquivo com os pixels já
+expandidos para RGB565 (na ordem de bytes do display) e uma tabela de spans
+opacos por linha. O launcher abre o atlas uma vez e desenha cada ícone com
+um seek, leituras em buffers fixos e um blit por span, sem decodificar
+paletas a cada redesenho.
+
+Formato (little endian):
+    cabeçalho: b'ATL1', swap (B), quantidade de ícones (H)
+    diretório, por ícone:
+        tamanho do nome (B), nome (utf-8), largura (B), altura (B),
+        offset dos pixels (I), offset dos spans (I), quantidade de spans (H)
+    dados: spans (linha, x, comprimento; 3 bytes cada) e pixels (w*h*2 bytes)
+"""
+
+import struct
+import os as _os # Importa 'os' com um alias para evitar conflitos
+
+ATLAS_FILE = '/sd/app/.icons'
+_MAGIC = b'ATL1'
+_HEADER_FMT = '<4sBH'
+_ENTRY_FMT = '<BBIIH'
+_HEADER_SIZE = struct.calcsize(_HEADER_FMT)
+_ENTRY_SIZE = struct.calcsize(_ENTRY_FMT)
+
+
+def _expand_p4(icon_path, needs_swap):
+    """
+    Decodifica um .p4 para (largura, altura, pixels RGB565, spans opacos).
+    O índice 0 da paleta é transparente e não entra em nenhum span.
+    """
+    with open(icon_path, 'rb') as f:
+        dims = f.read(2)
+        palette_data = f.read(32)
+        if len(dims) != 2 or len(palette_data) != 32:
+            return None
+        width, height = dims[0], dims[1]
+        indices = f.read(width * height // 2)
+
+    # A paleta do .p4 já está em big endian, pronta para o SPI
+    palette = [palette_data[i:i + 2] for i in range(0, 32, 2)]
+    if needs_swap:
+        palette = [bytes((c[1], c[0])) for c in palette]
+
+    pixels = bytearray(width * height * 2)
+    spans = bytearray()
+    for row in range(height):
+        run_start = -1
+        for col in range(width):
+            pos = row * width + col
+            packed = indices[pos >> 1] if (pos >> 1) < len(indices) else 0
+            idx = packed & 0x0F if pos & 1 else packed >> 4
+            if idx:
+                pixels[pos * 2:pos * 2 + 2] = palette[idx]
+                if run_start < 0:
+                    run_start = col
+            elif run_start >= 0:
+                spans += bytes((row, run_start, col - run_start))
+                run_start = -1
+        if run_start >= 0:
+            spans += bytes((row, run_start, width - run_start))
+    return width, height, pixels, spans
+
+
+def build_atlas(apps, needs_swap=False, atlas_path=ATLAS_FILE):
+    """
+    Gera o atlas a partir das entradas do índice de apps (ver lib/app_index.py).
+    Apps sem ícone .p4 são ignorados. Retorna a quantidade de ícones gravados.
+    """
+    icons = []
+    for app in apps:
+        icon_path = app.get('icon_path')
+        if not icon_path or not icon_path.endswith('.p4'):
+            continue
+        try:
+            decoded = _expand_p4(icon_path, needs_swap)
+        except OSError:
+            decoded = None
+        if decoded:
+            icons.append((app['name'].encode(), decoded))
+
+    directory_size = _HEADER_SIZE + sum(1 + len(name) + _ENTRY_SIZE for name, _ in icons)
+    tmp_path = atlas_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(struct.pack(_HEADER_FMT, _MAGIC, 1 if needs_swap else 0, len(icons)))
+        offset = directory_size
+        for name, (width, height, pixels, spans) in icons:
+            span_offset = offset
+            pixel_offset = span_offset + len(spans)
+            f.write(bytes((len(name),)))
+            f.write(name)
+            f.write(struct.pack(_ENTRY_FMT, width, height, pixel_offset, span_offset, len(spans) // 3))
+            offset = pixel_offset + len(pixels)
+        for _, (width, height, pixels, spans) in icons:
+            f.write(spans)
+            f.write(pixels)
+
+    try:
+        _os.remove(atlas_path)
+    except OSError:
+        pass
+    _os.rename(tmp_path, atlas_path)
+    return len(icons)
+
+
+class IconAtlas:
+    """Acesso ao atlas de ícones com um único arquivo aberto."""
+
+    def __init__(self, atlas_path=ATLAS_FILE):
+        self._file = open(atlas_path, 'rb')
+        magic, swap, count = struct.unpack(_HEADER_FMT, self._file.read(_HEADER_SIZE))
+        if magic != _MAGIC:
+            self._file.close()
+            raise ValueError("Atlas de ícones inválido")
+        self.needs_swap = bool(swap)
+        self.entries = {}
+        max_pixels = 0
+        max_spans = 0
+        for _ in range(count):
+            name_len = self._file.read(1)[0]
+            name = self._file.read(name_len).decode()
+            entry = struct.unpack(_ENTRY_FMT, self._file.read(_ENTRY_SIZE))
+            self.entries[name] = entry
+            max_pixels = max(max_pixels, entry[0] * entry[1] * 2)
+            max_spans = max(max_spans, entry[4] * 3)
+        # Buffers pré-alocados do tamanho do maior ícone
+        self._pixels = bytearray(max_pixels)
+        self._spans = bytearray(max_spans)
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def draw(self, display, name, x, y):
+        """Desenha o ícone do app 'name'. Retorna False se não estiver no atlas."""
+        entry = self.entries.get(name)
+        if entry is None:
+            return False
+        width, height, pixel_offset, span_offset, span_count = entry
+
+        spans = memoryview(self._spans)[:span_count * 3]
+        pixels = memoryview(self._pixels)[:width * height * 2]
+        # Spans e pixels são contíguos no arquivo: um seek e duas leituras
+        self._file.seek(span_offset)
+        self._file.readinto(spans)
+        self._file.readinto(pixels)
+
+        for i in range(0, span_count * 3, 3):
+            row, col, length = spans[i], spans[i + 1], spans[i + 2]
+            start = (row * width + col) * 2
+            display.blit_buffer(pixels[start:start + length * 2], x + col, y + row, length, 1)
+        return True
+
+    def close(self):
+        self._file.close()
@@ -1,9 +1,69 @@
-"""Keyboard handling module for T-Deck"""
+"""Keyboard handling module for T-Deck
+
+O teclado do T-Deck é um ESP32-C3 no endereço I2C 0x55 que entrega um byte
+(ASCII) por tecla pressionada. Ler um byte por iteração do loop de cada app
+perde teclas digitadas mais rápido que o loop, ou durante um redesenho ou
+som bloqueante.
+
+KeyboardService esvazia o controlador em rajadas (disparadas pela linha de
+interrupção do teclado ou por um Timer) para um buffer circular, e os apps
+leem desse buffer sem bloquear (get_key / read_event) ou com await (get).
+
+O controlador só reporta o pressionamento (não há evento de soltar), então
+a repetição é inferida: a mesma tecla abrindo uma nova rajada dentro de
+REPEAT_WINDOW_MS da anterior é marcada com MOD_REPEAT, e códigos em
+'no_repeat' (ex. Enter) têm as repetições descartadas. Bytes iguais dentro
+da mesma rajada já estavam enfileirados no controlador, então são
+pressionamentos distintos e nunca são marcados.
+
+Com a tela desligada o Timer fica parado (pause()/resume(), chamados pelo
+lib/power.py) e quem está dormindo chama drain() a cada despertar.
+"""
+
+import micropython
+from machine import Pin, Timer
+import time
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    asyncio = None
 
 KBD_I2C_ADDR = 0x55
+KBD_INT_PIN = 46
+
+BUFFER_SIZE = 64
+MAX_BURST = 16 # bytes lidos por rajada no máximo
+POLL_PERIOD_MS = 20
+REPEAT_WINDOW_MS = 60
+
+# Teclas especiais
+KEY_BACKSPACE = 0x08
+KEY_TAB = 0x09
+KEY_ENTER = 0x0D
+KEY_ESC = 0x1B
+
+# Modificadores decodificados
+MOD_SHIFT = 0x01 # letra maiúscula
+MOD_CTRL = 0x02  # código de controle (< 0x20)
+MOD_REPEAT = 0x04
+
+
+def decode_modifiers(code):
+    """Deduz os modificadores de um código ASCII entregue pelo teclado."""
+    mods = 0
+    if 0x41 <= code <= 0x5A:
+        mods |= MOD_SHIFT
+    elif code < 0x20:
+        mods |= MOD_CTRL
+    return mods
+
 
 def get_key(i2c):
     """Lê um caractere do teclado via I2C."""
+    service = _shared
+    if service is not None:
+        return service.get_key()
     try:
         key = i2c.readfrom(KBD_I2C_ADDR, 1)
         if key != b'\x00':
@@ -11,3 +71,148 @@ def get_key(i2c):
     except OSError as e:
         print(f"Erro ao ler do teclado I2C: {e}")
     return None
+
+
+class KeyboardService:
+    def __init__(self, i2c, int_pin=KBD_INT_PIN, poll_ms=POLL_PERIOD_MS, timer_id=1,
+                 no_repeat=(KEY_ENTER,)):
+        self.i2c = i2c
+        self.no_repeat = no_repeat
+        self.event_queue = None # Fila opcional de lib/events.py
+
+        self._codes = bytearray(BUFFER_SIZE)
+        self._mods = bytearray(BUFFER_SIZE)
+        self._head = 0
+        self._tail = 0
+        self.dropped = 0
+        self._byte = bytearray(1)
+        self._last_code = 0
+        self._last_time = 0
+
+        self._pending = False
+        self._drain_ref = self._scheduled_drain # Evita alocar na IRQ
+        self._flag = asyncio.ThreadSafeFlag() if asyncio else None
+
+        self._int_pin = None
+        if int_pin is not None and int_pin >= 0:
+            try:
+                self._int_pin = Pin(int_pin, Pin.IN, Pin.PULL_UP)
+                self._int_pin.irq(trigger=Pin.IRQ_FALLING, handler=self._isr)
+            except (ValueError, OSError):
+                self._int_pin = None
+        self._timer = Timer(timer_id)
+        self._poll_ms = poll_ms
+        self._running = False
+        self._paused = False
+
+    def start(self):
+        """Inicia o esvaziamento periódico (backup da linha de interrupção)."""
+        self._running = True
+        if not self._paused:
+            self._timer.init(period=self._poll_ms, mode=Timer.PERIODIC, callback=self._isr)
+
+    def stop(self):
+        self._running = False
+        self._timer.deinit()
+
+    def pause(self):
+        """Para o Timer (aparelho ocioso ou em lightsleep) sem esquecer se estava ligado."""
+        self._paused = True
+        self._timer.deinit()
+
+    def resume(self):
+        self._paused = False
+        if self._running:
+            self.start()
+
+    def _isr(self, _):
+        """IRQ do pino ou do Timer: agenda a leitura I2C fora da interrupção."""
+        if self._pending:
+            return
+        self._pending = True
+        try:
+            micropython.schedule(self._drain_ref, None)
+        except RuntimeError:
+            self._pending = False # Fila do schedule cheia; tenta no próximo tick
+
+    def _scheduled_drain(self, _):
+        self._pending = False
+        self.drain()
+
+    def drain(self):
+        """Lê do controlador até ele ficar vazio (ou MAX_BURST bytes)."""
+        count = 0
+        while count < MAX_BURST:
+            try:
+                self.i2c.readfrom_into(KBD_I2C_ADDR, self._byte)
+            except OSError:
+                break
+            code = self._byte[0]
+            if not code:
+                break
+            self._push(code, count == 0)
+            count += 1
+        return count
+
+    def _push(self, code, first=True):
+        now = time.ticks_ms()
+        mods = decode_modifiers(code)
+        if first and code == self._last_code and time.ticks_diff(now, self._last_time) < REPEAT_WINDOW_MS:
+            mods |= MOD_REPEAT
+        self._last_code = code
+        self._last_time = now
+        if mods & MOD_REPEAT and code in self.no_repeat:
+            return
+
+        nxt = (self._tail + 1) % BUFFER_SIZE
+        if nxt == self._head:
+            self.dropped += 1
+            return
+        self._codes[self._tail] = code
+        self._mods[self._tail] = mods
+        self._tail = nxt
+
+        if self.event_queue is not None:
+            self.event_queue.push(3, code, mods) # EV_KEY
+        if self._flag:
+            self._flag.set()
+
+    def available(self):
+        return (self._tail - self._head) % BUFFER_SIZE
+
+    def clear(self):
+        self._head = self._tail
+
+    def read_event(self):
+        """Retira a próxima tecla como (código, modificadores), ou None."""
+        if self._head == self._tail:
+            return None
+        i = self._head
+        self._head = (i + 1) % BUFFER_SIZE
+        return self._codes[i], self._mods[i]
+
+    def get_key(self):
+        """Mesmo retorno do antigo get_key_simple: bytes de 1 tecla ou None."""
+        if self._head == self._tail:
+            return None
+        i = self._head
+        self._head = (i + 1) % BUFFER_SIZE
+        return bytes((self._codes[i],))
+
+    async def get(self):
+        """Aguarda a próxima tecla e a retorna como (código, modificadores)."""
+        while self._head == self._tail:
+            await self._flag.wait()
+        return self.read_event()
+
+
+_shared = None
+
+
+def get_keyboard(i2c):
+    """Retorna o serviço de teclado compartilhado, criando-o e iniciando-o na primeira vez."""
+    global _shared
+    if _shared is None:
+        _shared = KeyboardService(i2c)
+        _shared.start()
+    return _shared
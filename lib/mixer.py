@@ -0,0 +1,331 @@
+"""
+Mixer Module
+
+Mixer PCM de várias vozes para a saída I2S (16 bits, mono).
+
+Cada voz entrega blocos de amostras int16 (ToneVoice a partir de ciclos de
+onda em cache, WavVoice lendo um .wav do SD em blocos fixos com readinto).
+O mixer soma as vozes com saturação num anel de RING_BUFFERS buffers de
+saída. A memória usada é constante, qualquer que seja o tamanho do áudio.
+
+Vozes que leem do SD nunca são mixadas no callback do I2S: o callback é
+agendado entre dois bytecodes quaisquer do programa, e o SD divide o
+barramento SPI com o display. Para elas, pump() mixa nos buffers livres no
+programa principal: a cada play(), na tarefa run() do launcher e em apps
+que tocam arquivos longos (chamando sound.pump() no seu loop); sem pump()
+a saída para quando o anel esvazia e volta no próximo pump(). Enquanto só
+houver vozes em memória (in_memory, como os efeitos de ToneVoice), o
+próprio callback reabastece o anel, e um efeito toca inteiro mesmo dentro
+de um app que nunca chama pump().
+
+    mixer = Mixer(i2s)
+    slot = mixer.play(WavVoice('/sd/music/tema.wav', volume=64, loop=True))
+    mixer.play(ToneVoice(((ciclo, 15),)), EFFECT_SLOT)
+    mixer.pump() # no loop
+    mixer.stop(slot)
+
+Volume por voz em ponto fixo: 256 = ganho unitário.
+"""
+
+import struct
+from array import array
+from lib.native import VIPER
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+SAMPLE_RATE = 22_050
+CHUNK_SAMPLES = 512 # ~23 ms por bloco a 22050 Hz
+MAX_VOICES = 4
+RING_BUFFERS = 3 # ~70 ms mixados à frente, além do buffer interno do I2S
+PUMP_PERIOD_MS = 20
+EFFECT_SLOT = 0 # Slot reservado para os efeitos da interface
+UNITY_VOLUME = 256
+
+
+def _mix_py(out, src, n, volume):
+    """Soma src*volume/256 em out com saturação em int16 (versão em Python, para o PC)."""
+    for i in range(n):
+        v = out[i] + ((src[i] * volume) >> 8)
+        out[i] = 32767 if v > 32767 else (-32768 if v < -32768 else v)
+
+
+_mix_into = _mix_py
+
+if VIPER: # Viper no aparelho, Python no PC (ver lib/native.py)
+    import micropython
+
+    @micropython.viper
+    def _mix_viper(out, src, n: int, volume: int):
+        o = ptr16(out)
+        s = ptr16(src)
+        for i in range(n):
+            a = o[i]
+            if a & 0x8000:
+                a -= 0x10000
+            b = s[i]
+            if b & 0x8000:
+                b -= 0x10000
+            v = a + ((b * volume) >> 8)
+            if v > 32767:
+                v = 32767
+            elif v < -32768:
+                v = -32768
+            o[i] = v & 0xFFFF
+
+    _mix_into = _mix_viper
+
+
+class ToneVoice:
+    """Toca uma sequência de (ciclo int16, repetições)."""
+
+    in_memory = True # Não lê o SD: pode ser mixada no callback do I2S
+
+    def __init__(self, segments, volume=UNITY_VOLUME):
+        self.volume = volume
+        self._segments = [(memoryview(cycle), cycles * len(cycle)) for cycle, cycles in segments]
+        self._seg = 0
+        self._pos = 0 # amostras já tocadas do segmento atual
+
+    def read(self, buf, n):
+        """Escreve até n amostras em buf. Retorna quantas foram escritas (0 = fim)."""
+        out = memoryview(buf)
+        written = 0
+        while written < n and self._seg < len(self._segments):
+            cycle, total = self._segments[self._seg]
+            period = len(cycle)
+            offset = self._pos % period
+            take = min(n - written, period - offset, total - self._pos)
+            out[written:written + take] = cycle[offset:offset + take]
+            written += take
+            self._pos += take
+            if self._pos >= total:
+                self._seg += 1
+                self._pos = 0
+        return written
+
+    def close(self):
+        pass
+
+
+def read_wav_header(f):
+    """
+    Percorre os chunks RIFF de um WAV até 'data'. Retorna (formato, canais,
+    taxa, bits, block_align, início dos dados, tamanho dos dados), com o
+    arquivo posicionado no início dos dados.
+    """
+    riff = f.read(12)
+    if len(riff) < 12 or riff[0:4] != b'RIFF' or riff[8:12] != b'WAVE':
+        raise ValueError("Arquivo não é WAV")
+    fmt = None
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            raise ValueError("WAV sem chunk 'data'")
+        chunk_id = header[0:4]
+        size = struct.unpack('<I', header[4:8])[0]
+        if chunk_id == b'fmt ':
+            data = f.read(size + (size & 1))
+            audio_format, channels, rate = struct.unpack('<HHI', data[0:8])
+            block_align, bits = struct.unpack('<HH', data[12:16])
+            fmt = (audio_format, channels, rate, bits, block_align)
+        elif chunk_id == b'data':
+            if fmt is None:
+                raise ValueError("WAV sem chunk 'fmt '")
+            return fmt + (f.tell(), size)
+        else:
+            f.seek(size + (size & 1), 1) # Chunks são alinhados em 2 bytes
+
+
+class WavVoice:
+    """Lê um WAV PCM 16 bits mono do SD em blocos, sem carregá-lo na memória."""
+
+    in_memory = False
+
+    def __init__(self, path, volume=UNITY_VOLUME, loop=False):
+        self.volume = volume
+        self.loop = loop
+        self._file = open(path, 'rb')
+        try:
+            audio_format, channels, rate, bits, _, self._data_start, self._data_size = \
+                read_wav_header(self._file)
+            if audio_format != 1 or channels != 1 or bits != 16 or rate != SAMPLE_RATE:
+                raise ValueError(f"WAV precisa ser PCM 16 bits mono {SAMPLE_RATE} Hz")
+        except Exception:
+            self._file.close()
+            raise
+        self._remaining = self._data_size
+
+    def read(self, buf, n):
+        out = memoryview(buf)
+        written = 0
+        while written < n:
+            if self._remaining <= 0:
+                if not self.loop:
+                    break
+                self._file.seek(self._data_start)
+                self._remaining = self._data_size
+            count = min(n - written, self._remaining // 2)
+            got = self._file.readinto(out[written:written + count])
+            if not got:
+                self._remaining = 0
+                if not self.loop:
+                    break
+                continue
+            written += got // 2
+            self._remaining -= got
+        return written
+
+    def close(self):
+        self._file.close()
+
+
+class Mixer:
+    """
+    Os contadores do anel só crescem (módulo 2 * RING_BUFFERS): _filled é
+    escrito por pump() ou pelo callback só com _pumping falso, _done e
+    _issued só pelo callback (ou por pump() com a saída parada, quando não
+    há callback pendente). O callback roda entre dois bytecodes do programa
+    principal, nunca em paralelo: com _pumping verdadeiro ele não mexe no
+    que pump() está mixando.
+    """
+
+    def __init__(self, i2s, voices=MAX_VOICES, chunk=CHUNK_SAMPLES, buffers=RING_BUFFERS):
+        self.i2s = i2s
+        self.voices = [None] * voices
+        self.chunk = chunk
+        self._ring = [array('h', bytes(2 * chunk)) for _ in range(buffers)]
+        self._lengths = array('H', bytes(2 * buffers)) # amostras mixadas em cada buffer
+        self._wrap = 2 * buffers
+        self._filled = 0 # buffers mixados
+        self._issued = 0 # buffers entregues ao I2S
+        self._done = 0   # buffers que o I2S já consumiu
+        self._scratch = array('h', bytes(2 * chunk))
+        self._silence = memoryview(array('h', bytes(2 * chunk)))
+        self._running = False
+        self._pumping = False
+        self._write_ref = self._on_written # Evita alocar o método ligado na IRQ
+
+        # Saída não bloqueante, se o firmware tiver I2S.irq
+        self._async = False
+        try:
+            i2s.irq(self._write_ref)
+            self._async = True
+        except (AttributeError, OSError):
+            pass
+
+    def play(self, voice, slot=None):
+        """
+        Adiciona uma voz. Sem slot, usa o primeiro livre depois de
+        EFFECT_SLOT (ou o último, substituindo-o). Retorna o slot usado.
+        """
+        if slot is None:
+            slot = len(self.voices) - 1
+            for i in range(EFFECT_SLOT + 1, len(self.voices)):
+                if self.voices[i] is None:
+                    slot = i
+                    break
+        self.stop(slot)
+        self.voices[slot] = voice
+        self.pump()
+        return slot
+
+    def stop(self, slot=None):
+        """Para a voz do slot (ou todas). O que já foi mixado ainda toca."""
+        slots = range(len(self.voices)) if slot is None else (slot,)
+        for i in slots:
+            voice = self.voices[i]
+            if voice is not None:
+                self.voices[i] = None
+                voice.close()
+
+    def active(self):
+        return self._running or any(v is not None for v in self.voices)
+
+    def _mix(self, out):
+        """Mixa o próximo bloco de todas as vozes em out. Retorna o número de amostras."""
+        memoryview(out)[:] = self._silence
+        n = 0
+        for i, voice in enumerate(self.voices):
+            if voice is None:
+                continue
+            got = voice.read(self._scratch, self.chunk)
+            if got:
+                _mix_into(out, self._scratch, got, voice.volume)
+                if got > n:
+                    n = got
+            if got < self.chunk:
+                # A voz terminou
+                self.voices[i] = None
+                voice.close()
+        return n
+
+    def _in_memory(self):
+        """True se nenhuma voz ativa lê do SD."""
+        for voice in self.voices:
+            if voice is not None and not getattr(voice, 'in_memory', False):
+                return False
+        return True
+
+    def _fill(self):
+        """Mixa nos buffers livres do anel."""
+        ring = len(self._ring)
+        while self._pending() < ring:
+            i = self._filled % ring
+            n = self._mix(self._ring[i])
+            if not n:
+                break
+            self._lengths[i] = n
+            self._filled = (self._filled + 1) % self._wrap
+
+    def _pending(self):
+        """Buffers mixados que o I2S ainda não consumiu (inclusive o em envio)."""
+        return (self._filled - self._done) % self._wrap
+
+    def _send(self):
+        i = self._issued % len(self._ring)
+        # Avança antes de escrever: o callback pode rodar logo após o write()
+        self._issued = (self._issued + 1) % self._wrap
+        self.i2s.write(memoryview(self._ring[i])[:self._lengths[i]])
+
+    def pump(self):
+        """
+        Mixa nos buffers livres do anel e reinicia a saída se ela parou.
+        Nunca chamar de uma IRQ. Retorna True enquanto houver áudio.
+        """
+        if not self._async:
+            # Firmware sem IRQ: toca tudo de forma bloqueante
+            out = self._ring[0]
+            n = self._mix(out)
+            while n:
+                self.i2s.write(memoryview(out)[:n])
+                n = self._mix(out)
+            return False
+
+        self._pumping = True
+        try:
+            self._fill()
+        finally:
+            self._pumping = False
+        if not self._running and self._issued != self._filled:
+            self._running = True
+            self._send()
+        return self.active()
+
+    async def run(self, period_ms=PUMP_PERIOD_MS):
+        """Tarefa asyncio que mantém o anel cheio."""
+        while True:
+            self.pump()
+            await asyncio.sleep_ms(period_ms)
+
+    def _on_written(self, _):
+        """Callback do I2S: entrega o próximo buffer já mixado; só mixa vozes em memória."""
+        self._done = self._issued
+        if not self._pumping and self._in_memory():
+            self._fill()
+        if self._issued != self._filled:
+            self._send()
+        else:
+            self._running = False
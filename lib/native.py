@@ -0,0 +1,29 @@
+"""
+Native Module
+
+Ponto único da escolha entre as versões viper e Python das rotinas de laço
+apertado: mixagem (lib/mixer.py), decodificação IMA-ADPCM (lib/adpcm.py) e
+expansão do bitmap de 1 bit do app sketch.
+
+O firmware do ESP32-S3 sempre tem o emissor viper, então no aparelho a
+versão viper é a única que roda e não há fallback em tempo de execução. A
+versão em Python só existe para o PC (ferramentas e testes), onde não há o
+módulo 'micropython'; ela é a referência que a versão viper deve seguir.
+
+    from lib.native import VIPER
+
+    _mix_into = _mix_py
+    if VIPER:
+        import micropython
+
+        @micropython.viper
+        def _mix_viper(out, src, n: int, volume: int): ...
+
+        _mix_into = _mix_viper
+"""
+
+try:
+    import micropython # noqa: F401
+    VIPER = True
+except ImportError:
+    VIPER = False
@@ -0,0 +1,175 @@
+"""
+Power Module
+
+Governador de energia por inatividade. Acompanha o último evento de entrada
+e, com o aparelho parado, desce de estado:
+
+    ACTIVE -> (DIM_AFTER_MS)  DIM:   backlight reduzido (PWM), CPU a 80 MHz
+           -> (OFF_AFTER_MS)  OFF:   backlight e painel desligados, e o loop
+                                     dorme em lightsleep entre despertares
+                                     (timer ou clique do trackball)
+
+Qualquer entrada (activity()) restaura o backlight e a frequência da CPU.
+Os 'pollers' (objetos com pause()/resume(), ex. o serviço de teclado) ficam
+parados enquanto a tela está desligada.
+
+Os módulos 'machine' e 'time' podem ser injetados; tools/fake_machine.py
+traz versões com tempo simulado, usadas por tests/test_power.py.
+"""
+
+try:
+    import machine as _machine
+except ImportError:
+    _machine = None
+import time as _time
+
+POWER_CONFIG_FILE = '/sd/config/power.conf'
+
+DEFAULT_DIM_AFTER_MS = 20_000
+DEFAULT_OFF_AFTER_MS = 60_000
+SLEEP_SLICE_MS = 2_000 # lightsleep máximo por chamada (o relógio continua correndo)
+
+ACTIVE_FREQ = 240_000_000
+IDLE_FREQ = 80_000_000
+BACKLIGHT_PWM_FREQ = 1_000
+BACKLIGHT_FULL = 65535
+BACKLIGHT_DIM = 8000
+
+STATE_ACTIVE = 0
+STATE_DIM = 1
+STATE_OFF = 2
+STATE_NAMES = ('ativo', 'reduzido', 'desligado')
+
+
+class PowerGovernor:
+    def __init__(self, backlight_pin, display=None, wake_pin=None, machine=None, time=None, pollers=()):
+        self.machine = machine or _machine
+        self.time = time or _time
+        self.display = display
+        self.wake_pin = wake_pin
+        self.pollers = pollers
+        self.dim_after_ms, self.off_after_ms = self._load_config()
+
+        self.state = STATE_ACTIVE
+        self.last_input = self.time.ticks_ms()
+        self.sleep_ms_total = 0 # tempo total em lightsleep (diagnóstico)
+
+        self._pwm = None
+        try:
+            self._pwm = self.machine.PWM(backlight_pin, freq=BACKLIGHT_PWM_FREQ, duty_u16=BACKLIGHT_FULL)
+        except (AttributeError, ValueError, OSError) as e:
+            print(f"Backlight sem PWM, usando liga/desliga: {e}")
+            self._backlight = backlight_pin
+
+        # O clique do trackball acorda a CPU do lightsleep
+        if wake_pin is not None:
+            try:
+                import esp32
+                esp32.wake_on_ext0(pin=wake_pin, level=0)
+            except (ImportError, AttributeError, ValueError) as e:
+                print(f"Sem despertar por GPIO: {e}")
+
+    def _load_config(self):
+        """Lê 'dim=<s>' e 'off=<s>' (segundos) do arquivo de configuração."""
+        dim_ms, off_ms = DEFAULT_DIM_AFTER_MS, DEFAULT_OFF_AFTER_MS
+        try:
+            with open(POWER_CONFIG_FILE, 'r') as f:
+                for line in f:
+                    key, _, value = line.strip().partition('=')
+                    if key == 'dim':
+                        dim_ms = int(value) * 1000
+                    elif key == 'off':
+                        off_ms = int(value) * 1000
+        except (OSError, ValueError):
+            pass
+        return dim_ms, max(off_ms, dim_ms)
+
+    def _set_backlight(self, duty):
+        if self._pwm is not None:
+            self._pwm.duty_u16(duty)
+        else:
+            self._backlight.value(1 if duty else 0)
+
+    def _set_freq(self, hz):
+        try:
+            if self.machine.freq() != hz:
+                self.machine.freq(hz)
+        except (AttributeError, ValueError):
+            pass
+
+    def _enter(self, state):
+        if state == self.state:
+            return
+        if self.state == STATE_OFF:
+            for poller in self.pollers:
+                poller.resume()
+        if state == STATE_ACTIVE:
+            self._set_freq(ACTIVE_FREQ)
+            if self.state == STATE_OFF and self.display:
+                self.display.sleep_mode(False)
+            self._set_backlight(BACKLIGHT_FULL)
+        elif state == STATE_DIM:
+            self._set_backlight(BACKLIGHT_DIM)
+            self._set_freq(IDLE_FREQ)
+        else:
+            self._set_backlight(0)
+            if self.display:
+                self.display.sleep_mode(True)
+            self._set_freq(IDLE_FREQ)
+            for poller in self.pollers:
+                poller.pause()
+        print(f"Energia: {STATE_NAMES[state]}")
+        self.state = state
+
+    @property
+    def screen_on(self):
+        return self.state != STATE_OFF
+
+    def activity(self):
+        """
+        Registra uma entrada do usuário e restaura o estado ativo. Retorna True
+        se a tela estava desligada (a entrada só serviu para acordar).
+        """
+        was_off = self.state == STATE_OFF
+        self.last_input = self.time.ticks_ms()
+        self._enter(STATE_ACTIVE)
+        return was_off
+
+    def idle_ms(self):
+        return self.time.ticks_diff(self.time.ticks_ms(), self.last_input)
+
+    def update(self):
+        """Aplica as transições por inatividade. Chamar a cada volta do loop."""
+        idle = self.idle_ms()
+        if idle >= self.off_after_ms:
+            self._enter(STATE_OFF)
+        elif idle >= self.dim_after_ms:
+            self._enter(STATE_DIM)
+        return self.state
+
+    def next_deadline_ms(self):
+        """Quanto falta para a próxima transição (para dimensionar a espera do loop)."""
+        idle = self.idle_ms()
+        if self.state == STATE_ACTIVE:
+            return max(0, self.dim_after_ms - idle)
+        if self.state == STATE_DIM:
+            return max(0, self.off_after_ms - idle)
+        return SLEEP_SLICE_MS
+
+    def sleep(self, max_ms=SLEEP_SLICE_MS):
+        """
+        Com a tela desligada, dorme em lightsleep por até max_ms. Retorna cedo
+        se o pino de despertar for acionado; quem chama verifica as entradas.
+        """
+        if self.state != STATE_OFF:
+            return
+        start = self.time.ticks_ms()
+        try:
+            self.machine.lightsleep(min(max_ms, SLEEP_SLICE_MS))
+        except AttributeError:
+            self.time.sleep_ms(min(max_ms, SLEEP_SLICE_MS))
+        self.sleep_ms_total += self.time.ticks_diff(self.time.ticks_ms(), start)
+
+    def wake_requested(self):
+        """True se o pino de despertar está acionado (ex.: clique pressionado)."""
+        return self.wake_pin is not None and self.wake_pin.value() == 0
@@ -1,12 +1,42 @@
-"""Sound effects module for T-Deck"""
+"""Sound effects module for T-Deck
+
+Os efeitos são sequências de (frequência, ciclos). Um ciclo de cada onda é
+calculado uma única vez por (frequência, volume) e guardado num cache
+limitado.
+
+A saída passa pelo Mixer (lib/mixer.py): os efeitos tocam no slot
+EFFECT_SLOT (um novo efeito substitui o anterior) e podem se sobrepor a
+arquivos WAV (PCM ou IMA-ADPCM, ver lib/adpcm.py) tocados do SD com
+play_wav(), sem bloquear quem chamou. Sem WAV tocando, o próprio callback
+do I2S mixa o resto do efeito; com um WAV, quem o toca chama pump() no seu
+loop (no launcher, a tarefa do mixer faz isso).
+"""
 
 from machine import Pin, I2S
+from array import array
 import os as _os
 import math
-import struct
+from lib.mixer import Mixer, ToneVoice, EFFECT_SLOT
+from lib.adpcm import open_wav
 
 SOUND_CONFIG_FILE = '/sd/config/sound.conf'
 
+WAVE_CACHE_SIZE = 8 # ciclos de onda (frequência, volume) mantidos em memória
+# Buffer interno do I2S: menor que os 40000 bytes de antes para que um efeito
+# não espere quase 1 s atrás de um WAV já enfileirado (~185 ms a 22050 Hz).
+I2S_IBUF_SIZE = 8192
+
+# Ganho de WAV por nível de volume (256 = original), na mesma escala dos tons
+VOLUME_GAIN = (0, 8, 16, 32, 64)
+
+# Efeitos: sequência de (frequência em Hz, número de ciclos)
+EFFECTS = {
+    'touch_select': ((330, 60),),          # Lower tone (E4), medium length
+    'navigation': ((880, 15),),            # High tone (A5), very short
+    'keypress': ((660, 25),),              # Medium-high (E5), short
+    'confirm': ((523, 40), (659, 40)),     # C5 + E5, two-tone
+}
+
 class SoundManager:
     def __init__(self):
         self.volume_level = 3 # Nível padrão (0-4), 0 é mudo
@@ -21,12 +51,15 @@ class SoundManager:
                       bits=16,
                       format=I2S.MONO,
                       rate=22050,
-                      ibuf=40000)
+                      ibuf=I2S_IBUF_SIZE)
 
         self.TONE_FREQUENCY_IN_HZ = 440
         self.SAMPLE_SIZE_IN_BITS = 16
         self.SAMPLE_RATE_IN_HZ = 22_050
 
+        self._waves = [] # [((frequência, volume), ciclo)], do mais antigo ao mais recente
+        self.mixer = Mixer(self.i2s)
+
     def _load_volume(self):
         """Carrega o nível de volume salvo no arquivo de configuração."""
         try:
@@ -48,81 +81,84 @@ class SoundManager:
             # Garante que o diretório /sd/config exista
             try: _os.mkdir('/sd/config')
             except OSError: pass
-            
+
             with open(SOUND_CONFIG_FILE, 'w') as f:
                 f.write(str(self.volume_level))
         except OSError as e:
             print(f"Erro ao salvar config de som: {e}")
 
     def make_tone(self, rate, bits, frequency):
-        """Create a buffer containing the pure tone samples"""
+        """Return an int16 array with one cycle of a pure tone (cached per frequency/volume)"""
+        key = (rate, bits, frequency, self.volume_level)
+        for i, (cached_key, samples) in enumerate(self._waves):
+            if cached_key == key:
+                if i != len(self._waves) - 1:
+                    self._waves.append(self._waves.pop(i))
+                return samples
+
         samples_per_cycle = rate // frequency
-        sample_size_in_bytes = bits // 8
-        samples = bytearray(samples_per_cycle * sample_size_in_bytes)
+        samples = array('h', bytes(2 * samples_per_cycle))
         # Mapeia o nível de volume para um fator de redução (quanto menor, mais alto o som)
         volume_map = [0, 32, 16, 8, 4] # 0:mudo, 1:baixo, 2:médio, 3:alto, 4:máximo
         volume_reduction_factor = volume_map[self.volume_level]
         range_val = pow(2, bits) // 2 // volume_reduction_factor
 
-        if bits == 16:
-            format_str = "<h"
-        else:  # assume 32 bits
-            format_str = "<l"
-
+        # Onda centrada em zero, para poder ser somada a outras vozes
         for i in range(samples_per_cycle):
-            sample = range_val + int((range_val - 1) * math.sin(2 * math.pi * i / samples_per_cycle))
-            struct.pack_into(format_str, samples, i * sample_size_in_bytes, sample)
+            samples[i] = int((range_val - 1) * math.sin(2 * math.pi * i / samples_per_cycle))
 
+        self._waves.append((key, samples))
+        if len(self._waves) > WAVE_CACHE_SIZE:
+            self._waves.pop(0)
         return samples
 
-    def play_touch_select(self):
-        """Play sound for touch field selection - low, pleasant tone"""
+    def play(self, name):
+        """Toca um efeito de EFFECTS sem bloquear, substituindo o efeito anterior."""
         if self.volume_level == 0: return
-        click = self.make_tone(self.SAMPLE_RATE_IN_HZ, self.SAMPLE_SIZE_IN_BITS, 330)  # Lower tone (E4)
-        tone = bytearray()
+        segments = [(self.make_tone(self.SAMPLE_RATE_IN_HZ, self.SAMPLE_SIZE_IN_BITS, frequency), cycles)
+                    for frequency, cycles in EFFECTS[name]]
+        self.mixer.play(ToneVoice(segments), EFFECT_SLOT)
+
+    def play_wav(self, path, volume=None, loop=False):
+        """
+        Toca um WAV (PCM 16 bits ou IMA-ADPCM, mono 22050 Hz) do SD em
+        streaming, junto com os efeitos. Retorna o slot da voz (para stop())
+        ou None se falhar.
+        """
+        if volume is None:
+            volume = VOLUME_GAIN[self.volume_level]
+        try:
+            return self.mixer.play(open_wav(path, volume, loop))
+        except (OSError, ValueError) as e:
+            print(f"Erro ao tocar '{path}': {e}")
+            return None
 
-        for i in range(60):  # Medium length
-            tone = tone + click
+    def pump(self):
+        """Mixa o próximo trecho do áudio em streaming (ver Mixer.pump)."""
+        return self.mixer.pump()
 
-        self.i2s.write(tone)
+    def stop(self, slot=None):
+        """Para uma voz (ou todo o áudio)."""
+        self.mixer.stop(slot)
 
-    def play_navigation(self):
-        """Play sound for navigation (trackball movement) - quick, high-pitched beep"""
-        if self.volume_level == 0: return
-        click = self.make_tone(self.SAMPLE_RATE_IN_HZ, self.SAMPLE_SIZE_IN_BITS, 880)  # High tone (A5)
-        tone = bytearray()
+    def is_playing(self):
+        return self.mixer.active()
 
-        for i in range(15):  # Very short
-            tone = tone + click
+    def play_touch_select(self):
+        """Play sound for touch field selection - low, pleasant tone"""
+        self.play('touch_select')
 
-        self.i2s.write(tone)
+    def play_navigation(self):
+        """Play sound for navigation (trackball movement) - quick, high-pitched beep"""
+        self.play('navigation')
 
     def play_keypress(self):
         """Play sound for key press - crisp, short click"""
-        if self.volume_level == 0: return
-        click = self.make_tone(self.SAMPLE_RATE_IN_HZ, self.SAMPLE_SIZE_IN_BITS, 660)  # Medium-high (E5)
-        tone = bytearray()
-
-        for i in range(25):  # Short
-            tone = tone + click
-
-        self.i2s.write(tone)
+        self.play('keypress')
 
     def play_confirm(self):
         """Play sound for confirmation (Enter/trackball click) - satisfying, two-tone"""
-        if self.volume_level == 0: return
-        # First tone
-        click1 = self.make_tone(self.SAMPLE_RATE_IN_HZ, self.SAMPLE_SIZE_IN_BITS, 523)  # C5
-        tone = bytearray()
-        for i in range(40):
-            tone = tone + click1
-
-        # Second tone (higher)
-        click2 = self.make_tone(self.SAMPLE_RATE_IN_HZ, self.SAMPLE_SIZE_IN_BITS, 659)  # E5
-        for i in range(40):
-            tone = tone + click2
-
-        self.i2s.write(tone)
+        self.play('confirm')
 
     def play_click(self):
         """Legacy method - now uses play_confirm for backward compatibility"""
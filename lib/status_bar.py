@@ -0,0 +1,147 @@
+"""
+Status Bar Module
+
+Barra de status (data/hora e bateria) que redesenha só o que mudou.
+
+O texto de cada campo é guardado depois de desenhado; a cada update() o novo
+texto é comparado caractere a caractere e apenas os glifos diferentes são
+redesenhados (normalmente só o dígito dos minutos, uma vez por minuto). A
+bateria é lida do ADC em intervalos longos, com média móvel.
+
+Os apps podem usar a mesma barra como overlay no topo da tela:
+
+    bar = get_status_bar(display)
+    bar.draw()      # ao (re)desenhar a tela inteira
+    bar.update()    # no loop do app; barato quando nada mudou
+"""
+
+import time
+import st7789py as st7789
+from romfonts import vga1_8x8 as font
+
+try:
+    from machine import ADC, Pin
+except ImportError:
+    ADC = None
+
+STATUS_BAR_HEIGHT = 20
+STATUS_BAR_BG_COLOR = st7789.color565(10, 10, 15)
+
+BATTERY_ADC_PIN = 4
+BATTERY_DIVIDER = 2 # O T-Deck mede a bateria por um divisor resistivo 1:1
+BATTERY_EMPTY_MV = 3300
+BATTERY_FULL_MV = 4200
+BATTERY_SAMPLE_MS = 30_000
+BATTERY_SMOOTHING = 4 # peso da média móvel (1/N da nova leitura)
+
+
+class StatusBar:
+    def __init__(self, display, fg=st7789.WHITE, bg=STATUS_BAR_BG_COLOR, height=STATUS_BAR_HEIGHT):
+        self.display = display
+        self.fg = fg
+        self.bg = bg
+        self.height = height
+        self._text_y = (height - font.HEIGHT) // 2
+        self._shown = {} # campo -> texto desenhado na tela
+        self._clock_key = None
+        self._clock_str = ''
+
+        self._adc = None
+        self._battery_mv = 0
+        self._battery_str = "Bat: --%"
+        self._last_sample = None
+        if ADC is not None:
+            try:
+                self._adc = ADC(Pin(BATTERY_ADC_PIN), atten=ADC.ATTN_11DB)
+            except (ValueError, OSError, AttributeError) as e:
+                print(f"ADC da bateria indisponível: {e}")
+
+    # --- Fontes de texto (com cache) ---
+
+    def clock_text(self):
+        """Data e hora formatadas; só re-formata quando o minuto muda."""
+        now = time.localtime()
+        key = (now[2], now[1], now[3], now[4])
+        if key != self._clock_key:
+            self._clock_key = key
+            self._clock_str = f"{now[2]:02d}/{now[1]:02d} {now[3]:02d}:{now[4]:02d}"
+        return self._clock_str
+
+    def battery_percent(self):
+        if not self._battery_mv:
+            return None
+        span = BATTERY_FULL_MV - BATTERY_EMPTY_MV
+        return max(0, min(100, (self._battery_mv - BATTERY_EMPTY_MV) * 100 // span))
+
+    def sample_battery(self, force=False):
+        """Lê o ADC se o intervalo passou, suavizando as leituras."""
+        now = time.ticks_ms()
+        if not force and self._last_sample is not None and \
+                time.ticks_diff(now, self._last_sample) < BATTERY_SAMPLE_MS:
+            return
+        self._last_sample = now
+        if self._adc is None:
+            return
+        try:
+            mv = self._adc.read_uv() * BATTERY_DIVIDER // 1000
+        except OSError:
+            return
+        if self._battery_mv:
+            self._battery_mv += (mv - self._battery_mv) // BATTERY_SMOOTHING
+        else:
+            self._battery_mv = mv
+        percent = self.battery_percent()
+        # Largura fixa, para a posição dos glifos não mudar
+        self._battery_str = f"Bat:{percent:3d}%"
+
+    def battery_text(self):
+        self.sample_battery()
+        return self._battery_str
+
+    # --- Desenho ---
+
+    def _draw_field(self, name, text, x, full):
+        """Desenha um campo; sem 'full', só os caracteres que mudaram."""
+        old = self._shown.get(name)
+        if full or old is None or len(old) != len(text):
+            self.display.text(font, text, x, self._text_y, self.fg, self.bg)
+        else:
+            for i in range(len(text)):
+                if text[i] != old[i]:
+                    self.display.text(font, text[i], x + i * font.WIDTH, self._text_y, self.fg, self.bg)
+        self._shown[name] = text
+
+    def _fields(self):
+        battery = self.battery_text()
+        battery_x = self.display.width - len(battery) * font.WIDTH - 5
+        return (('clock', self.clock_text(), 5), ('battery', battery, battery_x))
+
+    def draw(self):
+        """Redesenha a barra inteira (após limpar a tela, por exemplo)."""
+        self.display.fill_rect(0, 0, self.display.width, self.height, self.bg)
+        for name, text, x in self._fields():
+            self._draw_field(name, text, x, True)
+
+    def update(self):
+        """Atualiza só os glifos que mudaram desde o último desenho."""
+        if not self._shown:
+            self.draw()
+            return
+        for name, text, x in self._fields():
+            if self._shown.get(name) != text:
+                self._draw_field(name, text, x, False)
+
+    def invalidate(self):
+        """Força o próximo update() a redesenhar tudo (ex.: a tela foi sobrescrita)."""
+        self._shown = {}
+
+
+_shared = None
+
+
+def get_status_bar(display):
+    """Retorna a barra de status compartilhada (o cache da bateria vale para todos)."""
+    global _shared
+    if _shared is None or _shared.display is not display:
+        _shared = StatusBar(display)
+    return _shared
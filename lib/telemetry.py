@@ -0,0 +1,185 @@
+"""
+Telemetry Module
+
+Registra métricas de cada lançamento de app em um log binário circular de
+tamanho fixo no SD card, para descobrir quais apps otimizar primeiro.
+
+Cada registro guarda: nome do app, horário, tempo de carga (compilação do
+fonte ou validação do bytecode), tempo até o primeiro desenho na tela, tempo total,
+pico de heap (amostrado enquanto o app desenha, ver lib/app_runner.py),
+maior bloco livre ao sair (só com probe_heap, ver abaixo), motivo de saída
+e flags.
+
+As escritas no SD são limitadas: os registros esperam na memória e vão
+juntos, no máximo uma vez a cada WRITE_INTERVAL_S ou ao acumular
+MAX_PENDING. flush() grava o que falta; o launcher o chama antes de
+dormir, e um app que sai com erro é gravado na hora (um reset pode vir
+em seguida).
+
+Medir o maior bloco livre exige alocações de teste (o MicroPython não expõe
+esse valor), então é opcional e limitado a PROBE_LIMIT bytes.
+"""
+
+import struct
+import time
+import os as _os # Importa 'os' com um alias para evitar conflitos
+
+TELEMETRY_FILE = '/sd/config/telemetry.bin'
+CAPACITY = 64 # registros no arquivo circular
+PROBE_LIMIT = 64 * 1024 # Maior bloco livre medido (acima disso, registra o limite)
+PROBE_STEP = 1024 # Resolução da medida
+WRITE_INTERVAL_S = 60 # Intervalo mínimo entre escritas no SD
+MAX_PENDING = 8 # Registros em memória que forçam uma escrita
+
+_MAGIC = b'TLM1'
+_HEADER_FMT = '<4sHH' # magic, capacidade, próximo índice
+_RECORD_FMT = '<12sIHHHIIBB'
+_HEADER_SIZE = struct.calcsize(_HEADER_FMT)
+RECORD_SIZE = struct.calcsize(_RECORD_FMT)
+
+# Motivos de saída
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_MEMORY = 2
+EXIT_SUSPENDED = 3
+EXIT_REASONS = ('ok', 'erro', 'memoria', 'suspenso')
+
+# Flags
+FLAG_BYTECODE = 0x01
+FLAG_RESUMED = 0x02
+
+
+class LaunchRecord:
+    """Métricas de um lançamento. Tempos em ms, memória em bytes."""
+
+    def __init__(self, name):
+        self.name = name
+        self.timestamp = time.time()
+        self.load_ms = 0
+        self.first_frame_ms = 0
+        self.run_ms = 0
+        self.heap_peak = 0
+        self.largest_free = 0
+        self.exit_reason = EXIT_OK
+        self.flags = 0
+
+    def pack(self):
+        return struct.pack(_RECORD_FMT, self.name.encode()[:12], self.timestamp,
+                           min(self.load_ms, 0xFFFF), min(self.first_frame_ms, 0xFFFF),
+                           min(self.run_ms // 1000, 0xFFFF), self.heap_peak,
+                           self.largest_free, self.exit_reason, self.flags)
+
+    @classmethod
+    def unpack(cls, data):
+        name, timestamp, load_ms, first_frame_ms, run_s, heap_peak, largest_free, exit_reason, flags = \
+            struct.unpack(_RECORD_FMT, data)
+        record = cls(name.rstrip(b'\x00').decode())
+        record.timestamp = timestamp
+        record.load_ms = load_ms
+        record.first_frame_ms = first_frame_ms
+        record.run_ms = run_s * 1000
+        record.heap_peak = heap_peak
+        record.largest_free = largest_free
+        record.exit_reason = exit_reason
+        record.flags = flags
+        return record
+
+
+def largest_free_block(limit=PROBE_LIMIT):
+    """
+    Estima o maior bloco livre do heap (até 'limit') por busca binária de
+    alocações: no máximo log2(limit / PROBE_STEP) tentativas.
+    (micropython.mem_info() só imprime no console, não retorna valores.)
+    """
+    lo, hi = 0, limit + 1
+    while hi - lo > PROBE_STEP:
+        mid = (lo + hi) // 2
+        try:
+            probe = bytearray(mid)
+            del probe
+            lo = mid
+        except MemoryError:
+            hi = mid
+    return lo
+
+
+class Telemetry:
+    def __init__(self, path=TELEMETRY_FILE, probe_heap=False):
+        self.path = path
+        self.probe_heap = probe_heap # Mede o maior bloco livre ao fim de cada app
+        self._pending = [] # Registros empacotados ainda não gravados
+        self._last_write = None # time.time() da última escrita
+
+    def record(self, launch_record):
+        """Guarda um registro; grava no SD se já passou o intervalo (ou se o app falhou)."""
+        self._pending.append(launch_record.pack())
+        if launch_record.exit_reason in (EXIT_ERROR, EXIT_MEMORY) or len(self._pending) >= MAX_PENDING \
+                or self._last_write is None or time.time() - self._last_write >= WRITE_INTERVAL_S:
+            self.flush()
+
+    def flush(self):
+        """Grava os registros pendentes nas próximas posições do anel."""
+        if not self._pending:
+            return
+        try:
+            f, next_index = self._open_log()
+            try:
+                for data in self._pending:
+                    f.seek(_HEADER_SIZE + next_index * RECORD_SIZE)
+                    f.write(data)
+                    next_index = (next_index + 1) % CAPACITY
+                f.seek(0)
+                f.write(struct.pack(_HEADER_FMT, _MAGIC, CAPACITY, next_index))
+            finally:
+                f.close()
+            self._pending = []
+            self._last_write = time.time()
+        except OSError as e:
+            print(f"Erro ao gravar telemetria: {e}")
+
+    def _open_log(self):
+        """Abre o log para leitura/escrita, criando-o vazio se necessário."""
+        try:
+            f = open(self.path, 'r+b')
+            magic, capacity, next_index = struct.unpack(_HEADER_FMT, f.read(_HEADER_SIZE))
+            if magic == _MAGIC and capacity == CAPACITY:
+                return f, next_index
+            f.close()
+        except (OSError, ValueError):
+            pass
+        try: _os.mkdir(self.path.rsplit('/', 1)[0])
+        except OSError: pass
+        f = open(self.path, 'w+b')
+        f.write(struct.pack(_HEADER_FMT, _MAGIC, CAPACITY, 0))
+        f.write(bytes(RECORD_SIZE * CAPACITY))
+        return f, 0
+
+    def read_all(self):
+        """Retorna todos os registros (inclusive os pendentes), do mais antigo ao mais novo."""
+        records = []
+        try:
+            with open(self.path, 'rb') as f:
+                magic, capacity, next_index = struct.unpack(_HEADER_FMT, f.read(_HEADER_SIZE))
+                if magic == _MAGIC:
+                    buf = bytearray(RECORD_SIZE)
+                    for i in range(capacity):
+                        f.seek(_HEADER_SIZE + ((next_index + i) % capacity) * RECORD_SIZE)
+                        if f.readinto(buf) == RECORD_SIZE and buf[0]:
+                            records.append(LaunchRecord.unpack(buf))
+        except (OSError, ValueError):
+            pass
+        records.extend(LaunchRecord.unpack(data) for data in self._pending)
+        return records[-CAPACITY:]
+
+    def summary(self):
+        """
+        Agrega os registros por app: {nome: (pior tempo até o primeiro
+        desenho em ms, maior pico de heap, lançamentos)}. O tempo até o
+        primeiro desenho é contado desde o início do lançamento e já inclui
+        a carga; sem desenho registrado, usa o tempo de carga.
+        """
+        stats = {}
+        for r in self.read_all():
+            slow, heap, count = stats.get(r.name, (0, 0, 0))
+            stats[r.name] = (max(slow, r.first_frame_ms or r.load_ms), max(heap, r.heap_peak), count + 1)
+        return stats
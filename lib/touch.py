@@ -3,12 +3,21 @@
 
 import machine
 import time
+import micropython
+from array import array
 
 # Endereços de registradores do GT911
 _GT911_I2C_ADDR = 0x5D
 _GT911_READ_COORD_ADDR = 0x814E
 _GT911_CONFIG_ADDR = 0x8047
 
+_GT911_MAX_POINTS = 5
+_GT911_POINT_SIZE = 8
+# Status (1 byte) + 5 pontos de 8 bytes, lidos numa única transação
+_GT911_BURST_SIZE = 1 + _GT911_MAX_POINTS * _GT911_POINT_SIZE
+
+_SAMPLE_RING_SIZE = 64
+
 class Touch:
     """
     Driver de Touch para o T-Deck (GT911) em MicroPython.
@@ -19,6 +28,13 @@ class Touch:
     - Arrastar (Drag)
 
     Após um arrasto, não dispara Tap/LongTap ao soltar.
+
+    Com o pino de interrupção configurado, cada pulso do INT agenda (via
+    micropython.schedule) uma leitura em rajada do status e dos 5 pontos.
+    As amostras vão para um buffer circular com timestamp e são consumidas
+    pela máquina de gestos em read() ou, uma a uma, por read_points(). Sem
+    toque, o barramento I2C fica parado. Sem o pino, read() faz a mesma
+    leitura em rajada por polling.
     """
 
     # Tipos de Eventos
@@ -50,8 +66,33 @@ class Touch:
         self.swap_xy = swap_xy
         self.mirror_y = mirror_y
 
+        # Buffers pré-alocados da leitura em rajada
+        self._burst = bytearray(_GT911_BURST_SIZE)
+        self._clear = bytearray(1)
+
+        # Último quadro lido: todos os pontos (multi-touch), já transformados
+        self.point_count = 0
+        self.points_x = array('h', bytes(2 * _GT911_MAX_POINTS))
+        self.points_y = array('h', bytes(2 * _GT911_MAX_POINTS))
+
+        # Buffer circular de amostras do ponto principal: x, y, ms, pressionado
+        self._ring_x = array('h', bytes(2 * _SAMPLE_RING_SIZE))
+        self._ring_y = array('h', bytes(2 * _SAMPLE_RING_SIZE))
+        self._ring_t = array('I', bytes(4 * _SAMPLE_RING_SIZE))
+        self._ring_down = bytearray(_SAMPLE_RING_SIZE)
+        self._head = 0
+        self._tail = 0
+        self.dropped = 0
+
+        self.event_queue = None # Fila opcional de lib/events.py
+        self._irq_mode = False
+        self._read_pending = False
+        self._burst_ref = self._burst_read # Evita alocar um bound method na IRQ
+
         if int_pin != -1:
             self.int_pin = machine.Pin(int_pin, machine.Pin.IN)
+            self.int_pin.irq(trigger=machine.Pin.IRQ_FALLING, handler=self._int_isr)
+            self._irq_mode = True
         if rst_pin != -1:
             self.rst_pin = machine.Pin(rst_pin, machine.Pin.OUT)
             # Realiza o ciclo de reset
@@ -70,46 +111,91 @@ class Touch:
 
     def _write_reg(self, reg, value):
         """Escreve um byte em um registrador de 16 bits."""
-        self.i2c.writeto_mem(_GT911_I2C_ADDR, reg, bytes([value]), addrsize=16)
+        self._clear[0] = value
+        self.i2c.writeto_mem(_GT911_I2C_ADDR, reg, self._clear, addrsize=16)
 
     def _read_reg(self, reg, nbytes=1):
         """Lê bytes de um registrador de 16 bits."""
         return self.i2c.readfrom_mem(_GT911_I2C_ADDR, reg, nbytes, addrsize=16)
 
-    def read(self):
-        """
-        Lê o estado do touch e retorna um evento:
-        - (Touch.DRAG, x, y): enquanto arrastando
-        - (Touch.TAP, x, y): clique rápido
-        - (Touch.LONG_TAP, x, y): clique longo
-        - (Touch.NONE, 0, 0): nenhum evento novo
-        """
-        status_byte = self._read_reg(_GT911_READ_COORD_ADDR, 1)[0]
-        
+    # --- Aquisição ---
+
+    def _int_isr(self, pin):
+        """IRQ do INT do GT911: agenda a leitura fora do contexto da interrupção."""
+        if self._read_pending:
+            return
+        self._read_pending = True
+        try:
+            micropython.schedule(self._burst_ref, None)
+        except RuntimeError:
+            pass # Fila do schedule cheia: read() fará a leitura pendente
+
+    def _burst_read(self, _=None):
+        """Lê status + 5 pontos numa transação e enfileira a amostra."""
+        self._read_pending = False
+        try:
+            self.i2c.readfrom_mem_into(_GT911_I2C_ADDR, _GT911_READ_COORD_ADDR, self._burst, addrsize=16)
+        except OSError:
+            return
+        status = self._burst[0]
+        if not status & 0x80:
+            return # Buffer do GT911 ainda não tem dados novos
         # Limpa o buffer de status para a próxima leitura
-        self._write_reg(_GT911_READ_COORD_ADDR, 0)
-
-        now_pressed = (status_byte & 0x80) != 0
-        num_points = status_byte & 0x0F
-
-        if now_pressed and num_points > 0:
-            # Lê apenas o primeiro ponto de toque (8 bytes)
-            data = self._read_reg(_GT911_READ_COORD_ADDR + 1, 8)
-            x = (data[2] << 8) | data[1]
-            y = (data[4] << 8) | data[3]
-
+        try:
+            self._write_reg(_GT911_READ_COORD_ADDR, 0)
+        except OSError:
+            pass
+
+        count = min(status & 0x0F, _GT911_MAX_POINTS)
+        data = self._burst
+        for i in range(count):
+            base = 1 + i * _GT911_POINT_SIZE
+            x = (data[base + 2] << 8) | data[base + 1]
+            y = (data[base + 4] << 8) | data[base + 3]
             # Aplica transformações de coordenada
             if self.swap_xy:
                 x, y = y, x
             if self.mirror_y:
                 y = self.height - 1 - y
-            
+            self.points_x[i] = x
+            self.points_y[i] = y
+        self.point_count = count
+        self._push_sample(count > 0, self.points_x[0], self.points_y[0])
+
+    def _push_sample(self, pressed, x, y):
+        nxt = (self._tail + 1) % _SAMPLE_RING_SIZE
+        if nxt == self._head:
+            self.dropped += 1
+            self._head = (self._head + 1) % _SAMPLE_RING_SIZE # Descarta a mais antiga
+        i = self._tail
+        self._ring_x[i] = x
+        self._ring_y[i] = y
+        self._ring_t[i] = time.ticks_ms()
+        self._ring_down[i] = 1 if pressed else 0
+        self._tail = nxt
+        if self.event_queue is not None:
+            self.event_queue.push(4, x, y) # EV_TOUCH, amostra crua
+
+    def _acquire(self):
+        """Garante que os dados disponíveis no GT911 estejam no buffer."""
+        if not self._irq_mode or self._read_pending:
+            self._burst_read()
+
+    def pending(self):
+        """Quantidade de amostras ainda não consumidas."""
+        return (self._tail - self._head) % _SAMPLE_RING_SIZE
+
+    # --- Máquina de gestos ---
+
+    def _process(self, pressed, x, y, now):
+        """Avança a máquina de gestos com uma amostra e retorna o evento."""
+        if pressed:
             self._last_touch_x = x
             self._last_touch_y = y
 
             if not self._touch_down:
                 # Primeiro toque detectado
-                self._touch_down_time = time.ticks_ms()
+                self._touch_down_time = now
                 self._touch_down = True
                 self._prev_x = x
                 self._prev_y = y
@@ -122,28 +208,86 @@ class Touch:
                     self._prev_x = x
                     self._prev_y = y
                     self._was_dragging = True
-                    self._last_seen_touch_time = time.ticks_ms()
-                    return (self.DRAG, x, y)
-            
-            self._last_seen_touch_time = time.ticks_ms()
-
-        else: # Não está pressionado
-            if self._touch_down and time.ticks_diff(time.ticks_ms(), self._last_seen_touch_time) > self.TOUCH_RELEASE_GRACE_MS:
-                duration = time.ticks_diff(time.ticks_ms(), self._touch_down_time)
-                self._touch_down = False
-                self._prev_x, self._prev_y = -1, -1
-
-                # Se estava arrastando, não gera evento de toque ao soltar
-                if self._was_dragging:
-                    self._was_dragging = False
-                    return (self.NONE, 0, 0)
-
-                # Verifica se foi toque longo ou rápido
-                if duration >= self.LONG_TAP_THRESHOLD_MS:
-                    return (self.LONG_TAP, self._last_touch_x, self._last_touch_y)
-                elif duration > self.NOISE_FILTER_MS:
-                    return (self.TAP, self._last_touch_x, self._last_touch_y)
+                    self._last_seen_touch_time = now
+                    return self.DRAG
+
+            self._last_seen_touch_time = now
+        return self.NONE
 
+    def _check_release(self, now):
+        """Gera TAP/LONG_TAP quando o toque some por mais que o tempo de tolerância."""
+        if self._touch_down and time.ticks_diff(now, self._last_seen_touch_time) > self.TOUCH_RELEASE_GRACE_MS:
+            duration = time.ticks_diff(now, self._touch_down_time)
+            self._touch_down = False
+            self._prev_x, self._prev_y = -1, -1
+
+            # Se estava arrastando, não gera evento de toque ao soltar
+            if self._was_dragging:
+                self._was_dragging = False
+                return self.NONE
+
+            # Verifica se foi toque longo ou rápido
+            if duration >= self.LONG_TAP_THRESHOLD_MS:
+                return self.LONG_TAP
+            elif duration > self.NOISE_FILTER_MS:
+                return self.TAP
+        return self.NONE
+
+    @property
+    def is_down(self):
+        """True enquanto há um toque em andamento."""
+        return self._touch_down
+
+    def read_points(self, xs, ys, lifts=False):
+        """
+        Consome todas as amostras pendentes, copiando as pressionadas para
+        os arrays 'xs'/'ys' (até o tamanho deles). Retorna (quantidade, evento),
+        onde evento é o último gesto gerado (TAP, LONG_TAP, DRAG ou NONE).
+        Com lifts=True, cada vez que o dedo sai no meio das amostras entra um
+        ponto (-1, -1), para quem desenha separar os traços.
+        """
+        self._acquire()
+        count = 0
+        event = self.NONE
+        limit = min(len(xs), len(ys))
+        while self._head != self._tail:
+            i = self._head
+            self._head = (i + 1) % _SAMPLE_RING_SIZE
+            pressed = self._ring_down[i]
+            x, y = self._ring_x[i], self._ring_y[i]
+            if pressed:
+                result = self._process(True, x, y, self._ring_t[i])
+                if count < limit:
+                    xs[count] = x
+                    ys[count] = y
+                    count += 1
+            else:
+                # O GT911 reporta 0 pontos ao soltar: libera sem esperar a tolerância
+                was_down = self._touch_down
+                result = self._check_release(time.ticks_add(self._ring_t[i], self.TOUCH_RELEASE_GRACE_MS + 1))
+                if lifts and was_down and count < limit:
+                    xs[count] = -1
+                    ys[count] = -1
+                    count += 1
+            if result:
+                event = result
+        if not event:
+            event = self._check_release(time.ticks_ms())
+        return count, event
+
+    def read(self):
+        """
+        Lê o estado do touch e retorna um evento:
+        - (Touch.DRAG, x, y): enquanto arrastando
+        - (Touch.TAP, x, y): clique rápido
+        - (Touch.LONG_TAP, x, y): clique longo
+        - (Touch.NONE, 0, 0): nenhum evento novo
+        """
+        _, event = self.read_points((), ())
+        if event == self.DRAG:
+            return (self.DRAG, self._prev_x, self._prev_y)
+        if event:
+            return (event, self._last_touch_x, self._last_touch_y)
         return (self.NONE, 0, 0)
 
 
@@ -1,8 +1,29 @@
-"""Trackball control module for T-Deck"""
+"""Trackball control module for T-Deck
+
+Cada pulso de um dos quatro sensores do trackball gera uma IRQ. A rotina de
+interrupção só mexe em inteiros pré-existentes: acumula dx/dy (saturados em
+MAX_COUNT) e grava o passo num pequeno anel com timestamp, sem alocar nada.
+
+Leitura:
+    get_direction() -> (direção, clique): interface antiga, direção dominante.
+    get_motion()    -> (dx, dy, clique): passos com sinal, já acelerados
+                       pela velocidade recente (um "flick" rápido anda
+                       vários itens de uma vez).
+    velocity()      -> passos por segundo na janela recente.
+"""
 
 from machine import Pin
+from array import array
 import time
 
+MAX_COUNT = 64 # saturação dos acumuladores dx/dy
+RING_SIZE = 16 # passos recentes guardados para calcular a velocidade
+VELOCITY_WINDOW_MS = 150
+
+# Curva de aceleração: (velocidade mínima em passos/s, ganho)
+ACCEL_CURVE = ((60, 4), (30, 2), (0, 1))
+
+
 class Trackball:
     def __init__(self):
         # Trackball pins
@@ -14,12 +35,19 @@ class Trackball:
 
         # State variables
         self.tb_int = False
-        self.tb_up_count = 1
-        self.tb_down_count = 1
-        self.tb_left_count = 1
-        self.tb_right_count = 1
+        self.tb_dx = 0
+        self.tb_dy = 0
         self.tb_click_count = 0
 
+        # Anel de passos recentes: dx, dy e ticks_ms de cada pulso
+        self._ring_dx = array('b', bytes(RING_SIZE))
+        self._ring_dy = array('b', bytes(RING_SIZE))
+        self._ring_t = array('I', bytes(4 * RING_SIZE))
+        self._ring_pos = 0
+
+        # Fila de eventos opcional (lib/events.py), alimentada pela IRQ
+        self.event_queue = None
+
         # Configure interrupts
         self.tb_up.irq(trigger=Pin.IRQ_FALLING, handler=self.button_isr)
         self.tb_down.irq(trigger=Pin.IRQ_FALLING, handler=self.button_isr)
@@ -35,18 +63,79 @@ class Trackball:
     def button_isr(self, pin):
         """Interrupt handler for trackball buttons"""
         self.tb_int = True
+        queue = self.event_queue
 
-        TRACK_SPEED = 4
-        if pin == self.tb_up:
-            self.tb_up_count <<= TRACK_SPEED
-        if pin == self.tb_down:
-            self.tb_down_count <<= TRACK_SPEED
-        if pin == self.tb_left:
-            self.tb_left_count <<= TRACK_SPEED
-        if pin == self.tb_right:
-            self.tb_right_count <<= TRACK_SPEED
         if pin == self.tb_click:
             self.tb_click_count += 1
+            if queue is not None:
+                queue.push(2) # EV_CLICK
+            return
+
+        dx = 0
+        dy = 0
+        if pin == self.tb_up:
+            dy = -1
+        elif pin == self.tb_down:
+            dy = 1
+        elif pin == self.tb_left:
+            dx = -1
+        elif pin == self.tb_right:
+            dx = 1
+
+        if -MAX_COUNT < self.tb_dx + dx < MAX_COUNT:
+            self.tb_dx += dx
+        if -MAX_COUNT < self.tb_dy + dy < MAX_COUNT:
+            self.tb_dy += dy
+
+        i = self._ring_pos
+        self._ring_dx[i] = dx
+        self._ring_dy[i] = dy
+        self._ring_t[i] = time.ticks_ms()
+        self._ring_pos = (i + 1) % RING_SIZE
+
+        if queue is not None:
+            queue.push(1, dx, dy) # EV_MOVE
+
+    def velocity(self):
+        """Passos por segundo (em qualquer eixo) dentro da janela recente."""
+        now = time.ticks_ms()
+        steps = 0
+        for i in range(RING_SIZE):
+            if (self._ring_dx[i] or self._ring_dy[i]) and \
+                    time.ticks_diff(now, self._ring_t[i]) < VELOCITY_WINDOW_MS:
+                steps += 1
+        return steps * 1000 // VELOCITY_WINDOW_MS
+
+    def gain(self):
+        """Ganho da curva de aceleração para a velocidade atual."""
+        v = self.velocity()
+        for min_velocity, gain in ACCEL_CURVE:
+            if v >= min_velocity:
+                return gain
+        return 1
+
+    def _reset(self):
+        self.tb_int = False
+        self.tb_dx = 0
+        self.tb_dy = 0
+        self.tb_click_count = 0
+
+    def get_motion(self):
+        """
+        Retorna (dx, dy, clique) acumulados desde a última leitura, com sinal
+        (dx > 0 à direita, dy > 0 para baixo) e multiplicados pelo ganho da
+        curva de aceleração. Zera os acumuladores.
+        """
+        if not self.tb_int:
+            return 0, 0, False
+        dx, dy = self.tb_dx, self.tb_dy
+        click = self.tb_click_count > 0
+        self._reset()
+        if dx or dy:
+            g = self.gain()
+            dx *= g
+            dy *= g
+        return dx, dy, click
 
     def get_direction(self):
         """Get the current trackball direction and reset counters"""
@@ -55,25 +144,16 @@ class Trackball:
 
         direction = None
         click = self.tb_click_count > 0
+        dx, dy = self.tb_dx, self.tb_dy
 
         # Determine primary direction (largest count)
-        counts = {
-            'up': self.tb_up_count,
-            'down': self.tb_down_count,
-            'left': self.tb_left_count,
-            'right': self.tb_right_count
-        }
-
-        max_count = max(counts.values())
-        if max_count > 1:  # Only consider if there's actual movement
-            direction = max(counts, key=counts.get)
+        if dx or dy:
+            if abs(dy) >= abs(dx):
+                direction = 'down' if dy > 0 else 'up'
+            else:
+                direction = 'right' if dx > 0 else 'left'
 
         # Reset state
-        self.tb_int = False
-        self.tb_up_count = 1
-        self.tb_down_count = 1
-        self.tb_left_count = 1
-        self.tb_right_count = 1
-        self.tb_click_count = 0
+        self._reset()
 
         return direction, click
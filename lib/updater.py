@@ -1,12 +1,70 @@
 """
 App Updater Module
 
-Handles updating apps on the SD card from a staging directory in internal flash.
+Handles updating apps on the SD card from a compressed bundle or a staging
+directory in internal flash.
+
+Bundle ('/update.bundle', gerado por tools/bundle_packer.py):
+    b'TDB1' + <H número de entradas>, e para cada entrada:
+    <H tamanho do caminho> caminho ("app/arquivo") <B método> <I tamanho>
+    <I tamanho comprimido> <32s sha256> e os dados. O método 1 é zlib com
+    janela de 2**BUNDLE_WBITS bytes, descomprimido em streaming direto para
+    o SD; o método 0 guarda o arquivo sem compressão. O método 2 não traz
+    dados: o arquivo já está igual no SD (tools/device_sync.py só envia o
+    que mudou) e a entrada serve para completar o manifesto do app.
+
+Atualização diferencial:
+    O bundle traz tamanho e sha256 de cada arquivo. Cada app em
+    /update_stage pode trazer um '.manifest' com uma linha "<tamanho>
+    <sha256> <caminho>" por arquivo; sem ele, o manifesto é calculado aqui. Comparando com o '.manifest' da versão
+    instalada no SD, só os arquivos alterados são copiados, e os que saíram
+    do app são removidos. Arquivos criados pelo próprio app (desenhos,
+    notas) não estão em manifesto nenhum e são preservados.
+
+Cada arquivo é gravado com um nome temporário, conferido pelo hash e só
+então renomeado por cima do antigo. Os arquivos concluídos são anotados
+num journal no SD; se a energia cair, o próximo boot retoma a atualização
+(o staging ou o bundle só é apagado no final) pulando o que já foi copiado.
+
+Cada boot que começa uma atualização conta uma tentativa. Um bundle com
+dados corrompidos (hash que não confere) é descartado na hora, e qualquer
+outra falha é descartada depois de MAX_UPDATE_ATTEMPTS tentativas, para o
+aparelho não ficar reiniciando para sempre.
 """
 import os as _os # Importa 'os' com um alias para evitar conflitos
 import gc
+import io
+import struct
+import hashlib
+from binascii import hexlify
 import st7789py as st7789
 
+try:
+    import deflate
+except ImportError:
+    deflate = None
+    import zlib # Firmware antigo: zlib.DecompIO
+
+UPDATE_STAGE_DIR = '/update_stage'
+BUNDLE_FILE = '/update.bundle'
+BUNDLE_MAGIC = b'TDB1'
+BUNDLE_WBITS = 12
+METHOD_STORED = 0
+METHOD_DEFLATE = 1
+METHOD_KEEP = 2
+SD_APP_DIR = '/sd/app'
+MANIFEST_FILE = '.manifest'
+JOURNAL_FILE = '/sd/app/.update_journal'
+ATTEMPTS_FILE = '/sd/app/.update_attempts'
+MAX_UPDATE_ATTEMPTS = 3
+TMP_SUFFIX = '.tmp'
+COPY_BUFFER_SIZE = 4096
+
+BG_COLOR = st7789.color565(0, 0, 20)
+PROGRESS_Y = 180
+PROGRESS_HEIGHT = 12
+
+
 def delete_recursive(path):
     """Recursively delete a file or directory."""
     try:
@@ -23,52 +81,310 @@ def delete_recursive(path):
         else:
             print(f"Error deleting {path}: {e}")
 
-def copy_recursive(source, dest, display, font):
-    """Recursively copy a file or directory."""
-    for item in _os.listdir(source):
-        source_path = f"{source}/{item}"
-        dest_path = f"{dest}/{item}"
-        
-        if _os.stat(source_path)[0] & 0x4000: # É um diretório
-            print(f"Creating dir: {dest_path}")
-            try:
-                _os.mkdir(dest_path)
-            except OSError:
-                pass # Diretório provavelmente já existe
-            copy_recursive(source_path, dest_path, display, font)
-        else: # É um arquivo
-            # Exibe o nome do arquivo sendo copiado
-            display.fill_rect(10, 100, 300, 10, st7789.color565(0, 0, 20)) # Limpa a linha anterior
-            display.text(font, f"Copiando: {item}", 10, 100, st7789.WHITE)
-            print(f"Copying: {source_path} -> {dest_path}")
-            with open(source_path, 'rb') as f_source, open(dest_path, 'wb') as f_dest:
-                while True:
-                    chunk = f_source.read(512)
-                    if not chunk:
-                        break
-                    f_dest.write(chunk)
 
-def run_update_process(display):
-    """
-    Main update process. Checks for content in /update_stage, and replaces apps on SD card.
-    Returns True if an update was performed, False otherwise.
-    """
-    UPDATE_STAGE_DIR = '/update_stage'
-    SD_APP_DIR = '/sd/app'
-    
+def _is_dir(path):
+    return _os.stat(path)[0] & 0x4000
+
+
+def _makedirs(path):
+    """Cria o diretório e os pais que faltarem."""
+    current = ''
+    for part in path.strip('/').split('/'):
+        current += '/' + part
+        try:
+            _os.mkdir(current)
+        except OSError:
+            pass # Já existe
+
+
+def _walk(base, rel=''):
+    """Lista os arquivos de um diretório, recursivamente, como caminhos relativos."""
+    files = []
+    for item in _os.listdir(f"{base}/{rel}" if rel else base):
+        item_rel = f"{rel}/{item}" if rel else item
+        if _is_dir(f"{base}/{item_rel}"):
+            files.extend(_walk(base, item_rel))
+        elif item_rel != MANIFEST_FILE and not item.endswith(TMP_SUFFIX):
+            files.append(item_rel)
+    return files
+
+
+def file_hash(path, buf):
+    """sha256 (hex) de um arquivo, lido com readinto no buffer informado."""
+    h = hashlib.sha256()
+    mv = memoryview(buf)
+    with open(path, 'rb') as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            h.update(mv[:n])
+    return hexlify(h.digest()).decode()
+
+
+def read_manifest(app_dir):
+    """Lê o manifesto de um app: {caminho: (tamanho, hash)}, ou None se não existir."""
+    manifest = {}
+    try:
+        with open(f"{app_dir}/{MANIFEST_FILE}", 'r') as f:
+            for line in f:
+                parts = line.rstrip('\n').split(' ', 2)
+                if len(parts) == 3:
+                    manifest[parts[2]] = (int(parts[0]), parts[1])
+    except (OSError, ValueError):
+        return None
+    return manifest
+
+
+def write_manifest(app_dir, manifest):
+    path = f"{app_dir}/{MANIFEST_FILE}"
+    with open(path + TMP_SUFFIX, 'w') as f:
+        for rel in sorted(manifest):
+            size, digest = manifest[rel]
+            f.write(f"{size} {digest} {rel}\n")
+    _os.rename(path + TMP_SUFFIX, path)
+
+
+def scan_manifest(app_dir, buf):
+    """Calcula o manifesto de um diretório (quando o staging não trouxe um)."""
+    return {rel: (_os.stat(f"{app_dir}/{rel}")[6], file_hash(f"{app_dir}/{rel}", buf))
+            for rel in _walk(app_dir)}
+
+
+def _load_journal():
+    """Arquivos já concluídos por uma atualização interrompida ("app/caminho hash")."""
+    try:
+        with open(JOURNAL_FILE, 'r') as f:
+            return set(line.rstrip('\n') for line in f)
+    except OSError:
+        return set()
+
+
+class _EntryReader(io.IOBase):
+    """Stream limitado aos bytes de uma entrada do bundle."""
+
+    def __init__(self, f, offset, size):
+        f.seek(offset)
+        self._f = f
+        self._remaining = size
+
+    def readinto(self, buf):
+        n = min(len(buf), self._remaining)
+        if n <= 0:
+            return 0
+        got = self._f.readinto(buf if n == len(buf) else memoryview(buf)[:n])
+        self._remaining -= got
+        return got
+
+    def close(self):
+        pass # O arquivo do bundle é fechado pelo BundleSource
+
+
+class BundleSource:
+    """Apps e arquivos de um bundle comprimido."""
+
+    def __init__(self, path=BUNDLE_FILE):
+        self.path = path
+        self._f = open(path, 'rb')
+        self.manifests = {} # app -> {caminho: (tamanho, hash)}
+        self._entries = {}  # "app/caminho" -> (método, offset, tamanho comprimido)
+        try:
+            self._read_index()
+        except Exception:
+            self._f.close()
+            raise
+        self.apps = sorted(self.manifests)
+
+    def _read_index(self):
+        f = self._f
+        magic, count = struct.unpack('<4sH', f.read(6))
+        if magic != BUNDLE_MAGIC:
+            raise ValueError("Bundle invalido")
+        for _ in range(count):
+            path_len = struct.unpack('<H', f.read(2))[0]
+            path = f.read(path_len).decode()
+            method, size, csize, digest = struct.unpack('<BII32s', f.read(41))
+            app_name, rel = path.split('/', 1)
+            self.manifests.setdefault(app_name, {})[rel] = (size, hexlify(digest).decode())
+            self._entries[path] = (method, f.tell(), csize)
+            f.seek(csize, 1)
+
+    def manifest(self, app_name, buf):
+        return self.manifests[app_name]
+
+    def open(self, app_name, rel):
+        method, offset, csize = self._entries[f"{app_name}/{rel}"]
+        if method == METHOD_KEEP:
+            # O SD mudou depois que o PC comparou os hashes: reenviar
+            raise ValueError(f"Arquivo fora do bundle: {app_name}/{rel}")
+        reader = _EntryReader(self._f, offset, csize)
+        if method == METHOD_STORED:
+            return reader
+        if deflate is not None:
+            return deflate.DeflateIO(reader, deflate.ZLIB, BUNDLE_WBITS)
+        return zlib.DecompIO(reader, BUNDLE_WBITS)
+
+    def cleanup(self):
+        self._f.close()
+        delete_recursive(self.path)
+
+
+class StageSource:
+    """Apps copiados sem compressão para /update_stage."""
+
+    def __init__(self, items):
+        self.apps = [item for item in items if _is_dir(f"{UPDATE_STAGE_DIR}/{item}")]
+
+    def manifest(self, app_name, buf):
+        source_dir = f"{UPDATE_STAGE_DIR}/{app_name}"
+        staged = read_manifest(source_dir)
+        if staged is None:
+            staged = scan_manifest(source_dir, buf)
+        return staged
+
+    def open(self, app_name, rel):
+        return open(f"{UPDATE_STAGE_DIR}/{app_name}/{rel}", 'rb')
+
+    def cleanup(self):
+        delete_recursive(UPDATE_STAGE_DIR)
+
+
+def _open_source():
+    """Retorna a origem da atualização pendente (bundle ou staging), ou None."""
+    try:
+        _os.stat(BUNDLE_FILE)
+        return BundleSource()
+    except OSError:
+        pass
     try:
         # Verifica se o diretório de staging existe e não está vazio
         staged_items = _os.listdir(UPDATE_STAGE_DIR)
-        if not staged_items:
-            return False
     except OSError:
         # /update_stage não existe, não há atualização a fazer
+        return None
+    return StageSource(staged_items) if staged_items else None
+
+
+class _Progress:
+    """Barra de progresso por bytes copiados."""
+
+    def __init__(self, display, font, total):
+        self.display = display
+        self.font = font
+        self.total = max(total, 1)
+        self.done = 0
+        self._width = 0
+        display.rect(10, PROGRESS_Y, 300, PROGRESS_HEIGHT, st7789.WHITE)
+
+    def file(self, name):
+        self.display.fill_rect(10, 100, 300, 10, BG_COLOR) # Limpa a linha anterior
+        self.display.text(self.font, f"Copiando: {name}"[:37], 10, 100, st7789.WHITE)
+
+    def advance(self, n):
+        self.done += n
+        width = min(296, self.done * 296 // self.total)
+        if width > self._width:
+            # Desenha só a faixa nova da barra
+            self.display.fill_rect(12 + self._width, PROGRESS_Y + 2, width - self._width,
+                                   PROGRESS_HEIGHT - 4, st7789.GREEN)
+            self._width = width
+
+
+def _copy_file(stream, dest, size, digest, buf, progress):
+    """Grava o stream num nome temporário, confere tamanho e hash e renomeia."""
+    h = hashlib.sha256()
+    mv = memoryview(buf)
+    copied = 0
+    tmp = dest + TMP_SUFFIX
+    with open(tmp, 'wb') as f_dest:
+        while True:
+            n = stream.readinto(buf)
+            if not n:
+                break
+            chunk = mv[:n]
+            f_dest.write(chunk)
+            h.update(chunk)
+            copied += n
+            progress.advance(n)
+    if copied != size or hexlify(h.digest()).decode() != digest:
+        _os.remove(tmp)
+        raise ValueError(f"Arquivo corrompido: {dest}")
+    _os.rename(tmp, dest)
+
+
+def plan_app(app_name, staged, buf, done):
+    """
+    Compara o manifesto novo com a versão instalada. Retorna
+    ([(caminho, tamanho, hash)] a copiar, [caminhos] a remover).
+    """
+    target_dir = f"{SD_APP_DIR}/{app_name}"
+    installed = read_manifest(target_dir) or {}
+
+    copies = []
+    for rel in sorted(staged):
+        size, digest = staged[rel]
+        if f"{app_name}/{rel} {digest}" in done:
+            continue
+        try:
+            current_size = _os.stat(f"{target_dir}/{rel}")[6]
+        except OSError:
+            copies.append((rel, size, digest))
+            continue
+        if current_size != size:
+            copies.append((rel, size, digest))
+        elif rel in installed:
+            if installed[rel] != (size, digest):
+                copies.append((rel, size, digest))
+        elif file_hash(f"{target_dir}/{rel}", buf) != digest:
+            # Sem manifesto instalado: o hash decide
+            copies.append((rel, size, digest))
+
+    deletes = [rel for rel in installed if rel not in staged]
+    return copies, deletes
+
+
+def _count_attempt():
+    """Soma uma tentativa de atualização no SD e retorna o total."""
+    attempts = 0
+    try:
+        with open(ATTEMPTS_FILE) as f:
+            attempts = int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        pass
+    attempts += 1
+    try:
+        with open(ATTEMPTS_FILE, 'w') as f:
+            f.write(str(attempts))
+    except OSError:
+        pass
+    return attempts
+
+
+def _discard_update(source):
+    """Apaga a atualização que não pôde ser aplicada, com o journal e o contador."""
+    source.cleanup()
+    delete_recursive(JOURNAL_FILE)
+    delete_recursive(ATTEMPTS_FILE)
+
+
+def run_update_process(display):
+    """
+    Main update process. Checks for a bundle or content in /update_stage, and updates apps on SD card.
+    Returns True if an update was performed, False otherwise.
+    """
+    try:
+        source = _open_source()
+    except (OSError, ValueError) as e:
+        print(f"Bundle de atualizacao invalido: {e}")
+        delete_recursive(BUNDLE_FILE)
+        source = _open_source()
+    if source is None:
         return False
 
     # --- Update process starts ---
     from romfonts import vga1_8x8 as font
 
-    display.fill(st7789.color565(0, 0, 20))
+    display.fill(BG_COLOR)
     display.text(font, "Atualizacao encontrada...", 10, 10, st7789.WHITE)
     display.text(font, "Nao desligue o dispositivo.", 10, 30, st7789.YELLOW)
 
@@ -79,35 +395,86 @@ def run_update_process(display):
         display.text(font, "ERRO: Cartao SD nao encontrado!", 10, 60, st7789.RED)
         display.text(font, "Verifique o cartao e reinicie.", 10, 80, st7789.RED)
         # Limpa o staging para não tentar de novo no próximo boot
-        delete_recursive(UPDATE_STAGE_DIR)
+        source.cleanup()
         return True # Retorna True para forçar a reinicialização no main.py
 
+    attempts = _count_attempt()
+    if attempts > MAX_UPDATE_ATTEMPTS:
+        display.text(font, "Atualizacao falhou varias vezes.", 10, 60, st7789.RED)
+        display.text(font, "Descartada; reinicie o envio.", 10, 80, st7789.RED)
+        _discard_update(source)
+        return True
+
+    buf = bytearray(COPY_BUFFER_SIZE)
     try:
-        for app_folder_name in staged_items:
-            source_app_path = f"{UPDATE_STAGE_DIR}/{app_folder_name}"
-            target_app_path = f"{SD_APP_DIR}/{app_folder_name}"
-
-            display.text(font, f"Atualizando app: {app_folder_name}", 10, 60, st7789.WHITE)
-            
-            # 1. Remove a versão antiga no SD card
-            display.text(font, "Removendo versao antiga...", 10, 80, st7789.WHITE)
-            delete_recursive(target_app_path)
-            gc.collect()
+        done = _load_journal()
+        if done:
+            display.text(font, "Retomando atualizacao...", 10, 45, st7789.YELLOW)
 
-            # 2. Copia a nova versão do staging para o SD card
-            _os.mkdir(target_app_path) # Cria a pasta base do app no SD
-            copy_recursive(source_app_path, target_app_path, display, font)
+        # 1. Planeja: o que mudou em cada app
+        display.text(font, "Comparando arquivos...", 10, 60, st7789.WHITE)
+        plans = []
+        total = 0
+        for app_name in source.apps:
+            staged = source.manifest(app_name, buf)
+            copies, deletes = plan_app(app_name, staged, buf, done)
+            plans.append((app_name, staged, copies, deletes))
+            total += sum(size for _, size, _ in copies)
             gc.collect()
 
-        # 3. Limpa o diretório de staging
+        changed = sum(len(copies) + len(deletes) for _, _, copies, deletes in plans)
+        display.fill_rect(10, 60, 300, 10, BG_COLOR)
+        display.text(font, f"{changed} arquivo(s), {total // 1024} KB", 10, 60, st7789.WHITE)
+        progress = _Progress(display, font, total)
+
+        # 2. Aplica, anotando cada arquivo concluído no journal
+        with open(JOURNAL_FILE, 'a') as journal:
+            for app_name, staged, copies, deletes in plans:
+                target_dir = f"{SD_APP_DIR}/{app_name}"
+                display.fill_rect(10, 80, 300, 10, BG_COLOR)
+                display.text(font, f"Atualizando app: {app_name}", 10, 80, st7789.WHITE)
+                _makedirs(target_dir)
+
+                for rel, size, digest in copies:
+                    progress.file(rel)
+                    print(f"Copying: {app_name}/{rel} -> {target_dir}/{rel}")
+                    if '/' in rel:
+                        _makedirs(f"{target_dir}/{rel.rsplit('/', 1)[0]}")
+                    stream = source.open(app_name, rel)
+                    try:
+                        _copy_file(stream, f"{target_dir}/{rel}", size, digest, buf, progress)
+                    finally:
+                        stream.close()
+                    journal.write(f"{app_name}/{rel} {digest}\n")
+                    journal.flush()
+
+                for rel in deletes:
+                    delete_recursive(f"{target_dir}/{rel}")
+
+                write_manifest(target_dir, staged)
+                gc.collect()
+
+        # 3. Atualiza o índice de apps apenas com os apps alterados
+        display.fill_rect(10, 100, 300, 10, BG_COLOR)
         display.text(font, "Finalizando...", 10, 100, st7789.WHITE)
-        delete_recursive(UPDATE_STAGE_DIR)
+        from lib import app_index, icon_atlas
+        app_index.update_index(source.apps)
+        icon_atlas.build_atlas(app_index.load_index(), display.needs_swap)
+
+        # 4. Limpa o staging (ou o bundle), o journal e o contador de tentativas
+        _discard_update(source)
 
         display.text(font, "Atualizacao concluida!", 10, 120, st7789.GREEN)
         display.text(font, "Reiniciando...", 10, 140, st7789.GREEN)
-        
+
     except Exception as e:
         display.text(font, "ERRO NA ATUALIZACAO!", 10, 80, st7789.RED)
-        display.text(font, str(e), 10, 100, st7789.RED)
+        display.text(font, str(e)[:37], 10, 100, st7789.RED)
+        if isinstance(e, ValueError):
+            # Dados corrompidos: tentar de novo daria o mesmo erro
+            display.text(font, "Atualizacao descartada.", 10, 120, st7789.RED)
+            _discard_update(source)
+        else:
+            display.text(font, f"Tentativa {attempts} de {MAX_UPDATE_ATTEMPTS}.", 10, 120, st7789.YELLOW)
 
     return True
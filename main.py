@@ -19,7 +19,7 @@ except Exception as e:
     while True: time.sleep(1)
 
 # --- Verificação de Atualização ---
-# Verifica se há um arquivo update.zip e executa o processo de atualização.
+# Verifica se há um update.bundle (ou /update_stage) e executa o processo de atualização.
 if updater.run_update_process(display):
     # Se uma atualização foi realizada, o dispositivo será reiniciado.
     time.sleep(3)
@@ -0,0 +1,75 @@
+"""
+Configuração dos testes no PC (pytest).
+
+Os módulos são carregados como no dispositivo: a raiz do projeto e lib/ no
+sys.path (o firmware importa 'st7789py' direto de lib/). Os apps são
+carregados por load_app(); sem os globais de hardware, o ponto de entrada
+do app não faz nada.
+"""
+import os
+import sys
+import importlib.util
+
+import pytest
+
+PROJECT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [PROJECT_PATH, os.path.join(PROJECT_PATH, 'lib')]
+
+
+def load_app(name):
+    path = os.path.join(PROJECT_PATH, 'update_stage', name, '__init__.py')
+    spec = importlib.util.spec_from_file_location(f'app_{name}', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class FakeDisplay:
+    """Display 320x240 que guarda 1 bit por pixel (aceso = cor diferente do fundo)."""
+
+    width = 320
+    height = 240
+    needs_swap = False
+
+    def __init__(self, background=0):
+        self.background = background
+        self.fb = bytearray(self.width * self.height)
+        self.calls = {}
+
+    def _count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def fill_rect(self, x, y, w, h, color):
+        self._count('fill_rect')
+        value = 0 if color == self.background else 1
+        for yy in range(max(0, y), min(self.height, y + h)):
+            start = yy * self.width
+            self.fb[start + max(0, x):start + min(self.width, x + w)] = \
+                bytes((value,)) * (min(self.width, x + w) - max(0, x))
+
+    def fill(self, color):
+        self.fill_rect(0, 0, self.width, self.height, color)
+
+    def blit_buffer(self, buf, x, y, w, h):
+        self._count('blit_buffer')
+        for r in range(h):
+            for c in range(w):
+                color = (buf[(r * w + c) * 2] << 8) | buf[(r * w + c) * 2 + 1]
+                self.fb[(y + r) * self.width + x + c] = 0 if color == self.background else 1
+
+    def rect(self, *args):
+        self._count('rect')
+
+    def text(self, *args):
+        pass
+
+
+@pytest.fixture(scope='session')
+def sketch():
+    return load_app('sketch')
+
+
+@pytest.fixture
+def sketch_app(sketch):
+    display = FakeDisplay(sketch.BG_COLOR)
+    return sketch.SketchApp(display, None, None, None, None)
@@ -0,0 +1,108 @@
+import math
+import struct
+import wave
+from array import array
+
+import pytest
+
+from lib import adpcm
+from lib.mixer import SAMPLE_RATE, WavVoice
+from tools.adpcm_encoder import encode, encode_block, write_adpcm_wav, decode_file, read_pcm, BLOCK_ALIGN
+
+PER_BLOCK = adpcm.samples_per_block(BLOCK_ALIGN)
+
+
+def tone(count, freq=440, amplitude=12000):
+    return array('h', (int(amplitude * math.sin(2 * math.pi * freq * i / SAMPLE_RATE)) for i in range(count)))
+
+
+def mean_error(a, b):
+    return sum(abs(x - y) for x, y in zip(a, b)) / len(a)
+
+
+def read_voice(voice, total, chunk=100):
+    out = array('h')
+    buf = array('h', bytes(2 * chunk))
+    while len(out) < total:
+        n = voice.read(buf, chunk)
+        if not n:
+            break
+        out.extend(buf[:n])
+    return out
+
+
+def test_block_layout():
+    assert PER_BLOCK == 505
+    block, index = encode_block(tone(PER_BLOCK), 0)
+    assert len(block) == BLOCK_ALIGN
+    assert struct.unpack('<hBB', block[:4]) == (0, 0, 0)
+    assert 0 <= index <= 88
+
+
+def test_decode_nibble_saturates():
+    assert adpcm.decode_nibble(7, 32700, 88) == (32767, 88)
+    assert adpcm.decode_nibble(15, -32700, 88) == (-32768, 88)
+    assert adpcm.decode_nibble(0, 0, 0) == (0, 0)
+
+
+@pytest.mark.parametrize('count', [1, PER_BLOCK - 1, PER_BLOCK, PER_BLOCK + 1, 3 * PER_BLOCK + 100])
+def test_encode_decode_roundtrip(count):
+    samples = tone(count)
+    data = encode(samples)
+    out = array('h', bytes(2 * PER_BLOCK))
+    decoded = array('h')
+    for start in range(0, len(data), BLOCK_ALIGN):
+        block = data[start:start + BLOCK_ALIGN]
+        n = adpcm.decode_block(block, len(block), out)
+        decoded.extend(out[:n])
+    assert len(decoded) >= count # O último nibble de um bloco pode ser enchimento
+    assert decoded[0] == samples[0]
+    assert mean_error(samples, decoded[:count]) < 300
+
+
+def test_short_block_decodes_nothing():
+    assert adpcm.decode_block(b'\x01\x02\x03', 3, array('h', bytes(4))) == 0
+
+
+def test_wav_file_roundtrip(tmp_path):
+    samples = tone(2 * PER_BLOCK + 7, 1000)
+    path = str(tmp_path / 'tom.adpcm.wav')
+    write_adpcm_wav(path, encode(samples), len(samples))
+
+    decoded = decode_file(path)
+    assert mean_error(samples, decoded[:len(samples)]) < 300
+
+    voice = adpcm.open_wav(path)
+    assert isinstance(voice, adpcm.AdpcmVoice)
+    try:
+        assert read_voice(voice, 10 * len(decoded)) == decoded
+    finally:
+        voice.close()
+
+
+def test_voice_loops(tmp_path):
+    samples = tone(PER_BLOCK // 2)
+    path = str(tmp_path / 'loop.adpcm.wav')
+    write_adpcm_wav(path, encode(samples), len(samples))
+    decoded = decode_file(path)
+    voice = adpcm.AdpcmVoice(path, loop=True)
+    try:
+        assert read_voice(voice, 3 * len(decoded))[:3 * len(decoded)] == decoded * 3
+    finally:
+        voice.close()
+
+
+def test_pcm_files_open_as_wav_voice(tmp_path):
+    path = str(tmp_path / 'pcm.wav')
+    samples = tone(300)
+    with wave.open(path, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+        w.writeframes(samples.tobytes())
+    assert read_pcm(path) == samples
+    voice = adpcm.open_wav(path)
+    assert isinstance(voice, WavVoice)
+    voice.close()
+    with pytest.raises(ValueError):
+        adpcm.AdpcmVoice(path)
@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+from lib import app_index
+
+
+@pytest.fixture
+def sd(tmp_path, monkeypatch):
+    """/sd/app num diretório temporário, com dois apps."""
+    base = tmp_path / 'app'
+    for name in ('calc', 'notes'):
+        (base / name).mkdir(parents=True)
+        (base / name / '__init__.py').write_text(f'# {name}\n')
+    (base / 'calc' / '__icon__.p4').write_bytes(bytes((2, 2)) + bytes(34))
+    monkeypatch.setattr(app_index, 'APP_BASE_PATH', str(base))
+    monkeypatch.setattr(app_index, 'INDEX_FILE', str(base / '.index'))
+    monkeypatch.setattr(app_index, 'ATLAS_FILE', str(base / '.icons'))
+    return base
+
+
+def touch_later(path, content):
+    """Substitui o arquivo sem mudar o mtime do diretório (como no FAT)."""
+    parent = os.stat(path.parent.parent).st_mtime_ns
+    path.write_bytes(content)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 2_000_000_000))
+    os.utime(path.parent.parent, ns=(parent, parent))
+
+
+def test_unchanged_index_is_reused(sd, monkeypatch):
+    apps = app_index.load_index()
+    assert [app['name'] for app in apps] == ['calc', 'notes']
+    monkeypatch.setattr(app_index, 'scan_app', None) # Qualquer varredura falharia
+    assert app_index.load_index() == apps
+
+
+def test_replaced_init_file_is_rescanned(sd):
+    app_index.load_index()
+    (sd / '.icons').write_bytes(b'velho')
+    touch_later(sd / 'notes' / '__init__.py', b'# notes, agora maior\n')
+    apps = {app['name']: app for app in app_index.load_index()}
+    assert apps['notes']['size'] == len(b'# notes, agora maior\n')
+    assert not (sd / '.icons').exists() # O launcher regenera o atlas
+    # O índice gravado já tem a entrada nova
+    assert app_index.load_index() == [apps['calc'], apps['notes']]
+
+
+def test_replaced_icon_is_rescanned(sd):
+    app_index.load_index()
+    touch_later(sd / 'calc' / '__icon__.p4', bytes((3, 1)) + bytes(34))
+    apps = {app['name']: app for app in app_index.load_index()}
+    assert apps['calc']['icon_size'] == [3, 1]
+
+
+def test_removed_app_is_dropped(sd):
+    app_index.load_index()
+    parent = os.stat(sd).st_mtime_ns
+    os.remove(sd / 'notes' / '__init__.py')
+    os.utime(sd, ns=(parent, parent))
+    assert [app['name'] for app in app_index.load_index()] == ['calc']
@@ -0,0 +1,24 @@
+import builtins
+import shutil
+import time
+
+import lib.events
+from lib import app_runner
+from conftest import PROJECT_PATH, FakeDisplay
+
+
+def test_bytecode_app_shows_its_error_screen(tmp_path, monkeypatch):
+    # No PC um '__app__.py' é importado pelo mesmo caminho que o '__app__.mpy'
+    shutil.copy(f'{PROJECT_PATH}/update_stage/calculator/__init__.py', tmp_path / '__app__.py')
+
+    def broken_input(*args):
+        raise RuntimeError('sem teclado')
+    monkeypatch.setattr(lib.events, 'get_input', broken_input)
+    monkeypatch.setattr(time, 'sleep', lambda seconds: None)
+
+    display = FakeDisplay()
+    hardware = {'display': display, 'touch': None, 'trackball': None, 'i2c': None, 'sound': None}
+    namespace = app_runner._run_bytecode(str(tmp_path), hardware)
+    assert namespace is not None
+    assert display.calls.get('fill_rect') # O handler do app achou o display e desenhou a tela de erro
+    assert not hasattr(builtins, 'display') # Removido ao sair
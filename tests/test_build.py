@@ -0,0 +1,118 @@
+import os
+import struct
+
+import pytest
+
+from tools import build
+
+# Cabeçalho PCM sem o chunk 'data': o encoder falha ao ler
+BROKEN_WAV = (b'RIFF' + struct.pack('<I', 28) + b'WAVE' + b'fmt ' + struct.pack('<I', 16) +
+              struct.pack('<HHIIHH', 1, 1, 22050, 44100, 2, 16))
+TOOLS = {'copy': 'copy', 'appkey': 'appkey', 'adpcm': 'adpcm', 'mpy': 'mpy-cross 1.0 -march=xtensawin'}
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return str(path)
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    root = tmp_path / 'projeto'
+    write(root / 'main.py', b'import app\n')
+    write(root / 'lib' / 'util.py', b'x = 1\n')
+    write(root / 'lib' / 'notas.txt', b'-')
+    write(root / 'update_stage' / 'calc' / '__init__.py', b'print("calc")\n')
+    write(root / 'update_stage' / 'calc' / 'sub' / '__init__.py', b'')
+    write(root / 'update_stage' / 'calc' / 'bip.wav', BROKEN_WAV)
+    write(root / 'update_stage' / 'calc' / 'icone.png', b'\x89PNG')
+    write(root / 'update_stage' / 'calc' / '.manifest', b'')
+    write(root / 'update_stage' / 'calc' / '__pycache__' / 'x.pyc', b'')
+    build_dir = tmp_path / 'build'
+    monkeypatch.setattr(build, 'PROJECT_PATH', str(root))
+    monkeypatch.setattr(build, 'BUILD_DIR', str(build_dir))
+    monkeypatch.setattr(build, 'STAGE_DIR', str(build_dir / 'stage'))
+    monkeypatch.setattr(build, 'CACHE_DIR', str(build_dir / 'cache'))
+    monkeypatch.setattr(build, 'STAGE_STATE_FILE', str(build_dir / 'stage.json'))
+    return root
+
+
+def test_job_key_depends_on_content_tool_and_kind(tmp_path):
+    a = write(tmp_path / 'a' / 'x.py', b'conteudo')
+    b = write(tmp_path / 'b' / 'y.py', b'conteudo')
+    c = write(tmp_path / 'c.py', b'outro')
+    key = build.job_key('mpy', [a], TOOLS)
+    assert build.job_key('mpy', [b], TOOLS) == key # Caminho e nome não entram
+    assert build.job_key('mpy', [c], TOOLS) != key
+    assert build.job_key('copy', [a], TOOLS) != key
+    assert build.job_key('mpy', [a], dict(TOOLS, mpy='mpy-cross 1.1 -march=xtensawin')) != key
+    os.utime(a, (0, 0))
+    assert build.job_key('mpy', [a], TOOLS) == key # mtime não entra
+
+
+def test_job_key_changes_with_build_version(tmp_path, monkeypatch):
+    a = write(tmp_path / 'x.py', b'conteudo')
+    key = build.job_key('copy', [a], TOOLS)
+    monkeypatch.setattr(build, 'BUILD_VERSION', build.BUILD_VERSION + 1)
+    assert build.job_key('copy', [a], TOOLS) != key
+
+
+def test_discover_jobs(project):
+    jobs = build.discover_jobs(TOOLS)
+    assert {out: kind for out, (kind, _) in jobs.items()} == {
+        'main.py': 'copy',
+        'lib/util.mpy': 'mpy',
+        'update_stage/calc/__init__.py': 'copy',
+        'update_stage/calc/__app__.mpy': 'mpy',
+        'update_stage/calc/__app__.key': 'appkey',
+        'update_stage/calc/sub/__init__.py': 'copy',
+        'update_stage/calc/bip.wav': 'adpcm',
+        'update_stage/calc/icone.png': 'copy', # Sem Pillow/NumPy o PNG vai como está
+    }
+    without_mpy = build.discover_jobs({k: v for k, v in TOOLS.items() if k != 'mpy'})
+    assert 'lib/util.py' in without_mpy and 'update_stage/calc/__app__.mpy' not in without_mpy
+
+
+def test_bytecode_key_file(tmp_path):
+    source = write(tmp_path / '__init__.py', b'abc')
+    out = str(tmp_path / '__app__.key')
+    build._bytecode_key([source], out)
+    with open(out) as f:
+        size, digest, mtime = f.read().split()
+    assert (size, mtime) == ('3', '0') and len(digest) == 64
+
+
+def test_incremental_build(project, monkeypatch, capsys):
+    tools = {k: v for k, v in TOOLS.items() if k not in ('mpy', 'adpcm')}
+    monkeypatch.setattr(build, '_tool_ids', lambda: tools)
+    (project / 'update_stage' / 'calc' / 'bip.wav').unlink()
+    stage = project.parent / 'build' / 'stage'
+
+    assert build.build(workers=1)
+    first = capsys.readouterr().out
+    assert '5 saída(s), 5 convertida(s), 5 atualizada(s)' in first
+    assert (stage / 'lib' / 'util.py').read_bytes() == b'x = 1\n'
+
+    assert build.build(workers=1)
+    assert '0 convertida(s), 0 atualizada(s), 0 removida(s)' in capsys.readouterr().out
+
+    write(project / 'lib' / 'util.py', b'x = 2\n')
+    (project / 'update_stage' / 'calc' / 'icone.png').unlink()
+    assert build.build(workers=1)
+    assert '1 convertida(s), 1 atualizada(s), 1 removida(s)' in capsys.readouterr().out
+    assert (stage / 'lib' / 'util.py').read_bytes() == b'x = 2\n'
+    assert not (stage / 'update_stage' / 'calc' / 'icone.png').exists()
+
+    # Voltar ao conteúdo anterior reaproveita o cache
+    write(project / 'lib' / 'util.py', b'x = 1\n')
+    assert build.build(workers=1)
+    assert '0 convertida(s), 1 atualizada(s)' in capsys.readouterr().out
+
+
+def test_failed_conversion_is_reported(project, monkeypatch, capsys):
+    monkeypatch.setattr(build, '_tool_ids', lambda: {k: v for k, v in TOOLS.items() if k != 'mpy'})
+    assert not build.build(workers=1)
+    assert 'ERRO: adpcm: update_stage/calc/bip.wav' in capsys.readouterr().out
+    assert not (project.parent / 'build' / 'stage' / 'update_stage' / 'calc' / 'bip.wav').exists()
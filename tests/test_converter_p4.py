@@ -0,0 +1,77 @@
+import struct
+
+import pytest
+from PIL import Image
+
+from tools.converter_para_p4 import image_to_p4, convert_tree, MAX_DIMENSION
+
+COLORS = [(200, 30, 30), (30, 200, 30), (30, 30, 200), (220, 220, 40), (250, 250, 250), (120, 60, 160)]
+
+
+def reference_p4(img):
+    """
+    Conversor por pixel da versão original (busca de cada cor na paleta),
+    com a coluna transparente das larguras ímpares.
+    """
+    img = img.convert('RGBA')
+    quantized = img.quantize(colors=15, method=Image.FASTOCTREE)
+    palette = quantized.getpalette()
+    palette.extend([0] * (45 - len(palette)))
+    out = bytearray(struct.pack('>H', 0))
+    color_map = {}
+    for i in range(15):
+        r, g, b = palette[i * 3:i * 3 + 3]
+        out += struct.pack('>H', ((r & 0xF8) << 8) | ((g & 0xFC) << 3) | (b >> 3))
+        color_map[(r, g, b)] = i + 1
+
+    rgb = quantized.convert('RGB')
+    width, height = img.size
+    padded = width + (width & 1)
+    pixels = []
+    for y in range(height):
+        for x in range(padded):
+            if x < width and img.getpixel((x, y))[3] >= 128:
+                pixels.append(color_map.get(rgb.getpixel((x, y)), 0))
+            else:
+                pixels.append(0)
+    packed = bytes((pixels[i] << 4) | pixels[i + 1] for i in range(0, len(pixels), 2))
+    return bytes((padded, height)) + bytes(out) + packed
+
+
+def sample_image(width, height):
+    img = Image.new('RGBA', (width, height))
+    for y in range(height):
+        for x in range(width):
+            alpha = 0 if (x + y) % 5 == 0 else 255
+            img.putpixel((x, y), COLORS[(x * 3 + y) % len(COLORS)] + (alpha,))
+    return img
+
+
+@pytest.mark.parametrize('size', [(7, 5), (8, 3), (1, 1)])
+def test_matches_the_per_pixel_converter(size):
+    img = sample_image(*size)
+    data = image_to_p4(img)
+    assert data == reference_p4(img)
+    width, height = size
+    assert len(data) == 2 + 32 + (width + 1) // 2 * height
+
+
+def test_odd_width_pads_a_transparent_column():
+    data = image_to_p4(sample_image(7, 5))
+    assert data[0:2] == bytes((8, 5))
+    rows = data[34:]
+    assert all(rows[r * 4 + 3] & 0x0F == 0 for r in range(5))
+
+
+def test_too_large_is_rejected():
+    with pytest.raises(ValueError):
+        image_to_p4(Image.new('RGBA', (MAX_DIMENSION, 2))) # Completada para 256
+
+
+def test_convert_tree(tmp_path):
+    sample_image(7, 5).save(tmp_path / 'a.png')
+    (tmp_path / 'sub').mkdir()
+    sample_image(4, 4).save(tmp_path / 'sub' / 'b.png')
+    assert convert_tree(str(tmp_path), workers=2) == 2
+    assert (tmp_path / 'a.p4').read_bytes() == reference_p4(Image.open(tmp_path / 'a.png'))
+    assert (tmp_path / 'sub' / 'b.p4').read_bytes() == reference_p4(Image.open(tmp_path / 'sub' / 'b.png'))
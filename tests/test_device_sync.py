@@ -0,0 +1,140 @@
+import os
+import struct
+
+import pytest
+
+from tools.bundle_packer import pack_bundle, verify_bundle, METHOD_KEEP
+from tools.device_sync import (file_digest, parse_manifest, local_flash_files, local_app_manifest,
+                               plan_sync, build_batch, print_plan, BUNDLE_REMOTE_PATH)
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return str(path)
+
+
+def manifest_text(manifest):
+    return ''.join(f"{size} {digest} {rel}\n" for rel, (size, digest) in sorted(manifest.items()))
+
+
+@pytest.fixture
+def project(tmp_path):
+    write(tmp_path / 'main.py', b'print(1)\n')
+    write(tmp_path / 'lib' / 'a.py', b'a = 1\n')
+    write(tmp_path / 'lib' / 'b.mpy', b'M\x06')
+    write(tmp_path / 'lib' / 'notas.txt', b'fora do sync')
+    for app in ('calc', 'notes', 'novo'):
+        write(tmp_path / 'apps' / app / '__init__.py', app.encode())
+        write(tmp_path / 'apps' / app / 'dados' / 'x.bin', b'\x00' * 10)
+        write(tmp_path / 'apps' / app / '.manifest', b'ignorado')
+    return tmp_path
+
+
+def test_file_digest_and_manifest(project):
+    size, digest = file_digest(str(project / 'main.py'))
+    assert size == 9 and len(digest) == 64
+    manifest = local_app_manifest(str(project / 'apps' / 'calc'))
+    assert sorted(manifest) == ['__init__.py', 'dados/x.bin']
+    assert parse_manifest(manifest_text(manifest) + 'linha inválida\n') == manifest
+
+
+def test_local_flash_files_only_takes_managed_suffixes(project):
+    assert sorted(local_flash_files(str(project))) == ['lib/a.py', 'lib/b.mpy', 'main.py']
+
+
+def test_plan_uploads_changed_deletes_stale_and_bundles_changed_apps(project):
+    flash = local_flash_files(str(project))
+    apps = [str(project / 'apps' / app) for app in ('calc', 'notes', 'novo')]
+    device = {
+        'files': {
+            'main.py': (9, 'outro hash'),
+            'lib/a.py': file_digest(flash['lib/a.py']),
+            'lib/b.mpy': file_digest(flash['lib/b.mpy']),
+            'lib/velho.mpy': (3, 'abc'),
+        },
+        'dirs': ['lib'],
+        'apps': {
+            'calc': manifest_text(local_app_manifest(apps[0])),
+            'notes': manifest_text({'__init__.py': (5, 'x')}),
+        },
+    }
+    plan = plan_sync(device, flash, apps)
+    assert plan['upload'] == [('main.py', flash['main.py'], 9)]
+    assert plan['delete'] == ['lib/velho.mpy']
+    assert plan['mkdir'] == []
+    assert plan['apps'] == apps[1:]
+    assert plan['total'] == 9 + 6 + 2 + 3 * (4 + 10) + 1 # '__init__.py' de 'notes' tem 5 bytes
+
+    assert build_batch(plan, 'b.bundle') == [
+        'mpremote', 'fs', 'cp', flash['main.py'], ':main.py',
+        '+', 'fs', 'rm', ':lib/velho.mpy',
+        '+', 'fs', 'cp', 'b.bundle', f":{BUNDLE_REMOTE_PATH}"]
+
+
+def test_plan_on_empty_device(project):
+    flash = local_flash_files(str(project))
+    apps = [str(project / 'apps' / 'calc')]
+    plan = plan_sync({'files': {}, 'dirs': [], 'apps': None}, flash, apps)
+    assert [remote for remote, _, _ in plan['upload']] == list(flash)
+    assert plan['mkdir'] == ['lib']
+    assert plan['apps'] == apps # Sem SD: os apps vão todos no bundle
+
+
+def test_nothing_to_do(project):
+    flash = local_flash_files(str(project))
+    device = {'files': {r: file_digest(p) for r, p in flash.items()}, 'dirs': ['lib'], 'apps': {}}
+    plan = plan_sync(device, flash, [])
+    assert not (plan['upload'] or plan['delete'] or plan['mkdir'] or plan['apps'])
+    assert build_batch(plan) is None
+
+
+def test_only_changed_files_of_an_app_are_bundled(project, tmp_path):
+    app = str(project / 'apps' / 'calc')
+    manifest = local_app_manifest(app)
+    device = {'files': {}, 'dirs': ['lib'],
+              'apps': {'calc': manifest_text(dict(manifest, **{'__init__.py': (4, 'antigo')}))}}
+    plan = plan_sync(device, {}, [app])
+    assert plan['apps'] == [app]
+    assert plan['app_files'] == {'calc': [('__init__.py', 4)]}
+    assert plan['keep'] == {'calc': ['dados/x.bin']}
+
+    bundle = str(tmp_path / 'b.bundle')
+    raw, _ = pack_bundle(plan['apps'], bundle, plan['keep'])
+    assert raw == 4
+    assert verify_bundle(bundle) == 2
+    with open(bundle, 'rb') as f:
+        f.seek(6)
+        entries = {}
+        for _ in range(2):
+            name = f.read(struct.unpack('<H', f.read(2))[0]).decode()
+            method, size, csize, _ = struct.unpack('<BII32s', f.read(41))
+            f.seek(csize, 1)
+            entries[name] = (method, size, csize)
+    # O arquivo igual vai só no manifesto, com o tamanho real e sem dados
+    assert entries['calc/dados/x.bin'] == (METHOD_KEEP, 10, 0)
+    assert entries['calc/__init__.py'][0] != METHOD_KEEP
+
+
+def test_removed_apps_and_files_are_deleted(project, capsys):
+    app = str(project / 'apps' / 'calc')
+    manifest = local_app_manifest(app)
+    device = {'files': {}, 'dirs': ['lib'], 'apps': {
+        'calc': manifest_text(dict(manifest, **{'antigo.txt': (3, 'abc')})),
+        'velho': manifest_text({'__init__.py': (5, 'x')}),
+    }}
+    plan = plan_sync(device, {}, [app])
+    assert plan['apps'] == [app] and plan['app_files'] == {'calc': []}
+    assert plan['app_deletes'] == ['calc/antigo.txt'] # O updater apaga no boot
+    assert plan['remove_apps'] == ['velho']
+    assert build_batch(plan, 'b.bundle') == [
+        'mpremote', 'fs', 'rm', '-r', ':/sd/app/velho',
+        '+', 'fs', 'cp', 'b.bundle', f":{BUNDLE_REMOTE_PATH}"]
+
+    # O --dry-run mostra as remoções
+    print_plan(plan)
+    out = capsys.readouterr().out
+    assert '/sd/app/calc/antigo.txt' in out and '/sd/app/velho' in out
+
+    assert plan_sync(device, {}, [app], prune_apps=False)['remove_apps'] == []
@@ -0,0 +1,186 @@
+import random
+from array import array
+
+from lib.mixer import Mixer, ToneVoice, RING_BUFFERS, CHUNK_SAMPLES, UNITY_VOLUME, SAMPLE_RATE, EFFECT_SLOT
+
+
+class FakeI2S:
+    """I2S com irq(): cada write() fica 'em envio' até complete() chamar o callback."""
+
+    def __init__(self):
+        self.callback = None
+        self.out = array('h')
+        self.busy = False
+        self.in_irq = False
+
+    def irq(self, callback):
+        self.callback = callback
+
+    def write(self, buf):
+        assert not self.busy
+        self.busy = True
+        self.out.extend(array('h', bytes(buf)))
+
+    def complete(self):
+        self.busy = False
+        self.in_irq = True
+        try:
+            self.callback(self)
+        finally:
+            self.in_irq = False
+
+    def drain(self, mixer):
+        while self.busy:
+            self.complete()
+            mixer.pump()
+
+
+class BlockingI2S:
+    def __init__(self):
+        self.out = array('h')
+
+    def write(self, buf):
+        self.out.extend(array('h', bytes(buf)))
+
+
+class WatchedVoice(ToneVoice):
+    """Faz o papel de uma voz do SD: falha se for lida de dentro do callback do I2S."""
+
+    in_memory = False
+
+    def __init__(self, i2s, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.i2s = i2s
+        self.reads = 0
+
+    def read(self, buf, n):
+        assert not self.i2s.in_irq
+        self.reads += 1
+        return super().read(buf, n)
+
+
+CYCLE = array('h', range(1, 101))
+
+
+def effect(segments):
+    """ToneVoice como a de SoundManager.play: um ciclo de SAMPLE_RATE // frequência amostras."""
+    return ToneVoice([(array('h', range(1, SAMPLE_RATE // frequency + 1)), cycles) for frequency, cycles in segments])
+
+
+def test_callback_only_sends_and_output_is_exact():
+    rng = random.Random(1)
+    i2s = FakeI2S()
+    mixer = Mixer(i2s)
+    voice = WatchedVoice(i2s, ((CYCLE, 30),))
+    mixer.play(voice)
+    for _ in range(300):
+        if i2s.busy and rng.random() < 0.6:
+            i2s.complete()
+        if rng.random() < 0.3:
+            mixer.pump()
+    i2s.drain(mixer)
+    assert i2s.out == CYCLE * 30
+    assert not mixer.active()
+
+
+def test_ring_holds_at_most_ring_buffers_ahead():
+    i2s = FakeI2S()
+    mixer = Mixer(i2s)
+    voice = WatchedVoice(i2s, ((CYCLE, 1000),))
+    mixer.play(voice)
+    for _ in range(5):
+        mixer.pump()
+    assert voice.reads == RING_BUFFERS
+    assert len(i2s.out) == CHUNK_SAMPLES # Só o primeiro buffer foi entregue
+    i2s.complete()
+    assert len(i2s.out) == 2 * CHUNK_SAMPLES and voice.reads == RING_BUFFERS
+
+
+def test_output_stops_when_ring_empties_and_restarts_on_pump():
+    i2s = FakeI2S()
+    mixer = Mixer(i2s)
+    mixer.play(WatchedVoice(i2s, ((CYCLE, 100),)))
+    for _ in range(RING_BUFFERS):
+        i2s.complete()
+    assert not i2s.busy and mixer.active()
+    mixer.pump()
+    assert i2s.busy
+    i2s.drain(mixer)
+    assert i2s.out == CYCLE * 100
+
+
+def test_voices_are_mixed_with_volume_and_saturation():
+    i2s = FakeI2S()
+    mixer = Mixer(i2s)
+    loud = array('h', (30000,) * 10)
+    low = array('h', (-20000,) * 5)
+    mixer.voices[1] = ToneVoice(((loud, 1),))
+    mixer.voices[2] = ToneVoice(((loud, 1),), volume=UNITY_VOLUME // 2)
+    mixer.voices[3] = ToneVoice(((low, 1),), volume=2 * UNITY_VOLUME)
+    mixer.pump()
+    i2s.drain(mixer)
+    assert list(i2s.out) == [32767 - 40000] * 5 + [32767] * 5 # Satura a cada voz somada
+
+
+def test_stop_keeps_already_mixed_audio():
+    i2s = FakeI2S()
+    mixer = Mixer(i2s)
+    slot = mixer.play(ToneVoice(((CYCLE, 1000),)))
+    mixer.stop(slot)
+    assert mixer.voices[slot] is None
+    i2s.drain(mixer)
+    assert len(i2s.out) == RING_BUFFERS * CHUNK_SAMPLES
+    assert not mixer.active()
+
+
+def test_without_irq_plays_blocking():
+    i2s = BlockingI2S()
+    mixer = Mixer(i2s)
+    mixer.play(ToneVoice(((CYCLE, 12),)))
+    assert i2s.out == CYCLE * 12
+    assert not mixer.active()
+
+
+def test_effect_plays_whole_without_pump():
+    i2s = FakeI2S()
+    mixer = Mixer(i2s)
+    mixer.play(effect(((523, 40), (659, 40))), EFFECT_SLOT) # 'confirm' de lib/sound.py
+    while i2s.busy:
+        i2s.complete()
+    assert len(i2s.out) == 3000
+    assert not mixer.active()
+
+
+def test_callback_leaves_file_voices_to_pump():
+    i2s = FakeI2S()
+    mixer = Mixer(i2s)
+    mixer.play(WatchedVoice(i2s, ((CYCLE, 100),)))
+    mixer.play(effect(((330, 60),)), EFFECT_SLOT)
+    while i2s.busy:
+        i2s.complete()
+    assert len(i2s.out) == RING_BUFFERS * CHUNK_SAMPLES
+    mixer.pump()
+    i2s.drain(mixer)
+    assert len(i2s.out) == 100 * len(CYCLE)
+
+
+def test_callback_does_not_mix_while_pump_runs():
+    i2s = FakeI2S()
+    mixer = Mixer(i2s)
+
+    class CompletingVoice(ToneVoice):
+        def read(self, buf, n):
+            if i2s.busy:
+                i2s.complete() # Callback agendado no meio do pump()
+            return super().read(buf, n)
+
+    mixer.voices[EFFECT_SLOT] = effect(((330, 60),))
+    mixer.voices[1] = CompletingVoice(((CYCLE, 100),))
+    for _ in range(50):
+        mixer.pump()
+        if i2s.busy:
+            i2s.complete()
+    assert not mixer.active()
+    tone = range(1, SAMPLE_RATE // 330 + 1)
+    expected = [CYCLE[i % 100] + (tone[i % len(tone)] if i < 60 * len(tone) else 0) for i in range(10000)]
+    assert list(i2s.out) == expected
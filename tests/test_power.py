@@ -0,0 +1,105 @@
+import pytest
+
+from lib import power
+from lib.power import (PowerGovernor, STATE_ACTIVE, STATE_DIM, STATE_OFF, DEFAULT_DIM_AFTER_MS,
+                       DEFAULT_OFF_AFTER_MS, SLEEP_SLICE_MS, ACTIVE_FREQ, IDLE_FREQ, BACKLIGHT_FULL,
+                       BACKLIGHT_DIM)
+from tools.fake_machine import FakeTime, FakeMachine, FakePin, FakeDisplay
+
+
+class FakePoller:
+    def __init__(self):
+        self.paused = False
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+
+
+@pytest.fixture
+def rig(tmp_path, monkeypatch):
+    monkeypatch.setattr(power, 'POWER_CONFIG_FILE', str(tmp_path / 'power.conf'))
+    clock = FakeTime()
+    machine = FakeMachine(clock)
+    display = FakeDisplay()
+    wake_pin = FakePin(0, FakePin.IN, value=1)
+    poller = FakePoller()
+    governor = PowerGovernor(FakePin(42), display=display, wake_pin=wake_pin, machine=machine,
+                             time=clock, pollers=(poller,))
+    return governor, clock, machine, display, wake_pin, poller
+
+
+def go_idle(governor, clock, ms):
+    clock.advance(ms)
+    return governor.update()
+
+
+def test_dims_after_timeout_and_lowers_the_cpu(rig):
+    governor, clock, machine, display, _, _ = rig
+    assert go_idle(governor, clock, DEFAULT_DIM_AFTER_MS - 1) == STATE_ACTIVE
+    assert (governor._pwm.duty_u16(), machine.freq()) == (BACKLIGHT_FULL, ACTIVE_FREQ)
+    assert governor.next_deadline_ms() == 1
+
+    assert go_idle(governor, clock, 1) == STATE_DIM
+    assert (governor._pwm.duty_u16(), machine.freq()) == (BACKLIGHT_DIM, IDLE_FREQ)
+    assert governor.screen_on and not display.sleeping
+    assert governor.next_deadline_ms() == DEFAULT_OFF_AFTER_MS - DEFAULT_DIM_AFTER_MS
+
+
+def test_turns_off_and_pauses_pollers(rig):
+    governor, clock, machine, display, _, poller = rig
+    assert go_idle(governor, clock, DEFAULT_OFF_AFTER_MS) == STATE_OFF
+    assert governor._pwm.duty_u16() == 0 and machine.freq() == IDLE_FREQ
+    assert display.sleeping and poller.paused
+    assert not governor.screen_on
+
+
+def test_lightsleep_in_slices_only_with_the_screen_off(rig):
+    governor, clock, machine, _, _, _ = rig
+    governor.sleep()
+    assert machine.lightsleep_calls == 0 # Tela ligada: não dorme
+
+    go_idle(governor, clock, DEFAULT_OFF_AFTER_MS)
+    start = clock.now_ms
+    governor.sleep(10 * SLEEP_SLICE_MS)
+    governor.sleep(500)
+    assert machine.lightsleep_calls == 2
+    assert clock.now_ms - start == SLEEP_SLICE_MS + 500
+    assert governor.sleep_ms_total == SLEEP_SLICE_MS + 500
+
+
+def test_input_wakes_and_restores_everything(rig):
+    governor, clock, machine, display, wake_pin, poller = rig
+    go_idle(governor, clock, DEFAULT_OFF_AFTER_MS)
+
+    # Um clique no meio da fatia encerra o lightsleep
+    machine.wake_at = clock.now_ms + 300
+    wake_pin.value(0)
+    governor.sleep()
+    assert clock.now_ms == machine.wake_at
+    assert governor.wake_requested()
+
+    assert governor.activity() # Estava desligada: a entrada só acorda
+    assert governor.state == STATE_ACTIVE
+    assert (governor._pwm.duty_u16(), machine.freq()) == (BACKLIGHT_FULL, ACTIVE_FREQ)
+    assert not display.sleeping and not poller.paused
+    assert governor.next_deadline_ms() == DEFAULT_DIM_AFTER_MS
+
+
+def test_activity_while_dim_is_a_normal_input(rig):
+    governor, clock, machine, _, _, _ = rig
+    go_idle(governor, clock, DEFAULT_DIM_AFTER_MS)
+    assert not governor.activity()
+    assert (governor._pwm.duty_u16(), machine.freq()) == (BACKLIGHT_FULL, ACTIVE_FREQ)
+
+
+def test_timeouts_from_config(tmp_path, monkeypatch):
+    config = tmp_path / 'power.conf'
+    config.write_text('dim=5\noff=3\n')
+    monkeypatch.setattr(power, 'POWER_CONFIG_FILE', str(config))
+    clock = FakeTime()
+    governor = PowerGovernor(FakePin(42), machine=FakeMachine(clock), time=clock)
+    assert (governor.dim_after_ms, governor.off_after_ms) == (5000, 5000) # off nunca antes do dim
+    assert go_idle(governor, clock, 5000) == STATE_OFF
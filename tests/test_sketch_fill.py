@@ -0,0 +1,108 @@
+import random
+from array import array
+
+import pytest
+
+WIDTH, HEIGHT = 320, 240
+ROW_BYTES = WIDTH // 8
+
+
+def bit(bitmap, x, y):
+    return (bitmap[y * ROW_BYTES + (x >> 3)] >> (7 - (x & 7))) & 1
+
+
+def reference_fill(bitmap, x, y):
+    """Pixels livres 4-conectados a (x, y), por busca em largura."""
+    if bit(bitmap, x, y):
+        return set()
+    seen = {(x, y)}
+    todo = [(x, y)]
+    while todo:
+        cx, cy = todo.pop()
+        for nx, ny in ((cx + 1, cy), (cx - 1, cy), (cx, cy + 1), (cx, cy - 1)):
+            if 0 <= nx < WIDTH and 0 <= ny < HEIGHT and (nx, ny) not in seen and not bit(bitmap, nx, ny):
+                seen.add((nx, ny))
+                todo.append((nx, ny))
+    return seen
+
+
+def new_pixels(before, after):
+    pixels = set()
+    for i, (a, b) in enumerate(zip(before, after)):
+        diff = b & ~a
+        for k in range(8):
+            if diff & (0x80 >> k):
+                pixels.add(((i % ROW_BYTES) * 8 + k, i // ROW_BYTES))
+    return pixels
+
+
+def noise(app, seed, density):
+    rng = random.Random(seed)
+    buf = app.draw_buffer
+    for i in range(len(buf)):
+        buf[i] = sum(1 << k for k in range(8) if rng.random() < density)
+    return rng.randrange(WIDTH), rng.randrange(HEIGHT)
+
+
+def display_matches_bitmap(app):
+    fb = app.display.fb
+    return all(fb[y * WIDTH + x] == bit(app.draw_buffer, x, y) for y in range(HEIGHT) for x in range(WIDTH))
+
+
+def test_fill_empty_screen_is_one_fill_rect(sketch_app):
+    assert sketch_app._flood_fill(10, 20, True) == (0, HEIGHT - 1)
+    assert sketch_app.draw_buffer == b'\xff' * len(sketch_app.draw_buffer)
+    assert sketch_app.display.calls == {'fill_rect': 1}
+
+
+def test_fill_stays_inside_closed_shape(sketch_app):
+    app = sketch_app
+    for y in (50, 150):
+        app._fill_bits(y, 40, 200)
+    for y in range(50, 151):
+        app._fill_bits(y, 40, 40)
+        app._fill_bits(y, 200, 200)
+    before = bytes(app.draw_buffer)
+    assert app._flood_fill(100, 100, False) == (51, 149)
+    assert new_pixels(before, app.draw_buffer) == {(x, y) for x in range(41, 200) for y in range(51, 150)}
+
+
+def test_fill_on_drawn_pixel_does_nothing(sketch_app):
+    sketch_app._fill_bits(5, 0, 10)
+    assert sketch_app._flood_fill(3, 5, True) is None
+    assert not sketch_app.display.calls
+
+
+@pytest.mark.parametrize('seed, density', [(1, 0.05), (2, 0.2), (3, 0.35), (4, 0.45)])
+def test_fill_matches_reference(sketch_app, seed, density):
+    x, y = noise(sketch_app, seed, density)
+    sketch_app.display.fb[:] = bytes(bit(sketch_app.draw_buffer, i % WIDTH, i // WIDTH)
+                                     for i in range(WIDTH * HEIGHT))
+    before = bytes(sketch_app.draw_buffer)
+    sketch_app._flood_fill(x, y, True)
+    assert new_pixels(before, sketch_app.draw_buffer) == reference_fill(before, x, y)
+    assert display_matches_bitmap(sketch_app)
+
+
+@pytest.mark.parametrize('seeds, seed, density', [(2, 5, 0.05), (8, 6, 0.1), (64, 7, 0.2), (512, 8, 0.05)])
+def test_fill_overflow_path_matches_reference(sketch, sketch_app, monkeypatch, seeds, seed, density):
+    """Com a pilha pequena (ou ruído denso), o preenchimento passa pelas varreduras de _reseed."""
+    passes = []
+    reseed = sketch.SketchApp._reseed
+    monkeypatch.setattr(sketch.SketchApp, '_reseed', lambda self, *a: passes.append(1) or reseed(self, *a))
+    sketch_app._fill_stack = array('h', bytes(4 * seeds))
+    x, y = noise(sketch_app, seed, density)
+    before = bytes(sketch_app.draw_buffer)
+    sketch_app._flood_fill(x, y, False)
+    assert passes
+    assert new_pixels(before, sketch_app.draw_buffer) == reference_fill(before, x, y)
+
+
+def test_reseed_seeds_every_free_run_in_a_byte(sketch_app):
+    app = sketch_app
+    mask = bytearray(len(app.draw_buffer))
+    mask[ROW_BYTES] = 0xFF # Linha 1, pixels 0-7 já preenchidos
+    app.draw_buffer[0] = 0b01100100 # Linha 0: trechos livres em 0, 3-4 e 6-7
+    top = app._reseed(mask, app._fill_stack)
+    seeds = [(app._fill_stack[i], app._fill_stack[i + 1]) for i in range(0, top, 2)]
+    assert seeds[:3] == [(0, 0), (3, 0), (6, 0)]
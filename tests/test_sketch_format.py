@@ -0,0 +1,131 @@
+import io
+import random
+import struct
+
+import pytest
+
+WIDTH, HEIGHT = 320, 240
+ROW_BYTES = WIDTH // 8
+BITMAP_SIZE = ROW_BYTES * HEIGHT
+THUMB_SIZE = (WIDTH // 4) * (HEIGHT // 4) // 8
+
+
+def random_bitmap(seed, density=0.1):
+    rng = random.Random(seed)
+    return bytearray(sum(1 << k for k in range(8) if rng.random() < density) for _ in range(BITMAP_SIZE))
+
+
+def reference_thumbnail(bitmap):
+    thumb = bytearray(THUMB_SIZE)
+    tw = WIDTH // 4
+    for y in range(HEIGHT):
+        for x in range(WIDTH):
+            if bitmap[y * ROW_BYTES + x // 8] & (0x80 >> (x % 8)):
+                t = (y // 4) * tw + x // 4
+                thumb[t // 8] |= 0x80 >> (t % 8)
+    return thumb
+
+
+@pytest.mark.parametrize('row', [
+    b'',
+    b'\x00' * 40,
+    bytes(range(40)),
+    b'\x01\x01\x02\x02\x03\x03\x03\x04',
+    b'\xaa' * 300,
+    bytes(range(256)) + b'\x00' * 3,
+    bytes(random.Random(1).randrange(3) for _ in range(500)),
+])
+def test_packbits_roundtrip(sketch, row):
+    packed = bytearray()
+    sketch.packbits_row(row, packed)
+    out = bytearray(len(row))
+    sketch.unpackbits(io.BytesIO(packed), out)
+    assert out == row
+
+
+def test_packbits_encoding(sketch):
+    packed = bytearray()
+    sketch.packbits_row(b'\x00' * 40 + b'\x01\x02', packed)
+    assert packed == bytes((257 - 40, 0, 1, 1, 2))
+
+
+def test_packbits_runs_are_capped_at_128(sketch):
+    row = b'\x07' * 300
+    packed = bytearray()
+    sketch.packbits_row(row, packed)
+    assert packed == bytes((129, 7, 129, 7, 213, 7)) # 128 + 128 + 44
+    out = bytearray(len(row))
+    sketch.unpackbits(io.BytesIO(packed), out)
+    assert out == row
+
+
+def test_unpackbits_skips_noop_header_and_stops_when_full(sketch):
+    out = bytearray(4)
+    sketch.unpackbits(io.BytesIO(bytes((128, 255, 9, 1, 5, 6, 200))), out)
+    assert out == b'\x09\x09\x05\x06'
+
+
+def test_unpackbits_truncated_raises_eof(sketch):
+    with pytest.raises(EOFError):
+        sketch.unpackbits(io.BytesIO(bytes((3, 1, 2))), bytearray(4))
+
+
+@pytest.mark.parametrize('seed', [1, 2])
+def test_make_thumbnail_lights_any_set_pixel_in_block(sketch, seed):
+    bitmap = random_bitmap(seed, 0.01)
+    thumb = bytearray(THUMB_SIZE)
+    sketch.make_thumbnail(bitmap, ROW_BYTES, HEIGHT, thumb)
+    assert thumb == reference_thumbnail(bitmap)
+
+
+def test_make_thumbnail_single_pixel(sketch):
+    bitmap = bytearray(BITMAP_SIZE)
+    bitmap[13 * ROW_BYTES + 101 // 8] = 0x80 >> (101 % 8) # (101, 13) -> (25, 3)
+    thumb = bytearray(THUMB_SIZE)
+    sketch.make_thumbnail(bitmap, ROW_BYTES, HEIGHT, thumb)
+    t = 3 * (WIDTH // 4) + 25
+    expected = bytearray(THUMB_SIZE)
+    expected[t // 8] = 0x80 >> (t % 8)
+    assert thumb == expected
+
+
+@pytest.mark.parametrize('bitmap', [bytearray(BITMAP_SIZE), random_bitmap(3), random_bitmap(4, 0.5)])
+def test_sketch_file_roundtrip(sketch, bitmap):
+    f = io.BytesIO()
+    sketch.write_sketch(f, bitmap, WIDTH, HEIGHT)
+    data = f.getvalue()
+    assert struct.unpack(sketch.SKETCH_HEADER_FMT, data[:sketch.SKETCH_HEADER_SIZE]) == \
+        (b'SK', sketch.SKETCH_VERSION, 0, WIDTH, HEIGHT, WIDTH // 4, HEIGHT // 4)
+
+    loaded = bytearray(BITMAP_SIZE)
+    sketch.read_sketch(io.BytesIO(data), loaded)
+    assert loaded == bitmap
+
+    thumb = bytearray(THUMB_SIZE)
+    sketch.read_thumbnail(io.BytesIO(data), thumb, WIDTH, HEIGHT)
+    assert thumb == reference_thumbnail(bitmap)
+
+
+def test_empty_sketch_is_small(sketch):
+    f = io.BytesIO()
+    sketch.write_sketch(f, bytearray(BITMAP_SIZE), WIDTH, HEIGHT)
+    assert len(f.getvalue()) == sketch.SKETCH_HEADER_SIZE + THUMB_SIZE + 2 * HEIGHT
+
+
+def test_legacy_file(sketch):
+    bitmap = random_bitmap(5)
+    data = bytes((WIDTH >> 8, WIDTH & 0xFF, HEIGHT >> 8, HEIGHT & 0xFF)) + bitmap
+
+    loaded = bytearray(BITMAP_SIZE)
+    sketch.read_sketch(io.BytesIO(data), loaded)
+    assert loaded == bitmap
+
+    thumb = bytearray(THUMB_SIZE)
+    sketch.read_thumbnail(io.BytesIO(data), thumb, WIDTH, HEIGHT)
+    assert thumb == reference_thumbnail(bitmap)
+
+
+def test_unknown_version_is_rejected(sketch):
+    header = struct.pack(sketch.SKETCH_HEADER_FMT, b'SK', sketch.SKETCH_VERSION + 1, 0, WIDTH, HEIGHT, 80, 60)
+    with pytest.raises(ValueError):
+        sketch.read_sketch(io.BytesIO(header), bytearray(BITMAP_SIZE))
@@ -0,0 +1,189 @@
+import io
+import random
+
+import pytest
+
+
+def make_stroke(sketch, rng, tool=None, size=3):
+    x, y = rng.randrange(20, 300), rng.randrange(20, 220)
+    stroke = sketch.Stroke(sketch.TOOL_PEN if tool is None else tool, size, x, y)
+    for _ in range(rng.randrange(0, 6)):
+        stroke.add(min(319, max(0, x + rng.randrange(-15, 16))), min(239, max(0, y + rng.randrange(-15, 16))))
+    return stroke
+
+
+def same_stroke(a, b):
+    return (a.tool, a.size, list(a.points()), a.ymin, a.ymax) == (b.tool, b.size, list(b.points()), b.ymin, b.ymax)
+
+
+def test_stroke_splits_long_jumps(sketch):
+    stroke = sketch.Stroke(sketch.TOOL_PEN, 1, 0, 0)
+    assert stroke.add(0, 0) == ()
+    added = stroke.add(300, -10)
+    assert added[-1] == (300, -10)
+    assert len(added) == 3 and all(-128 <= d <= 127 for d in stroke.deltas)
+    assert list(stroke.points()) == [(0, 0)] + added
+    assert (stroke.ymin, stroke.ymax) == (-10, 0)
+
+
+def test_stroke_record_roundtrip(sketch):
+    rng = random.Random(1)
+    stroke = make_stroke(sketch, rng)
+    stroke.add(10, 230)
+    f = io.BytesIO()
+    stroke.write_to(f)
+    f.seek(0)
+    loaded = sketch.Stroke.from_record(f.read(sketch.JOURNAL_HEADER_SIZE), f)
+    assert same_stroke(loaded, stroke)
+    assert (loaded.x, loaded.y) == (10, 230)
+
+
+def test_stroke_log_undo_redo(sketch):
+    log = sketch.StrokeLog()
+    a, b, c = (sketch.Stroke(sketch.TOOL_PEN, 1, i, i) for i in range(3))
+    log.push(a)
+    log.push(b)
+    assert log.undo() is b and log.undo() is a and log.undo() is None
+    assert log.redo() is a
+    log.push(c) # Descarta a pilha de refazer
+    assert log.strokes == [a, c] and log.redo() is None
+
+
+def test_checkpoints_are_thinned_not_dropped(sketch):
+    log = sketch.StrokeLog()
+    every = sketch.CHECKPOINT_EVERY
+    bitmap = bytearray(4)
+    for n in range(1, 40 * every + 1):
+        log.push(sketch.Stroke(sketch.TOOL_PEN, 1, 0, 0))
+        bitmap[0] = n & 0xFF
+        log.maybe_checkpoint(bitmap)
+        keys = sorted(log.checkpoints)
+        assert len(keys) <= sketch.MAX_CHECKPOINTS
+        assert all(log.checkpoints[k][0] == k & 0xFF for k in keys)
+    # O mais antigo continua lá e nenhum intervalo cresce sem limite
+    keys = sorted(log.checkpoints)
+    assert keys[0] <= 8 * every
+    assert max(b - a for a, b in zip([0] + keys, keys + [log.count])) <= 16 * every
+    assert log.checkpoint_for(keys[1] + 1) == (keys[1], log.checkpoints[keys[1]])
+    assert log.checkpoint_for(keys[0] - 1) == (0, None)
+
+
+def test_push_drops_checkpoints_past_the_undo_point(sketch):
+    log = sketch.StrokeLog()
+    for _ in range(2 * sketch.CHECKPOINT_EVERY):
+        log.push(sketch.Stroke(sketch.TOOL_PEN, 1, 0, 0))
+        log.maybe_checkpoint(b'\x00')
+    for _ in range(3):
+        log.undo()
+    log.push(sketch.Stroke(sketch.TOOL_PEN, 1, 0, 0))
+    assert sorted(log.checkpoints) == [sketch.CHECKPOINT_EVERY]
+
+
+def test_journal_roundtrip_with_undo_and_redo(sketch, tmp_path):
+    rng = random.Random(2)
+    log = sketch.StrokeLog()
+    for _ in range(5):
+        log.push(make_stroke(sketch, rng))
+    log.push(make_stroke(sketch, rng, sketch.TOOL_FILL, 0))
+    log.undo()
+    log.undo()
+    path = tmp_path / 'rascunho.journal'
+    with open(path, 'wb') as f:
+        sketch.write_journal(f, log)
+        f.write(bytes((sketch.OP_REDO,)))
+
+    loaded = sketch.StrokeLog()
+    sketch.read_journal(str(path), loaded)
+    assert loaded.count == log.count + 1
+    assert len(loaded.strokes) == len(log.strokes)
+    assert all(same_stroke(a, b) for a, b in zip(loaded.strokes, log.strokes))
+
+
+@pytest.mark.parametrize('cut', [1, 3, 8, 10])
+def test_journal_ignores_partial_last_record(sketch, tmp_path, cut):
+    rng = random.Random(3)
+    strokes = [make_stroke(sketch, rng) for _ in range(3)]
+    strokes[-1].add(0, 0)
+    f = io.BytesIO()
+    for stroke in strokes:
+        stroke.write_to(f)
+    data = f.getvalue()
+    last = sketch.JOURNAL_HEADER_SIZE + len(strokes[-1].deltas)
+    path = tmp_path / 'rascunho.journal'
+    path.write_bytes(data[:len(data) - last + cut])
+
+    log = sketch.StrokeLog()
+    sketch.read_journal(str(path), log)
+    assert log.count == 2
+    assert all(same_stroke(a, b) for a, b in zip(log.strokes, strokes))
+
+
+def test_undo_matches_drawing_from_scratch(sketch, sketch_app):
+    app = sketch_app
+    rng = random.Random(4)
+    snapshots = [bytes(app.draw_buffer)]
+    total = (sketch.MAX_CHECKPOINTS + 2) * sketch.CHECKPOINT_EVERY
+    for _ in range(total):
+        stroke = make_stroke(sketch, rng)
+        app._begin_stroke(stroke.x0, stroke.y0)
+        for x, y in list(stroke.points())[1:]:
+            app._extend_stroke(x, y)
+        app._last_raw = (stroke.x, stroke.y)
+        app._end_stroke()
+        snapshots.append(bytes(app.draw_buffer))
+    assert len(app.log.checkpoints) == sketch.MAX_CHECKPOINTS
+
+    for n in range(total - 1, -1, -1):
+        assert app._undo()
+        assert app.draw_buffer == snapshots[n]
+    assert not app._undo()
+    for n in range(1, 4):
+        assert app._redo()
+        assert app.draw_buffer == snapshots[n]
+
+
+class ScriptedInput:
+    """Entrada do trackball com uma sequência fixa de (direção, clique)."""
+
+    def __init__(self, events):
+        self.events = list(events)
+
+    def get_direction(self):
+        return self.events.pop(0) if self.events else (None, False)
+
+    def wait(self, timeout_ms):
+        pass
+
+
+class SilentSound:
+    def play_navigation(self):
+        pass
+
+    def play_confirm(self):
+        pass
+
+
+CLICK = (None, True)
+
+
+@pytest.fixture
+def draft(sketch, sketch_app, tmp_path, monkeypatch):
+    path = tmp_path / 'rascunho.journal'
+    path.write_bytes(b'\x01')
+    monkeypatch.setattr(sketch, 'JOURNAL_PATH', str(path))
+    sketch_app.sound = SilentSound()
+    return path
+
+
+def test_new_drawing_keeps_the_draft_unless_confirmed(sketch_app, draft):
+    # "Novo Desenho", "[ Nao ]" na confirmação, depois desce até "[ Sair ]"
+    sketch_app.input = ScriptedInput([CLICK, CLICK, ('down', False), ('down', False), ('down', False), CLICK])
+    sketch_app.run_main_menu()
+    assert sketch_app.mode == 'exit'
+    assert draft.read_bytes() == b'\x01'
+
+
+def test_new_drawing_after_discarding_the_draft(sketch_app, draft):
+    sketch_app.input = ScriptedInput([CLICK, ('right', False), CLICK])
+    sketch_app.run_main_menu()
+    assert sketch_app.mode == 'drawing'
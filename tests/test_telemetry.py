@@ -0,0 +1,90 @@
+from lib.telemetry import (Telemetry, LaunchRecord, largest_free_block, CAPACITY, MAX_PENDING, PROBE_LIMIT,
+                           PROBE_STEP, EXIT_ERROR, EXIT_MEMORY, FLAG_BYTECODE)
+
+
+def launch(name, first_frame_ms=0, load_ms=10, heap_peak=1000):
+    record = LaunchRecord(name)
+    record.timestamp = 1_700_000_000 # time.time() é inteiro no MicroPython
+    record.load_ms = load_ms
+    record.first_frame_ms = first_frame_ms
+    record.heap_peak = heap_peak
+    return record
+
+
+def test_record_roundtrip():
+    record = launch('um_nome_bem_comprido', 120, 45, 51234)
+    record.run_ms = 7300
+    record.largest_free = 4096
+    record.exit_reason = EXIT_MEMORY
+    record.flags = FLAG_BYTECODE
+    loaded = LaunchRecord.unpack(record.pack())
+    assert loaded.name == 'um_nome_bem_'
+    assert (loaded.timestamp, loaded.load_ms, loaded.first_frame_ms, loaded.run_ms) == (record.timestamp, 45, 120, 7000)
+    assert (loaded.heap_peak, loaded.largest_free, loaded.exit_reason, loaded.flags) == (51234, 4096, EXIT_MEMORY, FLAG_BYTECODE)
+
+
+def on_disk(path):
+    """Registros que outra instância (como depois de um reset) veria."""
+    return [r.name for r in Telemetry(path).read_all()]
+
+
+def test_writes_are_batched(tmp_path):
+    path = str(tmp_path / 'config' / 'telemetry.bin')
+    telemetry = Telemetry(path)
+    telemetry.record(launch('calc')) # A primeira escrita não espera
+    telemetry.record(launch('notes'))
+    assert on_disk(path) == ['calc']
+    assert [r.name for r in telemetry.read_all()] == ['calc', 'notes']
+    telemetry.flush()
+    assert on_disk(path) == ['calc', 'notes']
+
+
+def test_pending_limit_forces_a_write(tmp_path):
+    path = str(tmp_path / 'telemetry.bin')
+    telemetry = Telemetry(path)
+    for i in range(MAX_PENDING + 1):
+        telemetry.record(launch(f'app{i}'))
+    assert on_disk(path) == [f'app{i}' for i in range(MAX_PENDING + 1)]
+
+
+def test_failed_launch_is_written_at_once(tmp_path):
+    path = str(tmp_path / 'telemetry.bin')
+    telemetry = Telemetry(path)
+    telemetry.record(launch('calc'))
+    failed = launch('notes')
+    failed.exit_reason = EXIT_ERROR
+    telemetry.record(failed)
+    assert on_disk(path) == ['calc', 'notes']
+
+
+def test_ring_keeps_the_newest_records(tmp_path):
+    path = str(tmp_path / 'telemetry.bin')
+    telemetry = Telemetry(path)
+    for i in range(CAPACITY + 5):
+        telemetry.record(launch(f'app{i}'))
+    newest = [f'app{i}' for i in range(5, CAPACITY + 5)]
+    assert [r.name for r in telemetry.read_all()] == newest
+    telemetry.flush()
+    assert on_disk(path) == newest
+
+
+def test_corrupt_log_is_recreated(tmp_path):
+    path = tmp_path / 'telemetry.bin'
+    path.write_bytes(b'TLM0' + bytes(100)) # Cabeçalho de outra versão
+    telemetry = Telemetry(str(path))
+    assert telemetry.read_all() == []
+    telemetry.record(launch('notes'))
+    assert [r.name for r in telemetry.read_all()] == ['notes']
+
+
+def test_summary(tmp_path):
+    telemetry = Telemetry(str(tmp_path / 'telemetry.bin'))
+    telemetry.record(launch('calc', 300, heap_peak=2000))
+    telemetry.record(launch('calc', 0, load_ms=500, heap_peak=1000))
+    telemetry.record(launch('notes', 80))
+    assert telemetry.summary() == {'calc': (500, 2000, 2), 'notes': (80, 1000, 1)}
+
+
+def test_largest_free_block_is_bounded():
+    assert PROBE_LIMIT - PROBE_STEP <= largest_free_block() <= PROBE_LIMIT
+    assert largest_free_block(4096) <= 4096
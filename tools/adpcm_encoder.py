@@ -0,0 +1,179 @@
+# adpcm_encoder.py - Execute este script no seu PC
+#
+# Converte arquivos WAV (PCM 8/16 bits, mono ou estéreo, qualquer taxa) para
+# IMA-ADPCM mono 22050 Hz, o formato tocado por SoundManager.play_wav() via
+# lib/adpcm.py. O arquivo final tem ~1/4 do tamanho do PCM de 16 bits.
+#
+# Uso:
+#   python tools/adpcm_encoder.py som.wav [saida.wav]
+#   python tools/adpcm_encoder.py pasta_com_wavs/     (gera *.adpcm.wav)
+#   python tools/adpcm_encoder.py --check som.adpcm.wav
+import os
+import sys
+import struct
+import wave
+from array import array
+
+# Reutiliza as tabelas e o decodificador do dispositivo (fallback em Python)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lib.adpcm import (STEP_TABLE, decode_nibble, decode_block, samples_per_block,
+                       WAVE_FORMAT_IMA_ADPCM, BLOCK_HEADER_SIZE)
+from lib.mixer import read_wav_header, SAMPLE_RATE
+
+BLOCK_ALIGN = 256 # 505 amostras por bloco
+
+
+def read_pcm(wav_path):
+    """Lê um WAV PCM e retorna amostras int16 mono a SAMPLE_RATE."""
+    with wave.open(wav_path, 'rb') as w:
+        channels, width, rate = w.getnchannels(), w.getsampwidth(), w.getframerate()
+        frames = w.readframes(w.getnframes())
+
+    if width == 2:
+        samples = array('h', frames)
+        if sys.byteorder == 'big':
+            samples.byteswap()
+    elif width == 1:
+        samples = array('h', ((b - 128) << 8 for b in frames))
+    else:
+        raise ValueError(f"{width * 8} bits por amostra não suportado")
+
+    if channels > 1:
+        samples = array('h', (sum(samples[i:i + channels]) // channels
+                              for i in range(0, len(samples), channels)))
+
+    if rate != SAMPLE_RATE:
+        # Reamostragem linear: suficiente para efeitos e voz
+        count = len(samples) * SAMPLE_RATE // rate
+        resampled = array('h', bytes(2 * count))
+        last = len(samples) - 1
+        for i in range(count):
+            pos = i * rate / SAMPLE_RATE
+            j = int(pos)
+            frac = pos - j
+            a = samples[j]
+            b = samples[min(j + 1, last)]
+            resampled[i] = int(a + (b - a) * frac)
+        samples = resampled
+    return samples
+
+
+def encode_block(samples, index):
+    """Codifica até samples_per_block amostras. Retorna (bytes do bloco, índice final)."""
+    predictor = samples[0]
+    block = bytearray(struct.pack('<hBB', predictor, index, 0))
+    codes = []
+    for sample in samples[1:]:
+        step = STEP_TABLE[index]
+        diff = sample - predictor
+        code = 0
+        if diff < 0:
+            code = 8
+            diff = -diff
+        if diff >= step:
+            code |= 4
+            diff -= step
+        step >>= 1
+        if diff >= step:
+            code |= 2
+            diff -= step
+        step >>= 1
+        if diff >= step:
+            code |= 1
+        # Atualiza o preditor exatamente como o decodificador fará
+        predictor, index = decode_nibble(code, predictor, index)
+        codes.append(code)
+    if len(codes) % 2:
+        codes.append(0)
+    for i in range(0, len(codes), 2):
+        block.append(codes[i] | (codes[i + 1] << 4))
+    return bytes(block), index
+
+
+def encode(samples, block_align=BLOCK_ALIGN):
+    """Codifica amostras int16 em blocos IMA-ADPCM. Retorna os bytes dos dados."""
+    per_block = samples_per_block(block_align)
+    data = bytearray()
+    index = 0
+    for start in range(0, len(samples), per_block):
+        block, index = encode_block(samples[start:start + per_block], index)
+        data += block
+    return bytes(data)
+
+
+def write_adpcm_wav(path, data, sample_count, block_align=BLOCK_ALIGN):
+    per_block = samples_per_block(block_align)
+    avg_bytes = SAMPLE_RATE * block_align // per_block
+    fmt = struct.pack('<HHIIHHHH', WAVE_FORMAT_IMA_ADPCM, 1, SAMPLE_RATE, avg_bytes,
+                      block_align, 4, 2, per_block)
+    fact = struct.pack('<I', sample_count)
+    pad = b'\x00' if len(data) & 1 else b''
+    body = (b'WAVE' + b'fmt ' + struct.pack('<I', len(fmt)) + fmt +
+            b'fact' + struct.pack('<I', len(fact)) + fact +
+            b'data' + struct.pack('<I', len(data)) + data + pad)
+    with open(path, 'wb') as f:
+        f.write(b'RIFF' + struct.pack('<I', len(body)) + body)
+
+
+def decode_file(path):
+    """Decodifica um WAV IMA-ADPCM com o mesmo código do dispositivo."""
+    with open(path, 'rb') as f:
+        audio_format, _, _, _, block_align, _, size = read_wav_header(f)
+        if audio_format != WAVE_FORMAT_IMA_ADPCM:
+            raise ValueError("Arquivo não é IMA-ADPCM")
+        out = array('h')
+        pcm = array('h', bytes(2 * samples_per_block(block_align)))
+        while size > 0:
+            block = f.read(min(block_align, size))
+            if len(block) < BLOCK_HEADER_SIZE:
+                break
+            size -= len(block)
+            n = decode_block(block, len(block), pcm)
+            out.extend(pcm[:n])
+    return out
+
+
+def convert(wav_path, out_path):
+    try:
+        samples = read_pcm(wav_path)
+        if not samples:
+            raise ValueError("arquivo sem amostras")
+        data = encode(samples)
+        write_adpcm_wav(out_path, data, len(samples))
+        print(f"  -> {os.path.basename(out_path)}: {len(samples) * 2} -> {len(data)} bytes")
+    except Exception as e:
+        print(f"  -> Falha ao converter {os.path.basename(wav_path)}: {e}")
+
+
+def check(wav_path, adpcm_path):
+    """Compara o PCM original com o decodificado (erro médio absoluto)."""
+    original = read_pcm(wav_path)
+    decoded = decode_file(adpcm_path)
+    n = min(len(original), len(decoded))
+    error = sum(abs(original[i] - decoded[i]) for i in range(n)) / max(n, 1)
+    print(f"{os.path.basename(adpcm_path)}: {n} amostras, erro médio {error:.1f}")
+
+
+# --- Main ---
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args:
+        print("Uso: python tools/adpcm_encoder.py entrada.wav [saida.wav] | pasta/ | --check arquivo.adpcm.wav")
+        sys.exit(1)
+
+    if args[0] == '--check' and len(args) >= 2:
+        for path in args[1:]:
+            print(f"{path}: {len(decode_file(path))} amostras decodificadas")
+    elif os.path.isdir(args[0]):
+        print(f"Iniciando conversão para IMA-ADPCM em: {args[0]}")
+        for filename in sorted(os.listdir(args[0])):
+            if filename.endswith('.wav') and not filename.endswith('.adpcm.wav'):
+                wav_path = os.path.join(args[0], filename)
+                out_path = wav_path[:-4] + '.adpcm.wav'
+                print(f"Convertendo '{filename}'...")
+                convert(wav_path, out_path)
+        print("Conversão concluída.")
+    else:
+        out_path = args[1] if len(args) > 1 else args[0][:-4] + '.adpcm.wav'
+        convert(args[0], out_path)
+        check(args[0], out_path)
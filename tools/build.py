@@ -0,0 +1,307 @@
+# build.py - Execute este script no seu PC
+#
+# Prepara tudo o que vai para o T-Deck em build/stage/, com o mesmo layout do
+# dispositivo: compila lib/, romfonts/ e os apps com o mpy-cross, converte os
+# PNG de icons/ (e dos apps) para .p4 e os WAV dos apps para IMA-ADPCM.
+#
+# As conversões rodam em paralelo (um processo por núcleo) e cada saída fica
+# em cache pelo hash do conteúdo das entradas: um build sem mudanças só
+# calcula hashes e termina em bem menos de um segundo.
+#
+# Uso:
+#   python tools/build.py            (build incremental)
+#   python tools/build.py --clean    (apaga o cache e o stage antes)
+#   python tools/device_sync.py --stage   (envia o stage para o dispositivo)
+import os
+import sys
+import json
+import time
+import shutil
+import struct
+import hashlib
+import subprocess
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
+
+PROJECT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_PATH)
+
+BUILD_DIR = os.path.join(PROJECT_PATH, 'build')
+STAGE_DIR = os.path.join(BUILD_DIR, 'stage')
+CACHE_DIR = os.path.join(BUILD_DIR, 'cache')
+STAGE_STATE_FILE = os.path.join(BUILD_DIR, 'stage.json')
+BUILD_VERSION = 1 # Incremente ao mudar algum conversor, para invalidar o cache
+
+MPY_CROSS = 'mpy-cross'
+MPY_CROSS_ARGS = ('-march=xtensawin',) # ESP32-S3: necessário para código viper/native
+
+# O firmware executa estes pelo nome, então vão como fonte
+ROOT_FILES = ('boot.py', 'main.py')
+COMPILED_DIRS = ('lib', 'romfonts')
+ICONS_DIR = 'icons'
+UPDATE_STAGE_DIR = 'update_stage'
+
+# Cache de bytecode dos apps (ver lib/app_runner.py)
+APP_SOURCE_FILE = '__init__.py'
+BYTECODE_FILE = '__app__.mpy'
+BYTECODE_KEY_FILE = '__app__.key'
+
+# Gerados no PC por outras ferramentas: nunca são entrada do build
+SKIP_DIRS = ('__pycache__',)
+SKIP_FILES = ('.manifest', BYTECODE_FILE, BYTECODE_KEY_FILE)
+
+# PNG de icons/ -> destino dentro de update_stage/
+ICON_TARGETS = {
+    '__icon__calc.png': 'calculator/__icon__.p4',
+    '__icon__notepad.png': 'notepad/__icon__.p4',
+    '__icon__sketch.png': 'sketch/__icon__.p4',
+    '__icon__souhd.png': 'sound/__icon__.p4',
+    '__icon__weather.png': 'weather/__icon__.p4',
+    '__icon__wifi.png': 'wifi_status/__icon__.p4',
+}
+ICON_PREFIX_TARGETS = {
+    'lv_img_weather_': 'weather/climate/',
+}
+
+WAVE_FORMAT_PCM = 1
+
+
+# --- Conversores (rodam nos processos do pool) ---
+
+def _compile_mpy(sources, out_path):
+    subprocess.run([MPY_CROSS, *MPY_CROSS_ARGS, '-o', out_path, sources[0]],
+                   check=True, capture_output=True, text=True)
+
+
+def _copy(sources, out_path):
+    shutil.copyfile(sources[0], out_path)
+
+
+def _bytecode_key(sources, out_path):
+    # "<tamanho> <sha256> <mtime>": o mtime vai como 0 e o dispositivo o
+    # preenche na primeira validação (ver upload.py)
+    with open(sources[0], 'rb') as f:
+        data = f.read()
+    with open(out_path, 'w') as f:
+        f.write(f"{len(data)} {hashlib.sha256(data).hexdigest()} 0")
+
+
+def _convert_p4(sources, out_path):
+    from tools.converter_para_p4 import convert_to_p4
+    convert_to_p4(sources[0], out_path)
+
+
+def _convert_adpcm(sources, out_path):
+    from tools.adpcm_encoder import read_pcm, encode, write_adpcm_wav
+    if _wav_format(sources[0]) != WAVE_FORMAT_PCM:
+        # Já está em ADPCM (ou em formato que o encoder não lê): vai como está
+        shutil.copyfile(sources[0], out_path)
+        return
+    samples = read_pcm(sources[0])
+    if not samples:
+        raise ValueError("arquivo sem amostras")
+    write_adpcm_wav(out_path, encode(samples), len(samples))
+
+
+CONVERTERS = {
+    'mpy': _compile_mpy,
+    'copy': _copy,
+    'appkey': _bytecode_key,
+    'p4': _convert_p4,
+    'adpcm': _convert_adpcm,
+}
+
+
+def _wav_format(path):
+    """Formato do chunk 'fmt ' de um WAV, ou None."""
+    with open(path, 'rb') as f:
+        if f.read(12)[8:12] != b'WAVE':
+            return None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                return None
+            chunk_id, size = struct.unpack('<4sI', header)
+            if chunk_id == b'fmt ':
+                return struct.unpack('<H', f.read(2))[0]
+            f.seek(size + (size & 1), 1)
+
+
+def run_job(kind, sources, object_path):
+    """Executa um conversor gravando no cache. Retorna None ou a mensagem de erro."""
+    tmp_path = object_path + '.tmp'
+    try:
+        CONVERTERS[kind](sources, tmp_path)
+        os.replace(tmp_path, object_path)
+        return None
+    except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        detail = getattr(e, 'stderr', None) or e
+        return f"{kind}: {os.path.relpath(sources[0], PROJECT_PATH)}: {detail}"
+
+
+# --- Descoberta ---
+
+def _tool_ids():
+    """Identifica as ferramentas disponíveis; a versão entra na chave do cache."""
+    tools = {'copy': 'copy', 'appkey': 'appkey'}
+    try:
+        result = subprocess.run([MPY_CROSS, '--version'], capture_output=True, text=True, check=True)
+        tools['mpy'] = result.stdout.strip() + ' ' + ' '.join(MPY_CROSS_ARGS)
+    except (FileNotFoundError, subprocess.CalledProcessError):
+        print("Aviso: mpy-cross não encontrado; lib/ vai como fonte e os apps sem bytecode.")
+    if importlib.util.find_spec('PIL') is not None and importlib.util.find_spec('numpy') is not None:
+        tools['p4'] = 'p4 numpy'
+    else:
+        print("Aviso: Pillow/NumPy não instalados; os ícones .p4 já existentes serão usados.")
+    tools['adpcm'] = 'adpcm'
+    return tools
+
+
+def _walk_files(directory):
+    for root, dirs, names in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+        for name in sorted(names):
+            if name not in SKIP_FILES:
+                yield os.path.join(root, name)
+
+
+def discover_jobs(tools):
+    """Retorna {saída relativa ao stage: (conversor, [entradas])}."""
+    jobs = {}
+
+    for name in ROOT_FILES:
+        path = os.path.join(PROJECT_PATH, name)
+        if os.path.isfile(path):
+            jobs[name] = ('copy', [path])
+
+    for directory in COMPILED_DIRS:
+        local_dir = os.path.join(PROJECT_PATH, directory)
+        if not os.path.isdir(local_dir):
+            continue
+        for name in sorted(os.listdir(local_dir)):
+            path = os.path.join(local_dir, name)
+            if not name.endswith('.py') or not os.path.isfile(path):
+                continue
+            if 'mpy' in tools:
+                jobs[f"{directory}/{name[:-3]}.mpy"] = ('mpy', [path])
+            else:
+                jobs[f"{directory}/{name}"] = ('copy', [path])
+
+    stage_src = os.path.join(PROJECT_PATH, UPDATE_STAGE_DIR)
+    if os.path.isdir(stage_src):
+        for path in _walk_files(stage_src):
+            rel = os.path.relpath(path, PROJECT_PATH).replace(os.sep, '/')
+            name = os.path.basename(path)
+            if name.endswith('.png') and 'p4' in tools:
+                jobs[rel[:-4] + '.p4'] = ('p4', [path])
+            elif name.endswith('.wav'):
+                jobs[rel] = ('adpcm', [path])
+            else:
+                jobs[rel] = ('copy', [path])
+            # O fonte do app continua indo: é a referência do cache no SD
+            if name == APP_SOURCE_FILE and os.path.dirname(os.path.dirname(path)) == stage_src and 'mpy' in tools:
+                app_rel = os.path.dirname(rel)
+                jobs[f"{app_rel}/{BYTECODE_FILE}"] = ('mpy', [path])
+                jobs[f"{app_rel}/{BYTECODE_KEY_FILE}"] = ('appkey', [path])
+
+    # Os PNG de icons/ substituem os .p4 versionados nos apps
+    icons_dir = os.path.join(PROJECT_PATH, ICONS_DIR)
+    if 'p4' in tools and os.path.isdir(icons_dir):
+        for name in sorted(os.listdir(icons_dir)):
+            target = ICON_TARGETS.get(name)
+            for prefix, target_dir in ICON_PREFIX_TARGETS.items():
+                if name.startswith(prefix):
+                    target = target_dir + name[:-4] + '.p4'
+            if target is not None and name.endswith('.png'):
+                jobs[f"{UPDATE_STAGE_DIR}/{target}"] = ('p4', [os.path.join(icons_dir, name)])
+    return jobs
+
+
+def job_key(kind, sources, tools):
+    h = hashlib.sha256(f"{BUILD_VERSION} {kind} {tools[kind]}".encode())
+    for path in sources:
+        with open(path, 'rb') as f:
+            h.update(hashlib.sha256(f.read()).digest())
+    return h.hexdigest()
+
+
+# --- Build ---
+
+def _load_state():
+    try:
+        with open(STAGE_STATE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(state):
+    tmp_path = STAGE_STATE_FILE + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, STAGE_STATE_FILE)
+
+
+def build(workers=None):
+    """Executa o build incremental. Retorna True se não houve erros."""
+    started = time.monotonic()
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    os.makedirs(STAGE_DIR, exist_ok=True)
+
+    tools = _tool_ids()
+    jobs = discover_jobs(tools)
+    keys = {out: job_key(kind, sources, tools) for out, (kind, sources) in jobs.items()}
+
+    pending = {}
+    for out, (kind, sources) in jobs.items():
+        object_path = os.path.join(CACHE_DIR, keys[out])
+        if not os.path.exists(object_path) and keys[out] not in pending:
+            pending[keys[out]] = (kind, sources, object_path)
+
+    errors = []
+    if pending:
+        print(f"Convertendo {len(pending)} arquivo(s) em {workers or os.cpu_count()} processo(s)...")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(run_job, *job) for job in pending.values()]
+            errors = [e for e in (f.result() for f in futures) if e]
+
+    # Atualiza o stage só onde a chave mudou
+    state = _load_state()
+    new_state = {}
+    updated = 0
+    for out in sorted(jobs):
+        object_path = os.path.join(CACHE_DIR, keys[out])
+        stage_path = os.path.join(STAGE_DIR, out)
+        if not os.path.exists(object_path):
+            continue
+        if state.get(out) != keys[out] or not os.path.exists(stage_path):
+            os.makedirs(os.path.dirname(stage_path), exist_ok=True)
+            shutil.copyfile(object_path, stage_path)
+            updated += 1
+        new_state[out] = keys[out]
+
+    # Remove do stage o que não é mais produzido
+    removed = 0
+    for root, _, names in os.walk(STAGE_DIR):
+        for name in names:
+            path = os.path.join(root, name)
+            if os.path.relpath(path, STAGE_DIR).replace(os.sep, '/') not in new_state:
+                os.remove(path)
+                removed += 1
+    _save_state(new_state)
+
+    for error in errors:
+        print(f"ERRO: {error}")
+    print(f"Build: {len(jobs)} saída(s), {len(pending)} convertida(s), {updated} atualizada(s), "
+          f"{removed} removida(s) em {time.monotonic() - started:.2f}s -> {STAGE_DIR}")
+    return not errors
+
+
+# --- Main ---
+if __name__ == "__main__":
+    if '--clean' in sys.argv[1:]:
+        shutil.rmtree(BUILD_DIR, ignore_errors=True)
+    if not build():
+        sys.exit(1)
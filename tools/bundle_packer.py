@@ -0,0 +1,126 @@
+# bundle_packer.py - Execute este script no seu PC
+#
+# Empacota apps de update_stage/ em um único arquivo comprimido
+# ('update.bundle') que o updater do dispositivo (lib/updater.py) descomprime
+# em streaming direto para /sd/app, sem ocupar a flash com os arquivos
+# descomprimidos.
+#
+# Uso:
+#   python tools/bundle_packer.py                     (todos os apps)
+#   python tools/bundle_packer.py sketch notepad -o update.bundle
+import os
+import sys
+import zlib
+import struct
+import hashlib
+
+PROJECT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UPDATE_STAGE_PATH = os.path.join(PROJECT_PATH, 'update_stage')
+
+# Deve bater com lib/updater.py
+BUNDLE_MAGIC = b'TDB1'
+BUNDLE_WBITS = 12 # Janela de 4 KB: limita a memória do descompressor no ESP32
+METHOD_STORED = 0
+METHOD_DEFLATE = 1
+METHOD_KEEP = 2 # Arquivo já instalado: só tamanho e hash, sem dados
+
+# Arquivos que não vão para o dispositivo
+SKIP_DIRS = ('__pycache__',)
+SKIP_FILES = ('.manifest',)
+
+
+def app_files(app_dir):
+    """Lista (caminho relativo, caminho local) dos arquivos de um app."""
+    files = []
+    for root, dirs, names in os.walk(app_dir):
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+        for name in sorted(names):
+            if name in SKIP_FILES:
+                continue
+            path = os.path.join(root, name)
+            files.append((os.path.relpath(path, app_dir).replace(os.sep, '/'), path))
+    return files
+
+
+def compress(data):
+    c = zlib.compressobj(9, zlib.DEFLATED, BUNDLE_WBITS)
+    return c.compress(data) + c.flush()
+
+
+def pack_bundle(app_dirs, out_path, keep=None):
+    """
+    Grava o bundle com os apps informados. Cada arquivo é comprimido à parte
+    (ou guardado, se não encolher). 'keep' ({app: caminhos}) lista arquivos
+    que o dispositivo já tem iguais: eles entram só no manifesto do app, sem
+    dados. Retorna (bytes originais enviados, bytes do bundle).
+    """
+    entries = []
+    raw_total = 0
+    for app_dir in app_dirs:
+        app_name = os.path.basename(os.path.normpath(app_dir))
+        kept = (keep or {}).get(app_name, ())
+        for rel, path in app_files(app_dir):
+            with open(path, 'rb') as f:
+                data = f.read()
+            if rel in kept:
+                entries.append((f"{app_name}/{rel}", METHOD_KEEP, data, b''))
+                continue
+            raw_total += len(data)
+            packed = compress(data)
+            method = METHOD_DEFLATE
+            if len(packed) >= len(data):
+                packed, method = data, METHOD_STORED
+            entries.append((f"{app_name}/{rel}", method, data, packed))
+
+    if len(entries) > 0xFFFF:
+        raise ValueError("Arquivos demais para um bundle")
+
+    with open(out_path, 'wb') as f:
+        f.write(struct.pack('<4sH', BUNDLE_MAGIC, len(entries)))
+        for path, method, data, packed in entries:
+            name = path.encode()
+            f.write(struct.pack('<H', len(name)) + name)
+            f.write(struct.pack('<BII32s', method, len(data), len(packed), hashlib.sha256(data).digest()))
+            f.write(packed)
+    return raw_total, os.path.getsize(out_path)
+
+
+def verify_bundle(path):
+    """Descomprime o bundle no PC e confere os hashes, como o dispositivo fará."""
+    with open(path, 'rb') as f:
+        magic, count = struct.unpack('<4sH', f.read(6))
+        if magic != BUNDLE_MAGIC:
+            raise ValueError("Bundle inválido")
+        for _ in range(count):
+            name = f.read(struct.unpack('<H', f.read(2))[0]).decode()
+            method, size, csize, digest = struct.unpack('<BII32s', f.read(41))
+            packed = f.read(csize)
+            if method == METHOD_KEEP:
+                continue
+            data = zlib.decompress(packed, BUNDLE_WBITS) if method == METHOD_DEFLATE else packed
+            if len(data) != size or hashlib.sha256(data).digest() != digest:
+                raise ValueError(f"Entrada corrompida: {name}")
+    return count
+
+
+# --- Main ---
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    out_path = os.path.join(PROJECT_PATH, 'update.bundle')
+    if '-o' in args:
+        i = args.index('-o')
+        out_path = args[i + 1]
+        del args[i:i + 2]
+
+    names = args or sorted(d for d in os.listdir(UPDATE_STAGE_PATH)
+                           if os.path.isdir(os.path.join(UPDATE_STAGE_PATH, d)))
+    app_dirs = [os.path.join(UPDATE_STAGE_PATH, name) for name in names]
+    missing = [d for d in app_dirs if not os.path.isdir(d)]
+    if missing:
+        print(f"ERRO: App(s) não encontrado(s): {', '.join(missing)}")
+        sys.exit(1)
+
+    raw, packed = pack_bundle(app_dirs, out_path)
+    count = verify_bundle(out_path)
+    print(f"Bundle gerado: {out_path} ({count} arquivo(s), {raw} -> {packed} bytes, "
+          f"{packed * 100 // max(raw, 1)}%)")
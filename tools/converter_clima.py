@@ -1,21 +1,35 @@
-# /home/gabriel/Documents/tdeck/teste base/tools/converter_clima.py
-
+# converter_clima.py - Execute este script no seu PC
+#
+# Converte as imagens de clima (icons/lv_img_weather_*.png) para .p4 na pasta
+# do app weather.
+#
+# Uso:
+#   python tools/converter_clima.py [pasta_dos_png] [pasta_de_saida]
 import os
-from converter_para_p4 import convert_to_p4 # Reutiliza a função que já temos!
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.converter_para_p4 import convert_job # Reutiliza a função que já temos!
 
-# Caminho para a pasta de imagens de clima no seu PC
-CLIMATE_IMG_PATH = '/home/gabriel/Documents/tdeck/teste base/update_stage/weather/climate'
+PROJECT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLIMATE_PNG_PATH = os.path.join(PROJECT_PATH, 'icons')
+CLIMATE_IMG_PATH = os.path.join(PROJECT_PATH, 'update_stage', 'weather', 'climate')
+CLIMATE_PREFIX = 'lv_img_weather_'
 
 if __name__ == "__main__":
-    print(f"Iniciando conversão de imagens de clima em: {CLIMATE_IMG_PATH}")
-    if not os.path.exists(CLIMATE_IMG_PATH):
-        print(f"ERRO: Diretório não encontrado: {CLIMATE_IMG_PATH}")
-    else:
-        for filename in os.listdir(CLIMATE_IMG_PATH):
-            if filename.endswith('.png'):
-                png_path = os.path.join(CLIMATE_IMG_PATH, filename)
-                # O nome do arquivo .p4 será o mesmo, mas com a extensão trocada
-                p4_path = os.path.join(CLIMATE_IMG_PATH, filename.replace('.png', '.p4'))
-                print(f"Convertendo '{filename}'...")
-                convert_to_p4(png_path, p4_path)
-        print("Conversão de imagens de clima concluída.")
+    src = sys.argv[1] if len(sys.argv) > 1 else CLIMATE_PNG_PATH
+    dst = sys.argv[2] if len(sys.argv) > 2 else CLIMATE_IMG_PATH
+    print(f"Iniciando conversão de imagens de clima: {src} -> {dst}")
+    if not os.path.isdir(src):
+        print(f"ERRO: Diretório não encontrado: {src}")
+        sys.exit(1)
+
+    os.makedirs(dst, exist_ok=True)
+    jobs = [(os.path.join(src, name), os.path.join(dst, name[:-4] + '.p4'))
+            for name in sorted(os.listdir(src))
+            if name.startswith(CLIMATE_PREFIX) and name.endswith('.png')]
+    with ProcessPoolExecutor() as pool:
+        for line in pool.map(convert_job, jobs):
+            print(line)
+    print("Conversão de imagens de clima concluída.")
@@ -1,98 +1,109 @@
 # converter_para_p4.py - Execute este script no seu PC
+#
+# Converte imagens (PNG, BMP...) para o formato P4 usado pelo display:
+# largura e altura (1 byte cada), paleta de 16 cores RGB565 big endian (a cor
+# 0 é a transparência) e os índices de 4 bits, dois pixels por byte.
+#
+# A conversão é vetorizada com NumPy: a quantização já devolve os índices da
+# paleta, então não há busca de cor por pixel. Larguras ímpares são
+# completadas com uma coluna transparente (o display lê largura // 2 bytes
+# por linha).
+#
+# Uso:
+#   python tools/converter_para_p4.py imagem.png [saida.p4]
+#   python tools/converter_para_p4.py pasta/          (converte todos os PNG, em paralelo)
 import os
-import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 from PIL import Image
 
-# Coloque o caminho para a pasta de aplicativos do seu T-Deck
-APP_BASE_PATH = '/home/gabriel/Documents/tdeck/teste base/update_stage' # Caminho no seu PC
+PALETTE_COLORS = 15 # + a cor 0, reservada para a transparência
+ALPHA_THRESHOLD = 128
+MAX_DIMENSION = 255 # Largura e altura são gravadas em um byte
+IMAGE_SUFFIXES = ('.png', '.bmp')
+
+
+def palette_to_rgb565(palette):
+    """Paleta RGB do Pillow -> 16 cores RGB565 big endian, com a 0 transparente."""
+    rgb = np.zeros((PALETTE_COLORS, 3), dtype=np.uint16)
+    colors = np.asarray(palette[:PALETTE_COLORS * 3], dtype=np.uint16).reshape(-1, 3)
+    rgb[:len(colors)] = colors
+    rgb565 = ((rgb[:, 0] & 0xF8) << 8) | ((rgb[:, 1] & 0xFC) << 3) | (rgb[:, 2] >> 3)
+    return np.concatenate(([0], rgb565)).astype('>u2').tobytes()
+
+
+def image_to_p4(img):
+    """Converte uma imagem do Pillow para os bytes de um arquivo .p4."""
+    img = img.convert("RGBA")
+    width, height = img.size
+    # A largura gravada é a já completada para um número par
+    if width + (width & 1) > MAX_DIMENSION or height > MAX_DIMENSION:
+        raise ValueError(f"{width}x{height} excede {MAX_DIMENSION}x{MAX_DIMENSION}, o limite do formato")
+
+    # Reduz a imagem para 15 cores; os índices saem direto da imagem quantizada
+    quantized = img.quantize(colors=PALETTE_COLORS, method=Image.FASTOCTREE)
+    palette = quantized.getpalette()
+    if palette is None:
+        raise ValueError("Não foi possível extrair a paleta da imagem quantizada.")
+
+    indices = np.asarray(quantized, dtype=np.uint8) + 1
+    alpha = np.asarray(img.getchannel('A'))
+    indices[alpha < ALPHA_THRESHOLD] = 0
+
+    # Largura ímpar: completa com uma coluna transparente
+    if width & 1:
+        indices = np.pad(indices, ((0, 0), (0, 1)))
+    packed = (indices[:, 0::2] << 4) | indices[:, 1::2]
+
+    return bytes((indices.shape[1], height)) + palette_to_rgb565(palette) + packed.tobytes()
 
-def convert_to_p4(bmp_path, p4_path):
+
+def convert_to_p4(image_path, p4_path):
     """Converte uma imagem para o formato P4 (4-bit com paleta RGB565)."""
-    try:
-        with Image.open(bmp_path) as img:
-            # Garante que a imagem está no modo RGBA para ter canal alfa
-            img = img.convert("RGBA")
-            
-            # Reduz a imagem para uma paleta de 15 cores + 1 cor para transparência
-            # O Pillow tentará encontrar as 15 cores mais representativas
-            quantized_img = img.quantize(colors=15, method=Image.FASTOCTREE)
-            
-            # Extrai a paleta ANTES de converter para RGBA
-            palette_rgba = quantized_img.getpalette()
-            if palette_rgba is None:
-                raise ValueError("Não foi possível extrair a paleta da imagem quantizada.")
-            # Garante que a paleta tenha 45 bytes (15 cores * 3), preenchendo com 0 se for menor
-            palette_rgba.extend([0] * (45 - len(palette_rgba)))
-
-            # Converte a imagem com paleta para RGBA para podermos ler as cores
-            quantized_img = quantized_img.convert("RGBA")
-            palette_rgb565 = bytearray(32) # 16 cores * 2 bytes/cor
-            
-            # A cor 0 da nossa paleta será a transparência (preto)
-            palette_rgb565[0:2] = struct.pack('>H', 0x0000)
-
-            # Preenche o resto da paleta
-            color_map = {}
-            for i in range(15):
-                r, g, b = palette_rgba[i*3], palette_rgba[i*3+1], palette_rgba[i*3+2]
-                
-                # Converte para RGB565
-                rgb565 = ((r & 0xF8) << 8) | ((g & 0xFC) << 3) | (b >> 3)
-                
-                # Armazena em Big Endian para o blit_buffer
-                struct.pack_into('>H', palette_rgb565, (i + 1) * 2, rgb565)
-                color_map[(r, g, b)] = i + 1
-
-            # Cria os dados de pixel (índices de 4 bits)
-            # Obter as dimensões da imagem
-            width, height = quantized_img.size
-            if (width * height) % 2 != 0:
-                raise ValueError(f"A imagem {os.path.basename(bmp_path)} tem um número ímpar de pixels, o que não é suportado.")
-
-            pixel_indices = bytearray(width * height // 2)
-            
-            pixels = list(quantized_img.getdata())
-            
-            for i in range(0, len(pixels), 2):
-                # Pixel 1
-                r1, g1, b1, a1 = pixels[i]
-                # Se a cor não for encontrada no mapa (pode acontecer por arredondamento), usa o índice 0 (transparente)
-                idx1 = 0 if a1 < 128 else color_map.get((r1, g1, b1), 0) 
-                
-                # Pixel 2
-                r2, g2, b2, a2 = pixels[i+1]
-                idx2 = 0 if a2 < 128 else color_map.get((r2, g2, b2), 0) 
-                
-                # Empacota 2 pixels de 4 bits em 1 byte
-                packed_byte = (idx1 << 4) | idx2
-                pixel_indices[i // 2] = packed_byte
-
-            # Salva o arquivo .p4 final
-            with open(p4_path, 'wb') as f_p4:
-                # Escreve a largura e a altura como os dois primeiros bytes
-                f_p4.write(bytes([width, height]))
-                
-                # Escreve a paleta e os dados dos pixels
-                f_p4.write(palette_rgb565)
-                f_p4.write(pixel_indices)
-            
-            print(f"  -> Convertido para {os.path.basename(p4_path)}")
+    with Image.open(image_path) as img:
+        data = image_to_p4(img)
+    with open(p4_path, 'wb') as f:
+        f.write(data)
+    return p4_path
 
+
+def convert_job(paths):
+    image_path, p4_path = paths
+    try:
+        convert_to_p4(image_path, p4_path)
+        return f"  -> {os.path.relpath(p4_path)}"
     except Exception as e:
-        print(f"  -> Falha ao converter {os.path.basename(bmp_path)}: {e}")
+        return f"  -> Falha ao converter {os.path.relpath(image_path)}: {e}"
+
+
+def convert_tree(directory, workers=None):
+    """Converte todas as imagens de uma pasta (recursivamente) em paralelo."""
+    jobs = []
+    for root, dirs, names in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+        for name in sorted(names):
+            if name.lower().endswith(IMAGE_SUFFIXES):
+                path = os.path.join(root, name)
+                jobs.append((path, os.path.splitext(path)[0] + '.p4'))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for line in pool.map(convert_job, jobs):
+            print(line)
+    return len(jobs)
+
 
 # --- Main ---
 if __name__ == "__main__":
-    if APP_BASE_PATH == '/caminho/para/seu/sd/app':
-        print("ERRO: Por favor, edite a variável 'APP_BASE_PATH' no script.")
+    args = sys.argv[1:]
+    if not args:
+        print("Uso: python tools/converter_para_p4.py imagem.png [saida.p4] | pasta/")
+        sys.exit(1)
+
+    if os.path.isdir(args[0]):
+        print(f"Iniciando conversão para .p4 em: {args[0]}")
+        count = convert_tree(args[0])
+        print(f"Conversão concluída ({count} imagem(ns)).")
     else:
-        print(f"Iniciando conversão para .p4 em: {APP_BASE_PATH}")
-        for dir_name in os.listdir(APP_BASE_PATH):
-            app_path = os.path.join(APP_BASE_PATH, dir_name)
-            if os.path.isdir(app_path):
-                png_icon = os.path.join(app_path, '__icon__.png') # Procura por .png
-                p4_icon = os.path.join(app_path, '__icon__.p4')
-                if os.path.exists(png_icon):
-                    print(f"Encontrado ícone em '{dir_name}':")
-                    convert_to_p4(png_icon, p4_icon) # Converte o .png
-        print("Conversão concluída.")
+        out_path = args[1] if len(args) > 1 else os.path.splitext(args[0])[0] + '.p4'
+        print(convert_job((args[0], out_path)))
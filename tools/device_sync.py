@@ -0,0 +1,331 @@
+# device_sync.py - Execute este script no seu PC
+#
+# Sincronização incremental com o T-Deck: uma única chamada ao mpremote lê os
+# hashes dos arquivos no dispositivo (flash e manifestos dos apps em /sd/app),
+# que são comparados aos hashes locais. Só o que mudou é enviado, tudo em uma
+# única sessão do mpremote (comandos encadeados com '+'), e os arquivos que
+# sumiram do projeto são apagados.
+#
+# Nos apps, o bundle leva só os arquivos alterados; os iguais entram apenas
+# no manifesto (METHOD_KEEP), e o updater apaga no boot os que saíram do app.
+# Apps instalados que não existem mais no projeto são apagados do SD.
+#
+# Uso:
+#   python tools/device_sync.py              (sincroniza)
+#   python tools/device_sync.py --dry-run    (só mostra o que seria feito)
+#   python tools/device_sync.py --stage      (envia build/stage, ver tools/build.py)
+import os
+import sys
+import json
+import hashlib
+import subprocess
+
+PROJECT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_PATH)
+
+from tools.bundle_packer import app_files, pack_bundle
+
+# Arquivos da flash gerenciados pelo sync: main.py e os módulos de lib/. O
+# stage do build também leva romfonts/ compilado.
+FLASH_FILES = ('main.py',)
+FLASH_DIRS = ('lib',)
+STAGE_FLASH_FILES = ('boot.py', 'main.py')
+STAGE_FLASH_DIRS = ('lib', 'romfonts')
+# Um .py velho ao lado do .mpy teria prioridade no import: os dois são gerenciados
+FLASH_SUFFIXES = ('.py', '.mpy')
+STAGE_PATH = os.path.join(PROJECT_PATH, 'build', 'stage')
+
+APPS_REMOTE_DIR = '/sd/app'
+MANIFEST_FILE = '.manifest' # Deve bater com lib/updater.py
+BUNDLE_REMOTE_PATH = 'update.bundle'
+
+# Marca a linha com o resultado no meio de qualquer outra saída do dispositivo
+RESULT_MARKER = 'SYNC:'
+
+# Roda no dispositivo: hash de cada arquivo gerenciado e o manifesto de cada
+# app instalado. Lê em blocos com readinto para não alocar o arquivo inteiro.
+DEVICE_SCRIPT = """
+import os, json, hashlib, binascii
+_b = bytearray(1024)
+_m = memoryview(_b)
+def _h(p):
+    d = hashlib.sha256()
+    with open(p, 'rb') as f:
+        while True:
+            n = f.readinto(_b)
+            if not n:
+                break
+            d.update(_m[:n])
+    return binascii.hexlify(d.digest()).decode()
+_r = {'files': {}, 'dirs': [], 'apps': None}
+for _p in %(files)r:
+    try:
+        _r['files'][_p] = [os.stat(_p)[6], _h(_p)]
+    except OSError:
+        pass
+for _d in %(dirs)r:
+    try:
+        _names = os.listdir(_d)
+    except OSError:
+        continue
+    _r['dirs'].append(_d)
+    for _n in _names:
+        _p = _d + '/' + _n
+        if _n[_n.rfind('.'):] in %(suffixes)r and not os.stat(_p)[0] & 0x4000:
+            _r['files'][_p] = [os.stat(_p)[6], _h(_p)]
+try:
+    _apps = os.listdir(%(apps)r)
+    _r['apps'] = {}
+    for _a in _apps:
+        try:
+            with open(%(apps)r + '/' + _a + '/' + %(manifest)r) as f:
+                _r['apps'][_a] = f.read()
+        except OSError:
+            pass
+except OSError:
+    pass
+print(%(marker)r + json.dumps(_r))
+"""
+
+
+def file_digest(path):
+    """(tamanho, sha256 em hex) de um arquivo local."""
+    h = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(65536)
+            if not chunk:
+                break
+            size += len(chunk)
+            h.update(chunk)
+    return size, h.hexdigest()
+
+
+def parse_manifest(text):
+    """Lê um manifesto "<tamanho> <sha256> <caminho>" em {caminho: (tamanho, sha256)}."""
+    entries = {}
+    for line in text.splitlines():
+        parts = line.strip().split(' ', 2)
+        if len(parts) == 3:
+            entries[parts[2]] = (int(parts[0]), parts[1])
+    return entries
+
+
+def local_flash_files(project_path=PROJECT_PATH, names=FLASH_FILES, dirs=FLASH_DIRS):
+    """{caminho remoto: caminho local} dos arquivos da flash gerenciados."""
+    files = {}
+    for name in names:
+        path = os.path.join(project_path, name)
+        if os.path.isfile(path):
+            files[name] = path
+    for directory in dirs:
+        local_dir = os.path.join(project_path, directory)
+        if not os.path.isdir(local_dir):
+            continue
+        for name in sorted(os.listdir(local_dir)):
+            path = os.path.join(local_dir, name)
+            if os.path.splitext(name)[1] in FLASH_SUFFIXES and os.path.isfile(path):
+                files[f"{directory}/{name}"] = path
+    return files
+
+
+def local_app_manifest(app_dir):
+    """{caminho relativo: (tamanho, sha256)} de um app, como o bundle o instalaria."""
+    return {rel: file_digest(path) for rel, path in app_files(app_dir)}
+
+
+def fetch_device_state(names=FLASH_FILES, dirs=FLASH_DIRS):
+    """Lê os hashes do dispositivo em uma única chamada ao mpremote."""
+    script = DEVICE_SCRIPT % {
+        'files': list(names),
+        'dirs': list(dirs),
+        'suffixes': list(FLASH_SUFFIXES),
+        'apps': APPS_REMOTE_DIR,
+        'manifest': MANIFEST_FILE,
+        'marker': RESULT_MARKER,
+    }
+    result = subprocess.run(['mpremote', 'exec', script], check=True, capture_output=True, text=True)
+    for line in result.stdout.splitlines():
+        if line.startswith(RESULT_MARKER):
+            state = json.loads(line[len(RESULT_MARKER):])
+            state['files'] = {path.lstrip('/'): (size, digest) for path, (size, digest) in state['files'].items()}
+            return state
+    raise RuntimeError(f"Resposta inesperada do dispositivo:\n{result.stdout}{result.stderr}")
+
+
+def plan_sync(device, flash_files, app_dirs, dirs=FLASH_DIRS, prune_apps=True):
+    """
+    Compara o estado do dispositivo com o local.
+
+    Retorna um dicionário com 'upload' [(remoto, local, tamanho)], 'delete'
+    [remoto], 'mkdir' [remoto], 'apps' [diretórios dos apps alterados],
+    'app_files' {app: [(caminho, tamanho)] a enviar}, 'keep' {app: caminhos
+    já iguais no dispositivo}, 'app_deletes' ["app/caminho" que o updater
+    apaga], 'remove_apps' [apps instalados que sumiram do projeto, só com
+    prune_apps] e 'total' (bytes de tudo que é gerenciado, para calcular a
+    economia).
+    """
+    plan = {'upload': [], 'delete': [], 'mkdir': [], 'apps': [], 'app_files': {}, 'keep': {},
+            'app_deletes': [], 'remove_apps': [], 'total': 0}
+
+    for remote, local in flash_files.items():
+        size, digest = file_digest(local)
+        plan['total'] += size
+        if device['files'].get(remote) != (size, digest):
+            plan['upload'].append((remote, local, size))
+
+    # Só apaga dentro dos diretórios gerenciados e com os sufixos gerenciados
+    for remote in sorted(device['files']):
+        if remote not in flash_files and '/' in remote:
+            plan['delete'].append(remote)
+
+    for directory in dirs:
+        if directory not in device['dirs'] and any(r.startswith(directory + '/') for r, _, _ in plan['upload']):
+            plan['mkdir'].append(directory)
+
+    # Sem o SD montado não há como comparar: todos os apps vão inteiros no bundle
+    installed = device['apps'] or {}
+    local_names = set()
+    for app_dir in app_dirs:
+        manifest = local_app_manifest(app_dir)
+        plan['total'] += sum(size for size, _ in manifest.values())
+        app_name = os.path.basename(os.path.normpath(app_dir))
+        local_names.add(app_name)
+        current = parse_manifest(installed[app_name]) if app_name in installed else {}
+        changed = [rel for rel in sorted(manifest) if current.get(rel) != manifest[rel]]
+        removed = [rel for rel in sorted(current) if rel not in manifest]
+        if changed or removed:
+            plan['apps'].append(app_dir)
+            plan['app_files'][app_name] = [(rel, manifest[rel][0]) for rel in changed]
+            plan['keep'][app_name] = [rel for rel in sorted(manifest) if rel not in changed]
+            plan['app_deletes'].extend(f"{app_name}/{rel}" for rel in removed)
+
+    # Só apps com manifesto, ou seja, instalados pelo updater
+    if prune_apps:
+        plan['remove_apps'] = sorted(name for name in installed if name not in local_names)
+    return plan
+
+
+def build_batch(plan, bundle_path=None):
+    """Monta um único comando mpremote com todas as operações encadeadas."""
+    commands = []
+    for directory in plan['mkdir']:
+        commands.append(['fs', 'mkdir', f":{directory}"])
+    for remote, local, _ in plan['upload']:
+        commands.append(['fs', 'cp', local, f":{remote}"])
+    for remote in plan['delete']:
+        commands.append(['fs', 'rm', f":{remote}"])
+    for app_name in plan['remove_apps']:
+        commands.append(['fs', 'rm', '-r', f":{APPS_REMOTE_DIR}/{app_name}"])
+    if bundle_path:
+        commands.append(['fs', 'cp', bundle_path, f":{BUNDLE_REMOTE_PATH}"])
+
+    if not commands:
+        return None
+    batch = ['mpremote']
+    for i, command in enumerate(commands):
+        if i:
+            batch.append('+')
+        batch.extend(command)
+    return batch
+
+
+def print_plan(plan):
+    for directory in plan['mkdir']:
+        print(f"  mkdir  {directory}")
+    for remote, _, size in plan['upload']:
+        print(f"  enviar {remote} ({size} bytes)")
+    for remote in plan['delete']:
+        print(f"  apagar {remote}")
+    for app_name, files in plan['app_files'].items():
+        for rel, size in files:
+            print(f"  app    {app_name}/{rel} ({size} bytes, bundle)")
+    for path in plan['app_deletes']:
+        print(f"  apagar {APPS_REMOTE_DIR}/{path} (pelo updater, no boot)")
+    for app_name in plan['remove_apps']:
+        print(f"  apagar {APPS_REMOTE_DIR}/{app_name} (app removido do projeto)")
+
+
+def sync(app_dirs, project_path=PROJECT_PATH, names=FLASH_FILES, dirs=FLASH_DIRS,
+         dry_run=False, bundle_path='update.bundle', prepare_app=None, prune_apps=True):
+    """
+    Sincroniza o dispositivo a partir de 'project_path' (o projeto ou o stage
+    do build). 'prepare_app' é chamado em cada app antes do hash (o upload.py
+    usa para gerar o bytecode). Com prune_apps, apps instalados que não estão
+    em 'app_dirs' são apagados. Retorna True se deu certo.
+    """
+    flash_files = local_flash_files(project_path, names, dirs)
+    if prepare_app is not None:
+        for app_dir in app_dirs:
+            prepare_app(app_dir)
+
+    print("Lendo os hashes do dispositivo...")
+    try:
+        device = fetch_device_state(names, dirs)
+    except FileNotFoundError:
+        print("Erro: 'mpremote' não encontrado. Certifique-se de que ele está instalado e no seu PATH.")
+        return False
+    except (subprocess.CalledProcessError, RuntimeError, ValueError) as e:
+        print(f"Falha ao ler o estado do dispositivo: {e}")
+        return False
+    if device['apps'] is None and app_dirs:
+        print(f"Aviso: {APPS_REMOTE_DIR} indisponível; todos os apps serão reenviados.")
+
+    plan = plan_sync(device, flash_files, app_dirs, dirs, prune_apps)
+    sent = sum(size for _, _, size in plan['upload'])
+    packed = None
+    if plan['apps'] and not dry_run:
+        raw, packed = pack_bundle(plan['apps'], bundle_path, plan['keep'])
+        print(f"Bundle gerado: {raw} -> {packed} bytes ({packed * 100 // max(raw, 1)}%)")
+        sent += packed
+    elif plan['apps']:
+        # Sem gerar o bundle, estima pelo tamanho descomprimido
+        sent += sum(size for files in plan['app_files'].values() for _, size in files)
+
+    batch = build_batch(plan, bundle_path if plan['apps'] else None)
+    if batch is None:
+        print("Nada mudou: o dispositivo já está sincronizado.")
+        return True
+
+    print("Alterações:")
+    print_plan(plan)
+    label = "seriam enviados" if dry_run else "enviados"
+    print(f"{sent} de {plan['total']} bytes {label} ({plan['total'] - sent} bytes economizados).")
+    if dry_run:
+        return True
+
+    print(f"Executando: {' '.join(batch)}")
+    try:
+        result = subprocess.run(batch, check=True, capture_output=True, text=True)
+        if result.stdout:
+            print(result.stdout)
+        return True
+    except subprocess.CalledProcessError as e:
+        print(f"Falha ao sincronizar: {e}")
+        print(f"Saída de erro:\n{e.stderr}")
+        return False
+    finally:
+        if packed is not None:
+            os.remove(bundle_path)
+
+
+def main():
+    args = sys.argv[1:]
+    project_path, names, dirs = PROJECT_PATH, FLASH_FILES, FLASH_DIRS
+    if '--stage' in args:
+        if not os.path.isdir(STAGE_PATH):
+            print("ERRO: build/stage não existe. Rode 'python tools/build.py' antes.")
+            sys.exit(1)
+        project_path, names, dirs = STAGE_PATH, STAGE_FLASH_FILES, STAGE_FLASH_DIRS
+
+    stage = os.path.join(project_path, 'update_stage')
+    app_dirs = [os.path.join(stage, d) for d in sorted(os.listdir(stage))
+                if os.path.isdir(os.path.join(stage, d))] if os.path.isdir(stage) else []
+    if not sync(app_dirs, project_path, names, dirs, dry_run='--dry-run' in args,
+                bundle_path=os.path.join(PROJECT_PATH, 'update.bundle')):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# fake_machine.py - Usado pelos testes no PC (tests/test_power.py)
+#
+# Versões simuladas de 'machine' e 'time' para exercitar lib/power.py sem o
+# T-Deck: o tempo só anda quando o código chama sleep_ms()/lightsleep() ou
+# quando o teste avança o relógio, então uma hora de inatividade roda em
+# milissegundos.
+
+
+class FakeTime:
+    """Relógio simulado com a API de ticks do MicroPython."""
+
+    def __init__(self):
+        self.now_ms = 0
+
+    def ticks_ms(self):
+        return self.now_ms
+
+    def ticks_diff(self, a, b):
+        return a - b
+
+    def ticks_add(self, a, b):
+        return a + b
+
+    def sleep_ms(self, ms):
+        self.now_ms += ms
+
+    def advance(self, ms):
+        self.now_ms += ms
+
+
+class FakePin:
+    OUT = 1
+    IN = 0
+
+    def __init__(self, number, mode=OUT, value=1):
+        self.number = number
+        self._value = value
+
+    def value(self, v=None):
+        if v is None:
+            return self._value
+        self._value = v
+
+
+class FakePWM:
+    def __init__(self, pin, freq=0, duty_u16=0):
+        self.pin = pin
+        self.freq = freq
+        self._duty = duty_u16
+
+    def duty_u16(self, value=None):
+        if value is None:
+            return self._duty
+        self._duty = value
+
+
+class FakeDisplay:
+    def __init__(self):
+        self.sleeping = False
+
+    def sleep_mode(self, value):
+        self.sleeping = value
+
+
+class FakeMachine:
+    """Subconjunto de 'machine' usado pelo governador, com contadores."""
+
+    Pin = FakePin
+    PWM = FakePWM
+
+    def __init__(self, clock):
+        self.clock = clock
+        self._freq = 240_000_000
+        self.lightsleep_calls = 0
+        self.wake_at = None # instante (ms) em que uma entrada acorda o lightsleep
+
+    def freq(self, hz=None):
+        if hz is None:
+            return self._freq
+        self._freq = hz
+
+    def lightsleep(self, ms):
+        self.lightsleep_calls += 1
+        if self.wake_at is not None and self.clock.now_ms < self.wake_at <= self.clock.now_ms + ms:
+            self.clock.now_ms = self.wake_at
+        else:
+            self.clock.advance(ms)
+
@@ -0,0 +1,303 @@
+# font_compiler.py - Execute este script no seu PC
+#
+# Gera fontes proporcionais para ST7789.write() (lib/st7789py.py) a partir de
+# arquivos TrueType/OpenType (em um ou mais tamanhos) ou BDF. A saída é um
+# módulo Python com MAP, WIDTHS, OFFSETS, BITMAPS, OFFSET_WIDTH, HEIGHT e
+# MAX_WIDTH, pronto para ir em romfonts/ (o tools/build.py o compila).
+#
+# Os glifos são reduzidos aos caracteres que aparecem nas strings dos apps e
+# da lib, inclusive os acentuados do português. O MAP sai ordenado pela
+# frequência de uso, então o MAP.index() do write() acha os caracteres comuns
+# primeiro, e OFFSET_WIDTH usa o menor número de bytes que cabe.
+#
+# Uso:
+#   python tools/font_compiler.py fonte.ttf -s 16 -s 24
+#   python tools/font_compiler.py fonte.bdf --ascii -o romfonts/ --name minha_fonte
+#   python tools/font_compiler.py fonte.ttf -s 20 --chars "°ªº" --sources update_stage/notepad
+import os
+import re
+import ast
+import sys
+from collections import Counter
+
+PROJECT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SOURCES = ('update_stage', 'lib', 'main.py')
+DEFAULT_OUTPUT_DIR = os.path.join(PROJECT_PATH, 'romfonts')
+PRINTABLE_ASCII = ''.join(chr(c) for c in range(0x20, 0x7F))
+THRESHOLD = 128 # Tons de cinza acima disso viram pixel aceso
+BYTES_PER_LINE = 16
+
+
+# --- Caracteres usados ---
+
+def _python_files(paths):
+    for path in paths:
+        if os.path.isfile(path) and path.endswith('.py'):
+            yield path
+        for root, dirs, names in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+            for name in sorted(names):
+                if name.endswith('.py'):
+                    yield os.path.join(root, name)
+
+
+def used_characters(paths):
+    """Conta os caracteres das strings literais (inclusive f-strings) dos fontes."""
+    counts = Counter()
+    for path in _python_files(paths):
+        with open(path, encoding='utf-8') as f:
+            try:
+                tree = ast.parse(f.read(), path)
+            except SyntaxError as e:
+                print(f"Aviso: ignorando {path}: {e}")
+                continue
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Constant) and isinstance(node.value, str):
+                counts.update(c for c in node.value if c.isprintable())
+    return counts
+
+
+def build_charset(counts, ascii_range=False, extra=''):
+    """Caracteres da fonte, do mais usado para o menos usado."""
+    counts = Counter(counts)
+    if ascii_range:
+        counts.update({c: 0 for c in PRINTABLE_ASCII if c not in counts})
+    counts.update({c: 0 for c in extra if c not in counts})
+    counts.setdefault(' ', 0)
+    return ''.join(sorted(counts, key=lambda c: (-counts[c], ord(c))))
+
+
+# --- Rasterização ---
+
+def rasterize_ttf(path, size, charset):
+    """Retorna (altura, {caractere: (largura, linhas de bits)}) de uma fonte TrueType."""
+    from PIL import Image, ImageDraw, ImageFont
+
+    font = ImageFont.truetype(path, size)
+    ascent, descent = font.getmetrics()
+    height = ascent + descent
+    glyphs = {}
+    for ch in charset:
+        width = max(1, round(font.getlength(ch)))
+        img = Image.new('L', (width, height), 0)
+        ImageDraw.Draw(img).text((0, ascent), ch, font=font, fill=255, anchor='ls')
+        pixels = img.load()
+        rows = [[pixels[x, y] >= THRESHOLD for x in range(width)] for y in range(height)]
+        glyphs[ch] = (width, rows)
+    return height, glyphs
+
+
+def parse_bdf(path):
+    """Lê um BDF em (ascent, descent, {código: (dwidth, bbx, linhas em hex)})."""
+    ascent = descent = None
+    bbox = None
+    glyphs = {}
+    with open(path, encoding='latin-1') as f:
+        lines = iter(f.read().splitlines())
+    for line in lines:
+        key, _, value = line.partition(' ')
+        if key == 'FONT_ASCENT':
+            ascent = int(value)
+        elif key == 'FONT_DESCENT':
+            descent = int(value)
+        elif key == 'FONTBOUNDINGBOX':
+            bbox = [int(v) for v in value.split()]
+        elif key == 'STARTCHAR':
+            code = dwidth = bbx = None
+            for line in lines:
+                key, _, value = line.partition(' ')
+                if key == 'ENCODING':
+                    code = int(value.split()[0])
+                elif key == 'DWIDTH':
+                    dwidth = int(value.split()[0])
+                elif key == 'BBX':
+                    bbx = [int(v) for v in value.split()]
+                elif key == 'BITMAP':
+                    rows = []
+                    for line in lines:
+                        if line.startswith('ENDCHAR'):
+                            break
+                        rows.append(line.strip())
+                    if code is not None and code >= 0 and bbx is not None:
+                        glyphs[code] = (dwidth if dwidth is not None else bbx[0], bbx, rows)
+                    break
+    if ascent is None or descent is None:
+        if bbox is None:
+            raise ValueError("BDF sem FONT_ASCENT/FONT_DESCENT nem FONTBOUNDINGBOX")
+        descent = -bbox[3]
+        ascent = bbox[1] - descent
+    return ascent, descent, glyphs
+
+
+def rasterize_bdf(path, charset):
+    ascent, descent, bdf_glyphs = parse_bdf(path)
+    height = ascent + descent
+    glyphs = {}
+    for ch in charset:
+        if ord(ch) not in bdf_glyphs:
+            continue
+        dwidth, (w, h, xoff, yoff), hex_rows = bdf_glyphs[ord(ch)]
+        width = max(1, dwidth)
+        rows = [[False] * width for _ in range(height)]
+        top = ascent - (yoff + h) # Linha do topo do BBX dentro da célula
+        for r, hex_row in enumerate(hex_rows[:h]):
+            bits = int(hex_row, 16) if hex_row else 0
+            total = len(hex_row) * 4
+            y = top + r
+            if not 0 <= y < height:
+                continue
+            for c in range(w):
+                x = xoff + c
+                if 0 <= x < width and bits >> (total - 1 - c) & 1:
+                    rows[y][x] = True
+        glyphs[ch] = (width, rows)
+    return height, glyphs
+
+
+# --- Empacotamento ---
+
+def pack_font(height, glyphs, charset):
+    """
+    Empacota os glifos no formato do write(): bits de cada glifo em sequência,
+    linha a linha, e OFFSETS com a posição (em bits) do início de cada um.
+    """
+    font_map = ''.join(ch for ch in charset if ch in glyphs)
+    widths = bytearray()
+    offsets = []
+    bits = []
+    for ch in font_map:
+        width, rows = glyphs[ch]
+        if width > 255:
+            raise ValueError(f"Glifo {ch!r} com {width} pixels de largura")
+        widths.append(width)
+        offsets.append(len(bits))
+        for row in rows:
+            bits.extend(row)
+
+    bitmaps = bytearray((len(bits) + 7) // 8)
+    for i, bit in enumerate(bits):
+        if bit:
+            bitmaps[i >> 3] |= 0x80 >> (i & 7)
+
+    # Menor número de bytes que representa o maior offset (o write() aceita até 3)
+    offset_width = 1
+    while offsets and offsets[-1] >= 1 << (8 * offset_width):
+        offset_width += 1
+    if offset_width > 3:
+        raise ValueError("Fonte grande demais: os offsets não cabem em 3 bytes")
+    packed_offsets = b''.join(o.to_bytes(offset_width, 'big') for o in offsets)
+
+    return {
+        'MAP': font_map,
+        'HEIGHT': height,
+        'MAX_WIDTH': max(widths) if widths else 0,
+        'OFFSET_WIDTH': offset_width,
+        'WIDTHS': bytes(widths),
+        'OFFSETS': packed_offsets,
+        'BITMAPS': bytes(bitmaps),
+    }
+
+
+def _bytes_literal(data):
+    lines = []
+    for i in range(0, len(data), BYTES_PER_LINE):
+        chunk = data[i:i + BYTES_PER_LINE]
+        lines.append("    b'" + ''.join(f"\\x{b:02x}" for b in chunk) + "'")
+    return '\\\n'.join(lines) if lines else "    b''"
+
+
+def write_module(font, out_path, source):
+    with open(out_path, 'w', encoding='utf-8') as f:
+        f.write("# -*- coding: utf-8 -*-\n")
+        f.write(f"# Gerado por tools/font_compiler.py a partir de {os.path.basename(source)}\n")
+        f.write(f"MAP = {font['MAP']!r}\n")
+        f.write("BPP = 1\n")
+        f.write(f"HEIGHT = {font['HEIGHT']}\n")
+        f.write(f"MAX_WIDTH = {font['MAX_WIDTH']}\n")
+        f.write(f"OFFSET_WIDTH = {font['OFFSET_WIDTH']}\n")
+        for name in ('WIDTHS', 'OFFSETS', 'BITMAPS'):
+            f.write(f"_{name} = \\\n{_bytes_literal(font[name])}\n")
+        f.write("\n")
+        # memoryview evita cópias ao fatiar os bytes no dispositivo
+        for name in ('WIDTHS', 'OFFSETS', 'BITMAPS'):
+            f.write(f"{name} = memoryview(_{name})\n")
+
+
+def module_name(font_path, size=None):
+    base = re.sub(r'\W+', '_', os.path.splitext(os.path.basename(font_path))[0]).lower().strip('_')
+    return f"{base}_{size}" if size else base
+
+
+# --- Main ---
+def main(args):
+    sizes = []
+    sources = []
+    out_dir = DEFAULT_OUTPUT_DIR
+    name = None
+    extra = ''
+    ascii_range = False
+    paths = []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in ('-s', '--size'):
+            sizes.append(int(args[i + 1]))
+            i += 1
+        elif arg == '--sources':
+            i += 1
+            while i < len(args) and not args[i].startswith('-'):
+                sources.append(args[i])
+                i += 1
+            continue
+        elif arg == '-o':
+            out_dir = args[i + 1]
+            i += 1
+        elif arg == '--name':
+            name = args[i + 1]
+            i += 1
+        elif arg == '--chars':
+            extra += args[i + 1]
+            i += 1
+        elif arg == '--ascii':
+            ascii_range = True
+        else:
+            paths.append(arg)
+        i += 1
+
+    if len(paths) != 1:
+        print("Uso: python tools/font_compiler.py fonte.ttf|fonte.bdf [-s tamanho ...] [-o pasta] "
+              "[--name nome] [--ascii] [--chars texto] [--sources caminho ...]")
+        return 1
+    font_path = paths[0]
+    sources = sources or [os.path.join(PROJECT_PATH, p) for p in DEFAULT_SOURCES]
+
+    counts = used_characters(sources)
+    charset = build_charset(counts, ascii_range, extra)
+    accented = ''.join(sorted(c for c in charset if ord(c) > 0x7E))
+    print(f"{len(charset)} caractere(s) usados{f' (não ASCII: {accented})' if accented else ''}")
+
+    if font_path.lower().endswith('.bdf'):
+        rendered = [(None, *rasterize_bdf(font_path, charset))]
+    else:
+        if not sizes:
+            print("ERRO: informe o tamanho com -s para fontes TrueType.")
+            return 1
+        rendered = [(size, *rasterize_ttf(font_path, size, charset)) for size in sizes]
+
+    os.makedirs(out_dir, exist_ok=True)
+    for size, height, glyphs in rendered:
+        missing = ''.join(c for c in charset if c not in glyphs)
+        if missing:
+            print(f"Aviso: a fonte não tem {missing!r}")
+        font = pack_font(height, glyphs, charset)
+        base = name if name and len(rendered) == 1 else module_name(name or font_path, size)
+        out_path = os.path.join(out_dir, base + '.py')
+        write_module(font, out_path, font_path)
+        data = len(font['WIDTHS']) + len(font['OFFSETS']) + len(font['BITMAPS'])
+        print(f"{out_path}: {len(font['MAP'])} glifos, altura {font['HEIGHT']}, "
+              f"OFFSET_WIDTH {font['OFFSET_WIDTH']}, {data} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -8,6 +8,7 @@ import time
 import math
 import st7789py as st7789
 from romfonts import vga1_8x8 as font
+from lib.events import get_input
 
 # --- Constantes ---
 BG_COLOR = st7789.color565(10, 15, 25)
@@ -15,13 +16,13 @@ EXPRESSION_BG_COLOR = st7789.color565(20, 30, 50)
 RESULT_BG_COLOR = st7789.color565(30, 45, 70)
 TEXT_COLOR = st7789.WHITE
 ERROR_COLOR = st7789.RED
-KBD_I2C_ADDR = 0x55
 
 class CalculatorApp:
     def __init__(self, display, touch, trackball, i2c, sound):
         self.display = display
         self.trackball = trackball
         self.i2c = i2c
+        self.input = get_input(trackball, i2c, touch) # Entrada via fila de eventos (lib/events.py)
         self.sound = sound
         
         # Mapeamento de teclas para caracteres da calculadora
@@ -42,11 +43,7 @@ class CalculatorApp:
 
     def get_key_simple(self):
         """Lê uma tecla do teclado I2C."""
-        try:
-            key = self.i2c.readfrom(KBD_I2C_ADDR, 1)
-            if key != b'\x00': return key
-        except OSError: pass
-        return None
+        return self.input.get_key()
 
     def draw_ui(self):
         """Desenha a interface da calculadora."""
@@ -111,7 +108,7 @@ class CalculatorApp:
 
         while True:
             key = self.get_key_simple()
-            direction, click = self.trackball.get_direction()
+            direction, click = self.input.get_direction()
 
             needs_redraw = False
 
@@ -156,7 +153,7 @@ class CalculatorApp:
             if needs_redraw:
                 self.draw_ui()
 
-            time.sleep_ms(20)
+            self.input.wait(20)
 
 # --- Ponto de Entrada do App ---
 try:
@@ -164,7 +161,9 @@ try:
     app.run()
 except Exception as e:
     print(f"!!! ERRO ao executar Calculadora: {e}")
-    _display = globals().get('display')
+    # No modo bytecode o hardware vem de builtins, não dos globais do módulo
+    try: _display = display
+    except NameError: _display = None
     if _display:
         _display.fill(st7789.RED)
         _display.text(font, "ERRO NO APP", 10, 10, st7789.WHITE, st7789.RED)
@@ -7,6 +7,7 @@ Permite visualizar o calendário, navegar entre meses/dias e criar eventos.
 import time
 import st7789py as st7789
 from romfonts import vga1_8x8 as font
+from lib.events import get_input
 import os as _os # Importa 'os' com um alias seguro
 
 # --- Constantes ---
@@ -16,7 +17,6 @@ HEADER_COLOR = st7789.YELLOW
 HIGHLIGHT_COLOR = st7789.CYAN
 INPUT_BG_COLOR = st7789.color565(30, 30, 50) # Cor do fundo da caixa de texto
 EVENT_INDICATOR_COLOR = st7789.RED
-KBD_I2C_ADDR = 0x55
 EVENTS_DIR = '/sd/app/calendar/events'
 
 MONTH_NAMES = ["", "Janeiro", "Fevereiro", "Marco", "Abril", "Maio", "Junho", 
@@ -28,6 +28,7 @@ class CalendarApp:
         self.display = display
         self.trackball = trackball
         self.i2c = i2c
+        self.input = get_input(trackball, i2c, touch) # Entrada via fila de eventos (lib/events.py)
         self.sound = sound
         
         # Estado do calendário
@@ -38,6 +39,7 @@ class CalendarApp:
         
         self.events = {} # Cache de eventos para o mês atual
         self.focused_element = 'calendar' # 'calendar' ou 'exit'
+        self.load_events_for_month()
 
     # --- Funções de Lógica de Calendário ---
     def is_leap(self, year):
@@ -65,11 +67,7 @@ class CalendarApp:
         self.display.text(font, text, 10, 10, TEXT_COLOR, BG_COLOR)
 
     def get_key_simple(self):
-        try:
-            key = self.i2c.readfrom(KBD_I2C_ADDR, 1)
-            if key != b'\x00': return key
-        except OSError: pass
-        return None
+        return self.input.get_key()
 
     def load_events_for_month(self):
         """Verifica quais dias do mês atual têm eventos."""
@@ -101,7 +99,7 @@ class CalendarApp:
             self.display.text(font, "[ Nao ]", 60, 130, no_color, BG_COLOR)
             self.display.text(font, "[ Sim ]", 180, 130, yes_color, BG_COLOR)
 
-            direction, click = self.trackball.get_direction()
+            direction, click = self.input.get_direction()
             key = self.get_key_simple()
 
             if direction and direction in ['left', 'right']:
@@ -118,7 +116,7 @@ class CalendarApp:
                 self.sound.play_navigation()
                 return False
 
-            time.sleep_ms(50)
+            self.input.wait(50)
 
     def _draw_event_editor(self, content, editor_focus):
         """Desenha a UI do editor de eventos."""
@@ -181,7 +179,7 @@ class CalendarApp:
             # --- Loop Interno: Aguarda entrada ---
             while True:
                 key = self.get_key_simple()
-                direction, click = self.trackball.get_direction()
+                direction, click = self.input.get_direction()
 
                 # Processa teclado (edição de texto)
                 if key:
@@ -216,7 +214,7 @@ class CalendarApp:
                         else:
                             break # Redesenha a tela se o usuário cancelou
                 
-                time.sleep_ms(20)
+                self.input.wait(20)
 
     def draw_calendar_ui(self):
         """Desenha a UI principal do calendário."""
@@ -262,16 +260,23 @@ class CalendarApp:
         exit_color = HIGHLIGHT_COLOR if is_exit_focused else TEXT_COLOR
         self.display.text(font, "[ Sair ]", 10, 225, exit_color, BG_COLOR)
 
+    def suspend(self):
+        """Mantém o app em memória (mês visível e eventos) ao sair."""
+        return True
+
+    def resume(self):
+        """Volta do cache do launcher com o foco no calendário."""
+        self.focused_element = 'calendar'
+
     def run(self):
         """Loop principal do aplicativo."""
-        self.load_events_for_month()
-
         while True:
             self.draw_calendar_ui()
             
             while True:
                 key = self.get_key_simple()
-                direction, click = self.trackball.get_direction()
+                # dx/dy já vêm acelerados: um giro rápido anda vários dias/semanas
+                dx, dy, click = self.input.get_motion()
 
                 # --- Processa a navegação e ações ---
                 if key:
@@ -290,20 +295,20 @@ class CalendarApp:
                         self.load_events_for_month()
                         break
 
-                if direction: # Navegação com o Trackball
+                if dx or dy: # Navegação com o Trackball
                     if self.focused_element == 'calendar':
                         days_count = self.days_in_month(self.year, self.month)
-                        if direction == 'up': self.selected_day = max(1, self.selected_day - 7)
-                        elif direction == 'down':
-                            self.selected_day += 7
-                            if self.selected_day > days_count:
-                                self.focused_element = 'exit' # Vai para o botão Sair
-                        elif direction == 'left':
-                            self.selected_day = max(1, self.selected_day - 1)
-                        elif direction == 'right':
-                            self.selected_day = min(days_count, self.selected_day + 1)
+                        if abs(dy) >= abs(dx):
+                            if dy < 0: self.selected_day = max(1, self.selected_day + 7 * dy)
+                            else:
+                                self.selected_day += 7 * dy
+                                if self.selected_day > days_count:
+                                    self.selected_day = days_count
+                                    self.focused_element = 'exit' # Vai para o botão Sair
+                        else:
+                            self.selected_day = max(1, min(days_count, self.selected_day + dx))
                     elif self.focused_element == 'exit':
-                        if direction == 'up': self.focused_element = 'calendar' # Volta para o calendário
+                        if dy < 0: self.focused_element = 'calendar' # Volta para o calendário
                     
                     self.sound.play_navigation()
                     break # Quebra para redesenhar a seleção
@@ -317,14 +322,16 @@ class CalendarApp:
                     elif self.focused_element == 'exit':
                         return # Fecha o app
                 
-                time.sleep_ms(50)
+                self.input.wait(50)
 
 # --- Ponto de Entrada do App ---
 try:
     app = CalendarApp(display, touch, trackball, i2c, sound)
     app.run()
 except Exception as e:
-    _display = globals().get('display')
+    # No modo bytecode o hardware vem de builtins, não dos globais do módulo
+    try: _display = display
+    except NameError: _display = None
     if _display:
         _display.fill(st7789.RED)
         _display.text(font, "ERRO NO APP", 10, 10, st7789.WHITE, st7789.RED)
@@ -7,6 +7,7 @@ Permite criar, visualizar e editar notas de texto, com um botão para sair.
 import time
 import st7789py as st7789
 from romfonts import vga1_8x8 as font
+from lib.events import get_input
 import os as _os # Importa 'os' com um alias seguro
 
 # --- Constantes ---
@@ -14,7 +15,6 @@ BG_COLOR = st7789.color565(20, 20, 30)
 TEXT_COLOR = st7789.WHITE
 HIGHLIGHT_COLOR = st7789.CYAN
 INPUT_BG_COLOR = st7789.color565(30, 30, 50)
-KBD_I2C_ADDR = 0x55
 NOTES_DIR = '/sd/app/notepad/notes'
 
 class NotepadApp:
@@ -22,23 +22,21 @@ class NotepadApp:
         self.display = display
         self.trackball = trackball
         self.i2c = i2c
+        self.input = get_input(trackball, i2c, touch) # Entrada via fila de eventos (lib/events.py)
         self.sound = sound
         self.notes = [] # Lista de dicionários de notas
         self.focused_element = 'input'  # 'list', 'input', 'delete_button', ou 'exit'
         self.selected_note_index = 0
         self.active_text = "" # Texto ativo na caixa de edição/criação
         self.editing_filename = None # Nome do arquivo que está sendo editado
+        self.load_notes()
 
     def draw_header(self, text):
         self.display.fill(BG_COLOR)
         self.display.text(font, text, 10, 10, TEXT_COLOR, BG_COLOR)
 
     def get_key_simple(self):
-        try:
-            key = self.i2c.readfrom(KBD_I2C_ADDR, 1)
-            if key != b'\x00': return key
-        except OSError: pass
-        return None
+        return self.input.get_key()
 
     def load_notes(self):
         """Carrega os nomes dos arquivos e uma prévia do conteúdo de cada nota."""
@@ -101,7 +99,7 @@ class NotepadApp:
             self.display.text(font, "[ Nao ]", 60, 130, no_color, BG_COLOR)
             self.display.text(font, "[ Sim ]", 180, 130, yes_color, BG_COLOR)
 
-            direction, click = self.trackball.get_direction()
+            direction, click = self.input.get_direction()
             key = self.get_key_simple()
 
             if direction and direction in ['left', 'right']:
@@ -116,7 +114,7 @@ class NotepadApp:
                 self.sound.play_navigation()
                 return False
 
-            time.sleep_ms(50)
+            self.input.wait(50)
 
     def draw_main_ui(self):
         """Desenha a UI principal com a lista de notas e a caixa de nova nota."""
@@ -163,17 +161,23 @@ class NotepadApp:
         self.display.text(font, "[ Sair ]", exit_x, 225, exit_color, BG_COLOR)
 
 
+    def suspend(self):
+        """Mantém o app em memória (notas e texto em edição) ao sair."""
+        return True
+
+    def resume(self):
+        """Volta do cache do launcher com o foco na caixa de texto."""
+        self.focused_element = 'input'
+
     def run(self):
         """Loop principal do aplicativo."""
-        self.load_notes()
-
         while True:
             self.draw_main_ui()
             
             # Loop de entrada da tela principal
             while True:
                 key = self.get_key_simple()
-                direction, click = self.trackball.get_direction()
+                direction, click = self.input.get_direction()
 
                 # --- Processa a entrada do teclado (apenas para a caixa de texto) ---
                 if key and self.focused_element == 'input':
@@ -240,7 +244,7 @@ class NotepadApp:
                     self.focused_element = 'input' # Move o foco para a caixa de texto
                     break # Sai para redesenhar a tela principal após a edição
 
-                time.sleep_ms(50)
+                self.input.wait(50)
 
 # --- Ponto de Entrada do App ---
 try: # type: ignore
@@ -249,7 +253,9 @@ try: # type: ignore
 except Exception as e:
     print(f"!!! ERRO ao executar Bloco de Notas: {e}")
     # Tenta exibir o erro na tela
-    _display = globals().get('display')
+    # No modo bytecode o hardware vem de builtins, não dos globais do módulo
+    try: _display = display
+    except NameError: _display = None
     if _display:
         _display.fill(st7789.RED)
         _display.text(font, "ERRO NO APP", 10, 10, st7789.WHITE, st7789.RED)
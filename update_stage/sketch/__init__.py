@@ -5,9 +5,13 @@ Permite criar desenhos em uma tela, salvá-los e visualizá-los.
 """
 
 import time
+import struct
 import st7789py as st7789
 from romfonts import vga1_8x8 as font
+from lib.events import get_input
+from lib.native import VIPER
 import os as _os
+from array import array
 
 # --- Constantes ---
 BG_COLOR = st7789.color565(20, 20, 30)
@@ -17,6 +21,424 @@ CURSOR_COLOR = st7789.RED
 DRAW_COLOR = st7789.WHITE
 
 SKETCH_DIR = '/sd/app/sketch/drawings'
+JOURNAL_PATH = '/sd/app/sketch/drawings/rascunho.journal' # Rascunho não salvo
+BLIT_ROWS = 8 # Linhas por blit ao desenhar o bitmap (8 * 640 bytes)
+THUMB_Y = 60
+THUMB_MARGIN = 8
+LIST_NAME_CHARS = 23 # Nomes cortados para não invadir a miniatura
+
+
+def _expand_rows_py(src, start, dst, colors):
+    """
+    Converte bytes do bitmap de 1 bit (a partir de 'start') em pixels RGB565,
+    preenchendo 'dst' inteiro. 'colors' tem os bytes já na ordem do SPI:
+    (frente alto, frente baixo, fundo alto, fundo baixo). Versão em Python,
+    usada no PC.
+    """
+    fg_hi, fg_lo, bg_hi, bg_lo = colors
+    o = 0
+    for i in range(start, start + len(dst) // 16):
+        b = src[i]
+        for bit in range(7, -1, -1):
+            if (b >> bit) & 1:
+                dst[o] = fg_hi
+                dst[o + 1] = fg_lo
+            else:
+                dst[o] = bg_hi
+                dst[o + 1] = bg_lo
+            o += 2
+
+
+_expand_rows = _expand_rows_py
+
+if VIPER: # Viper no aparelho, Python no PC (ver lib/native.py)
+    import micropython
+
+    @micropython.viper
+    def _expand_rows_viper(src, start: int, dst, colors):
+        s = ptr8(src)
+        d = ptr8(dst)
+        c = ptr8(colors)
+        fg_hi = c[0]
+        fg_lo = c[1]
+        bg_hi = c[2]
+        bg_lo = c[3]
+        n = int(len(dst)) >> 4
+        o = 0
+        for i in range(start, start + n):
+            b = s[i]
+            mask = 0x80
+            while mask:
+                if b & mask:
+                    d[o] = fg_hi
+                    d[o + 1] = fg_lo
+                else:
+                    d[o] = bg_hi
+                    d[o + 1] = bg_lo
+                o += 2
+                mask >>= 1
+
+    _expand_rows = _expand_rows_viper
+
+
+# --- Formato de arquivo ---
+#
+# v2: cabeçalho SKETCH_HEADER_FMT (magia, versão, flags, largura, altura,
+# largura e altura da miniatura), a miniatura de 1 bit sem compressão e as
+# linhas do bitmap comprimidas com PackBits, uma a uma. O navegador lê só o
+# cabeçalho e a miniatura.
+#
+# Legado: 4 bytes de dimensões (largura e altura big endian) + bitmap cru.
+
+SKETCH_MAGIC = b'SK'
+SKETCH_VERSION = 2
+SKETCH_HEADER_FMT = '>2sBBHHBB'
+SKETCH_HEADER_SIZE = struct.calcsize(SKETCH_HEADER_FMT)
+THUMB_SCALE = 4 # Cada pixel da miniatura resume um bloco 4x4 (320x240 -> 80x60)
+IO_CHUNK = 512
+
+
+def make_thumbnail(bitmap, row_bytes, height, thumb):
+    """
+    Reduz o bitmap 4x4 -> 1: o pixel da miniatura acende se qualquer pixel do
+    bloco estiver aceso, para traços finos não sumirem.
+    """
+    ti = 0
+    for ty in range(height // THUMB_SCALE):
+        base = ty * THUMB_SCALE * row_bytes
+        for tb in range(row_bytes // THUMB_SCALE):
+            v = 0
+            for k in range(4): # 4 bytes de origem -> 8 pixels da miniatura
+                i = base + tb * 4 + k
+                b = bitmap[i] | bitmap[i + row_bytes] | bitmap[i + 2 * row_bytes] | bitmap[i + 3 * row_bytes]
+                v = (v << 2) | (2 if b & 0xF0 else 0) | (1 if b & 0x0F else 0)
+            thumb[ti] = v
+            ti += 1
+
+
+def packbits_row(row, out):
+    """Comprime uma linha com PackBits, acrescentando em 'out'."""
+    n = len(row)
+    i = 0
+    while i < n:
+        run = 1
+        while i + run < n and run < 128 and row[i + run] == row[i]:
+            run += 1
+        if run >= 3:
+            out.append(257 - run) # -(run - 1) em complemento de dois
+            out.append(row[i])
+            i += run
+            continue
+        start = i
+        i += run
+        while i < n and i - start < 128:
+            if i + 2 < n and row[i] == row[i + 1] == row[i + 2]:
+                break
+            i += 1
+        out.append(i - start - 1)
+        out.extend(row[start:i])
+
+
+class _ChunkReader:
+    """Lê um arquivo em blocos pequenos, byte a byte ou em fatias."""
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = bytearray(IO_CHUNK)
+        self.mv = memoryview(self.buf)
+        self.size = 0
+        self.pos = 0
+
+    def _fill(self):
+        self.size = self.f.readinto(self.buf) or 0
+        self.pos = 0
+        return self.size
+
+    def byte(self):
+        if self.pos >= self.size and not self._fill():
+            raise EOFError
+        self.pos += 1
+        return self.buf[self.pos - 1]
+
+    def copy_to(self, out, o, count):
+        while count:
+            if self.pos >= self.size and not self._fill():
+                raise EOFError
+            take = min(count, self.size - self.pos)
+            out[o:o + take] = self.mv[self.pos:self.pos + take]
+            self.pos += take
+            o += take
+            count -= take
+
+
+def unpackbits(f, out):
+    """Descomprime PackBits do arquivo direto em 'out' até enchê-lo."""
+    reader = _ChunkReader(f)
+    o = 0
+    n = len(out)
+    while o < n:
+        h = reader.byte()
+        if h < 128:
+            count = min(h + 1, n - o)
+            reader.copy_to(out, o, count)
+            o += count
+        elif h > 128:
+            v = reader.byte()
+            for i in range(o, min(o + 257 - h, n)):
+                out[i] = v
+            o = min(o + 257 - h, n)
+
+
+def write_sketch(f, bitmap, width, height):
+    """Grava um desenho no formato v2, linha a linha."""
+    row_bytes = width // 8
+    thumb_w, thumb_h = width // THUMB_SCALE, height // THUMB_SCALE
+    thumb = bytearray(thumb_w * thumb_h // 8)
+    make_thumbnail(bitmap, row_bytes, height, thumb)
+    f.write(struct.pack(SKETCH_HEADER_FMT, SKETCH_MAGIC, SKETCH_VERSION, 0, width, height, thumb_w, thumb_h))
+    f.write(thumb)
+
+    mv = memoryview(bitmap)
+    out = bytearray()
+    for y in range(height):
+        packbits_row(mv[y * row_bytes:(y + 1) * row_bytes], out)
+        if len(out) >= IO_CHUNK:
+            f.write(out)
+            out = bytearray()
+    if out:
+        f.write(out)
+
+
+def read_sketch(f, bitmap):
+    """Lê um desenho (v2 ou legado) para 'bitmap'."""
+    header = f.read(SKETCH_HEADER_SIZE)
+    if header[:2] == SKETCH_MAGIC:
+        magic, version, flags, width, height, thumb_w, thumb_h = struct.unpack(SKETCH_HEADER_FMT, header)
+        if version != SKETCH_VERSION:
+            raise ValueError(f"versão {version} não suportada")
+        f.seek(SKETCH_HEADER_SIZE + thumb_w * thumb_h // 8)
+        unpackbits(f, bitmap)
+    else:
+        f.seek(4) # Legado: pula as dimensões
+        f.readinto(bitmap)
+
+
+# --- Traços, desfazer/refazer e diário ---
+
+TOOL_PEN = 0
+TOOL_FILL = 1
+# (ferramenta, espessura); trackball para cima/baixo troca
+BRUSHES = ((TOOL_PEN, 1), (TOOL_PEN, 3), (TOOL_PEN, 5), (TOOL_PEN, 9), (TOOL_FILL, 0))
+FILL_STACK_SEEDS = 512 # Sementes (x, y) na pilha do preenchimento: 2 KB fixos
+TOUCH_BATCH = 32 # Amostras do touch consumidas por volta do loop
+SMOOTHING_FRAC = 4 # Ponto fixo da suavização (1/16 px)
+SMOOTHING_SHIFT = 1 # Cada amostra nova pesa 1/2 na média
+HINT_MS = 1000
+HINT_Y = 230
+CHECKPOINT_EVERY = 16 # Desfazer reaplica no máximo isso de traços
+MAX_CHECKPOINTS = 4 # Cópias do bitmap guardadas (9600 bytes cada)
+
+# Registro do diário: operação, ferramenta, espessura, x0, y0, nº de deltas
+JOURNAL_FMT = '>BBBhhH'
+JOURNAL_HEADER_SIZE = struct.calcsize(JOURNAL_FMT)
+OP_STROKE = 1
+OP_UNDO = 2
+OP_REDO = 3
+
+
+class Stroke:
+    """
+    Traço gravado como ponto inicial + deltas de 8 bits (x, y intercalados).
+    Saltos maiores que 127 px viram passos intermediários colineares, então
+    os segmentos desenhados ao vivo e na reaplicação são os mesmos.
+    """
+
+    def __init__(self, tool, size, x, y):
+        self.tool = tool
+        self.size = size
+        self.x0 = x
+        self.y0 = y
+        self.x = x
+        self.y = y
+        self.deltas = array('b')
+        self.ymin = y
+        self.ymax = y
+
+    def add(self, x, y):
+        """Acrescenta um ponto; retorna os pontos realmente gravados."""
+        dx = x - self.x
+        dy = y - self.y
+        if not dx and not dy:
+            return ()
+        steps = max(1, (max(abs(dx), abs(dy)) + 126) // 127)
+        added = []
+        px, py = self.x, self.y
+        for i in range(1, steps + 1):
+            nx = self.x + dx * i // steps
+            ny = self.y + dy * i // steps
+            self.deltas.append(nx - px)
+            self.deltas.append(ny - py)
+            added.append((nx, ny))
+            px, py = nx, ny
+        self.x, self.y = x, y
+        if y < self.ymin:
+            self.ymin = y
+        if y > self.ymax:
+            self.ymax = y
+        return added
+
+    def points(self):
+        """Percorre os pontos absolutos do traço."""
+        x, y = self.x0, self.y0
+        yield x, y
+        d = self.deltas
+        for i in range(0, len(d), 2):
+            x += d[i]
+            y += d[i + 1]
+            yield x, y
+
+    def write_to(self, f):
+        f.write(struct.pack(JOURNAL_FMT, OP_STROKE, self.tool, self.size, self.x0, self.y0, len(self.deltas) // 2))
+        f.write(self.deltas)
+
+    @classmethod
+    def from_record(cls, header, f):
+        _, tool, size, x0, y0, n = struct.unpack(JOURNAL_FMT, header)
+        stroke = cls(tool, size, x0, y0)
+        data = f.read(2 * n)
+        if len(data) != 2 * n:
+            raise EOFError
+        stroke.deltas = array('b', data)
+        for x, y in stroke.points():
+            if y < stroke.ymin:
+                stroke.ymin = y
+            if y > stroke.ymax:
+                stroke.ymax = y
+        stroke.x, stroke.y = x, y
+        return stroke
+
+
+class StrokeLog:
+    """
+    Histórico de traços com desfazer/refazer. Os traços além de 'count' são a
+    pilha de refazer. A cada CHECKPOINT_EVERY traços guarda uma cópia do
+    bitmap, de onde o desfazer reaplica os traços seguintes.
+
+    Com mais de MAX_CHECKPOINTS cópias, sai a que fica entre os vizinhos mais
+    próximos (nunca a mais nova): as cópias continuam espalhadas pelo
+    histórico inteiro, em vez de só no fim, e desfazer nunca volta a
+    reaplicar tudo desde a tela vazia.
+    """
+
+    def __init__(self):
+        self.strokes = []
+        self.count = 0
+        self.checkpoints = {} # nº de traços -> bitmap naquele ponto
+
+    def push(self, stroke):
+        del self.strokes[self.count:]
+        for k in [k for k in self.checkpoints if k > self.count]:
+            del self.checkpoints[k]
+        self.strokes.append(stroke)
+        self.count += 1
+
+    def undo(self):
+        if not self.count:
+            return None
+        self.count -= 1
+        return self.strokes[self.count]
+
+    def redo(self):
+        if self.count >= len(self.strokes):
+            return None
+        self.count += 1
+        return self.strokes[self.count - 1]
+
+    def maybe_checkpoint(self, bitmap, n=None):
+        """Guarda o bitmap com 'n' (padrão: count) traços, se n for múltiplo de CHECKPOINT_EVERY."""
+        if n is None:
+            n = self.count
+        if not n or n % CHECKPOINT_EVERY or n in self.checkpoints:
+            return
+        if len(self.checkpoints) < MAX_CHECKPOINTS:
+            self.checkpoints[n] = bytearray(bitmap)
+            return
+        victim = self._thin_victim(n)
+        if victim == n:
+            return
+        copy = self.checkpoints.pop(victim) # Reaproveita a cópia descartada
+        copy[:] = bitmap
+        self.checkpoints[n] = copy
+
+    def _thin_victim(self, n):
+        """Checkpoint (entre os atuais e n) cuja remoção junta os vizinhos mais próximos."""
+        keys = sorted(self.checkpoints)
+        keys.append(n)
+        keys.sort()
+        victim = None
+        best = 0
+        for j in range(len(keys) - 1):
+            gap = keys[j + 1] - (keys[j - 1] if j else 0)
+            if victim is None or gap <= best: # Empate: descarta o mais novo
+                victim = keys[j]
+                best = gap
+        return victim
+
+    def checkpoint_for(self, n):
+        """Retorna (k, bitmap) do checkpoint mais recente com k <= n (None = tela vazia)."""
+        best = -1
+        for k in self.checkpoints:
+            if best < k <= n:
+                best = k
+        if best < 0:
+            return 0, None
+        return best, self.checkpoints[best]
+
+
+def read_journal(path, log):
+    """Reconstrói o histórico a partir do diário (um registro parcial no fim é ignorado)."""
+    with open(path, 'rb') as f:
+        while True:
+            op = f.read(1)
+            if not op:
+                break
+            if op[0] == OP_STROKE:
+                header = op + f.read(JOURNAL_HEADER_SIZE - 1)
+                if len(header) != JOURNAL_HEADER_SIZE:
+                    break
+                try:
+                    log.push(Stroke.from_record(header, f))
+                except EOFError:
+                    break
+            elif op[0] == OP_UNDO:
+                log.undo()
+            elif op[0] == OP_REDO:
+                log.redo()
+            else:
+                break
+
+
+def write_journal(f, log):
+    """Grava o histórico inteiro como diário: todos os traços e os desfazer pendentes."""
+    for stroke in log.strokes:
+        stroke.write_to(f)
+    f.write(bytes((OP_UNDO,)) * (len(log.strokes) - log.count))
+
+
+def read_thumbnail(f, thumb, width, height):
+    """
+    Lê a miniatura para 'thumb'. Arquivos legados não têm miniatura: o bitmap
+    é lido e reduzido na hora.
+    """
+    header = f.read(SKETCH_HEADER_SIZE)
+    if header[:2] == SKETCH_MAGIC:
+        f.readinto(thumb)
+        return
+    bitmap = bytearray(width * height // 8)
+    f.seek(4)
+    f.readinto(bitmap)
+    make_thumbnail(bitmap, width // 8, height, thumb)
+
 
 class SketchApp:
     def __init__(self, display, touch, trackball, i2c, sound):
@@ -24,6 +446,8 @@ class SketchApp:
         self.trackball = trackball
         self.touch = touch
         self.sound = sound
+        self.i2c = i2c
+        self.input = None # Criado em run() (ver lib/events.py)
         
         self.mode = 'main_menu' # 'main_menu', 'file_browser', 'drawing', 'viewing'
         self.saved_files = []
@@ -32,12 +456,31 @@ class SketchApp:
         # Estado do canvas de desenho
         self.cursor_x = self.display.width // 2
         self.cursor_y = self.display.height // 2
-        self.prev_touch_x = -1
-        self.prev_touch_y = -1
         
         # Buffer para o desenho (1-bit: 320*240 / 8 = 9600 bytes)
         # Usamos um buffer para não ter que ler da tela, o que é lento.
         self.draw_buffer = bytearray((self.display.width * self.display.height) // 8)
+        self._row_bytes = self.display.width // 8
+        self._blit_buffer = None # Criado no primeiro uso (BLIT_ROWS linhas RGB565)
+
+        # Histórico de traços do desenho atual e diário de autosalvamento
+        self.log = StrokeLog()
+        self._stroke = None
+        self._journal = None
+
+        # Pincel e rasterização em spans
+        self.brush_index = 0
+        self._disks = {}
+        self._span_lo = array('h', bytes(2 * self.display.height))
+        self._span_hi = array('h', bytes(2 * self.display.height))
+        self._full_row = b'\xff' * self._row_bytes
+        self._touch_xs = array('h', bytes(2 * TOUCH_BATCH))
+        self._touch_ys = array('h', bytes(2 * TOUCH_BATCH))
+        self._smooth_x = self._smooth_y = 0
+        self._last_raw = (0, 0)
+        self._hint_until = None
+        self._touch_used = False # O toque atual já disparou um preenchimento
+        self._fill_stack = array('h', bytes(4 * FILL_STACK_SEEDS))
 
     def _ensure_dir_exists(self):
         """Garante que o diretório de desenhos exista."""
@@ -51,45 +494,400 @@ class SketchApp:
         self._ensure_dir_exists()
         self.saved_files = sorted([f for f in _os.listdir(SKETCH_DIR) if f.endswith('.sketch')], reverse=True)
 
-    # --- Funções de Desenho e Arquivo ---
+    # --- Rasterização em spans ---
 
-    def _set_pixel_in_buffer(self, x, y, state):
-        """Define um pixel no buffer de 1-bit."""
-        if not (0 <= x < self.display.width and 0 <= y < self.display.height):
+    def _fill_bits(self, y, x0, x1):
+        """Acende os pixels [x0, x1] da linha y no bitmap, byte a byte."""
+        buf = self.draw_buffer
+        base = y * self._row_bytes
+        b0 = base + (x0 >> 3)
+        b1 = base + (x1 >> 3)
+        m0 = 0xFF >> (x0 & 7)
+        m1 = (0xFF << (7 - (x1 & 7))) & 0xFF
+        if b0 == b1:
+            buf[b0] |= m0 & m1
             return
-        index = (y * self.display.width + x) // 8
-        bit = 7 - ((y * self.display.width + x) % 8)
-        if state:
-            self.draw_buffer[index] |= (1 << bit)
-        else:
-            self.draw_buffer[index] &= ~(1 << bit)
-
-    def _line_to_buffer(self, x0, y0, x1, y1, state):
-        """Desenha uma linha no buffer de 1-bit usando o algoritmo de Bresenham."""
-        steep = abs(y1 - y0) > abs(x1 - x0)
-        if steep:
-            x0, y0 = y0, x0
-            x1, y1 = y1, x1
-        if x0 > x1:
-            x0, x1 = x1, x0
-            y0, y1 = y1, y0
-        
+        buf[b0] |= m0
+        buf[b1] |= m1
+        if b1 - b0 > 1:
+            buf[b0 + 1:b1] = self._full_row[:b1 - b0 - 1]
+
+    def _disk(self, r):
+        """Meia largura de cada linha de um disco de raio r (com cache)."""
+        half = self._disks.get(r)
+        if half is None:
+            half = bytearray(r + 1)
+            for dy in range(r + 1):
+                h = 0
+                while (h + 1) * (h + 1) + dy * dy <= r * r + r:
+                    h += 1
+                half[dy] = h
+            self._disks[r] = half
+        return half
+
+    def _brush_segment(self, x0, y0, x1, y1, size, to_display):
+        """
+        Rasteriza um segmento com pincel redondo de largura 'size'. O disco
+        é carimbado ao longo do segmento (passo <= raio) e cada linha guarda
+        só o menor e o maior x cobertos; o resultado vira um span por linha,
+        recortado ao canvas, escrito no bitmap e enviado ao painel como
+        fill_rect (linhas seguidas com o mesmo span viram um só retângulo).
+        """
+        width = self.display.width
+        height = self.display.height
+        r = size // 2
+        top = max(0, min(y0, y1) - r)
+        bottom = min(height - 1, max(y0, y1) + r)
+        if top > bottom:
+            return
+        lo = self._span_lo
+        hi = self._span_hi
+        for y in range(top, bottom + 1):
+            lo[y] = 32767
+            hi[y] = -32768
+
+        half = self._disk(r)
         dx = x1 - x0
-        dy = abs(y1 - y0)
-        err = dx // 2
-        ystep = 1 if y0 < y1 else -1
-        
-        while x0 <= x1:
-            if steep:
-                self._set_pixel_in_buffer(y0, x0, state)
+        dy = y1 - y0
+        step = r if r > 1 else 1
+        n = (max(abs(dx), abs(dy)) + step - 1) // step
+        for i in range(n + 1):
+            if n:
+                cx = x0 + dx * i // n
+                cy = y0 + dy * i // n
             else:
-                self._set_pixel_in_buffer(x0, y0, state)
-            
-            err -= dy
-            if err < 0:
-                y0 += ystep
-                err += dx
-            x0 += 1
+                cx, cy = x0, y0
+            for k in range(-r, r + 1):
+                y = cy + k
+                if y < top or y > bottom:
+                    continue
+                h = half[k if k >= 0 else -k]
+                if cx - h < lo[y]:
+                    lo[y] = cx - h
+                if cx + h > hi[y]:
+                    hi[y] = cx + h
+
+        run_y = -1
+        run_a = run_b = 0
+        for y in range(top, bottom + 2):
+            if y <= bottom:
+                a = lo[y] if lo[y] > 0 else 0
+                b = hi[y] if hi[y] < width - 1 else width - 1
+                if a <= b:
+                    self._fill_bits(y, a, b)
+                    if run_y >= 0 and a == run_a and b == run_b:
+                        continue
+            else:
+                a, b = 1, 0
+            if run_y >= 0 and to_display:
+                self.display.fill_rect(run_a, run_y, run_b - run_a + 1, y - run_y, DRAW_COLOR)
+            run_y = y if a <= b else -1
+            run_a, run_b = a, b
+
+    # --- Preenchimento (balde) ---
+
+    def _is_set(self, base, x):
+        return self.draw_buffer[base + (x >> 3)] & (0x80 >> (x & 7))
+
+    def _free_right(self, base, x, limit):
+        """Último x livre a partir de x (inclusive) até 'limit', pulando bytes vazios."""
+        buf = self.draw_buffer
+        while x <= limit:
+            if not x & 7 and x + 7 <= limit and not buf[base + (x >> 3)]:
+                x += 8
+                continue
+            if buf[base + (x >> 3)] & (0x80 >> (x & 7)):
+                break
+            x += 1
+        return x - 1
+
+    def _free_left(self, base, x):
+        buf = self.draw_buffer
+        while x >= 0:
+            if x & 7 == 7 and not buf[base + (x >> 3)]:
+                x -= 8
+                continue
+            if buf[base + (x >> 3)] & (0x80 >> (x & 7)):
+                break
+            x -= 1
+        return x + 1
+
+    def _push_seeds(self, y, lx, rx, stack, top):
+        """Empilha uma semente por trecho livre da linha y em [lx, rx]."""
+        base = y * self._row_bytes
+        buf = self.draw_buffer
+        x = lx
+        while x <= rx:
+            if not x & 7 and x + 7 <= rx and buf[base + (x >> 3)] == 0xFF:
+                x += 8
+                continue
+            if self._is_set(base, x):
+                x += 1
+                continue
+            if top >= len(stack):
+                self._fill_overflow = True
+                return top
+            stack[top] = x
+            stack[top + 1] = y
+            top += 2
+            x = self._free_right(base, x, rx) + 2
+        return top
+
+    def _flood_fill(self, x, y, to_display):
+        """
+        Preenchimento por linhas de varredura a partir de (x, y), sem
+        recursão. A pilha de sementes é um array de tamanho fixo; se
+        encher, as sementes excedentes são reencontradas por varreduras
+        do bitmap, comparando com uma máscara do que já foi preenchido.
+        Cada span preenchido vai para o painel como fill_rect (spans iguais
+        em linhas seguidas são juntados). Retorna (ymin, ymax) ou None.
+        """
+        width = self.display.width
+        height = self.display.height
+        if not (0 <= x < width and 0 <= y < height) or self._is_set(y * self._row_bytes, x):
+            return None
+        stack = self._fill_stack
+        stack[0] = x
+        stack[1] = y
+        top = 2
+        mask = None
+        self._fill_overflow = False
+        ymin = ymax = y
+        run_y = run_end = -1
+        run_a = run_b = 0
+        while True:
+            while top:
+                top -= 2
+                sx = stack[top]
+                sy = stack[top + 1]
+                base = sy * self._row_bytes
+                if self._is_set(base, sx):
+                    continue
+                lx = self._free_left(base, sx)
+                rx = self._free_right(base, sx, width - 1)
+                self._fill_bits(sy, lx, rx)
+                if mask is not None:
+                    self._fill_mask_bits(mask, sy, lx, rx)
+                if sy < ymin:
+                    ymin = sy
+                if sy > ymax:
+                    ymax = sy
+                if to_display:
+                    if lx == run_a and rx == run_b and sy == run_end + 1:
+                        run_end = sy
+                    elif lx == run_a and rx == run_b and sy == run_y - 1:
+                        run_y = sy
+                    else:
+                        if run_y >= 0:
+                            self.display.fill_rect(run_a, run_y, run_b - run_a + 1, run_end - run_y + 1, DRAW_COLOR)
+                        run_y = run_end = sy
+                        run_a, run_b = lx, rx
+                if sy > 0:
+                    top = self._push_seeds(sy - 1, lx, rx, stack, top)
+                if sy < height - 1:
+                    top = self._push_seeds(sy + 1, lx, rx, stack, top)
+                if self._fill_overflow and mask is None:
+                    # A partir daqui o que for preenchido também vai para a máscara
+                    mask = bytearray(len(self.draw_buffer))
+                    self._fill_mask_bits(mask, sy, lx, rx)
+            if mask is None:
+                break
+            # Houve estouro: varre até uma passada não achar mais nada
+            top = self._reseed(mask, stack)
+            if not top:
+                break
+        if run_y >= 0:
+            self.display.fill_rect(run_a, run_y, run_b - run_a + 1, run_end - run_y + 1, DRAW_COLOR)
+        return ymin, ymax
+
+    def _fill_mask_bits(self, mask, y, x0, x1):
+        buf = self.draw_buffer
+        self.draw_buffer = mask
+        self._fill_bits(y, x0, x1)
+        self.draw_buffer = buf
+
+    def _reseed(self, mask, stack):
+        """
+        Depois de um estouro da pilha: empilha o início de cada trecho de
+        pixels livres logo acima ou abaixo de pixels da máscara (um byte pode
+        ter vários). Retorna o topo da pilha; 0 quer dizer que a região está
+        completa.
+        """
+        buf = self.draw_buffer
+        row = self._row_bytes
+        size = len(buf)
+        limit = len(stack)
+        top = 0
+        for i in range(size):
+            near = (mask[i - row] if i >= row else 0) | (mask[i + row] if i + row < size else 0)
+            free = near & ~buf[i] & 0xFF
+            bit = 0
+            while free:
+                while not free & (0x80 >> bit):
+                    bit += 1
+                if top >= limit:
+                    return top # O resto fica para a próxima passada
+                stack[top] = (i % row) * 8 + bit
+                stack[top + 1] = i // row
+                top += 2
+                # Pula o trecho que começa aqui: a semente preenche a linha toda
+                while bit < 8 and free & (0x80 >> bit):
+                    free &= ~(0x80 >> bit)
+                    bit += 1
+        return top
+
+    # --- Traços ---
+
+    def _rasterize_stroke(self, stroke, to_display):
+        """Desenha um traço inteiro no bitmap (e na tela, se pedido)."""
+        if stroke.tool == TOOL_FILL:
+            extent = self._flood_fill(stroke.x0, stroke.y0, to_display)
+            if extent is not None:
+                stroke.ymin, stroke.ymax = extent
+            return
+        prev = None
+        for x, y in stroke.points():
+            if prev is None:
+                self._brush_segment(x, y, x, y, stroke.size, to_display)
+            else:
+                self._brush_segment(prev[0], prev[1], x, y, stroke.size, to_display)
+            prev = (x, y)
+
+    def _begin_stroke(self, x, y):
+        self._stroke = Stroke(TOOL_PEN, BRUSHES[self.brush_index][1], x, y)
+        self._smooth_x = x << SMOOTHING_FRAC
+        self._smooth_y = y << SMOOTHING_FRAC
+        self._last_raw = (x, y)
+        self._brush_segment(x, y, x, y, self._stroke.size, True)
+
+    def _extend_stroke(self, x, y):
+        stroke = self._stroke
+        px, py = stroke.x, stroke.y
+        for nx, ny in stroke.add(x, y):
+            self._brush_segment(px, py, nx, ny, stroke.size, True)
+            px, py = nx, ny
+
+    def _feed_touch(self, x, y):
+        """Recebe uma amostra crua do touch e a suaviza (média móvel exponencial)."""
+        if BRUSHES[self.brush_index][0] == TOOL_FILL:
+            # Balde: só o primeiro ponto de cada toque conta
+            if not self._touch_used:
+                self._touch_used = True
+                self._fill_at(x, y)
+            return
+        if self._stroke is None:
+            self._begin_stroke(x, y)
+            return
+        self._last_raw = (x, y)
+        self._smooth_x += ((x << SMOOTHING_FRAC) - self._smooth_x) >> SMOOTHING_SHIFT
+        self._smooth_y += ((y << SMOOTHING_FRAC) - self._smooth_y) >> SMOOTHING_SHIFT
+        half = 1 << (SMOOTHING_FRAC - 1)
+        self._extend_stroke((self._smooth_x + half) >> SMOOTHING_FRAC, (self._smooth_y + half) >> SMOOTHING_FRAC)
+
+    def _end_stroke(self):
+        """Fecha o traço atual: entra no histórico e é anexado ao diário."""
+        stroke = self._stroke
+        if stroke is None:
+            return
+        # A suavização atrasa o traço: termina onde o dedo saiu
+        self._extend_stroke(*self._last_raw)
+        self._stroke = None
+        self.log.push(stroke)
+        self.log.maybe_checkpoint(self.draw_buffer)
+        self._journal_write(stroke)
+
+    def _fill_at(self, x, y):
+        """Preenche a região sob (x, y) e a registra como um traço de balde."""
+        stroke = Stroke(TOOL_FILL, 0, x, y)
+        self._rasterize_stroke(stroke, True)
+        self.log.push(stroke)
+        self.log.maybe_checkpoint(self.draw_buffer)
+        self._journal_write(stroke)
+
+    def _undo(self):
+        """Volta ao checkpoint anterior, reaplica os traços e redesenha só a faixa afetada."""
+        stroke = self.log.undo()
+        if stroke is None:
+            return False
+        k, bitmap = self.log.checkpoint_for(self.log.count)
+        if bitmap is None:
+            self.draw_buffer[:] = bytes(len(self.draw_buffer))
+        else:
+            self.draw_buffer[:] = bitmap
+        for i in range(k, self.log.count):
+            self._rasterize_stroke(self.log.strokes[i], False)
+            # Os próximos desfazer partem daqui, sem repetir a reaplicação
+            self.log.maybe_checkpoint(self.draw_buffer, i + 1)
+        self._draw_buffer_rows(max(0, stroke.ymin - stroke.size), min(self.display.height, stroke.ymax + stroke.size + 1))
+        self._journal_write(OP_UNDO)
+        return True
+
+    def _redo(self):
+        stroke = self.log.redo()
+        if stroke is None:
+            return False
+        self._rasterize_stroke(stroke, True)
+        self.log.maybe_checkpoint(self.draw_buffer)
+        self._journal_write(OP_REDO)
+        return True
+
+    def _rebuild_from_log(self):
+        """Refaz o bitmap a partir do histórico (recuperação do rascunho)."""
+        self.draw_buffer = bytearray(len(self.draw_buffer))
+        self.log.checkpoints = {}
+        for i in range(self.log.count):
+            self._rasterize_stroke(self.log.strokes[i], False)
+            self.log.maybe_checkpoint(self.draw_buffer, i + 1)
+        self._draw_buffer_rows()
+
+    # --- Diário (autosalvamento incremental) ---
+
+    def _journal_open(self, resume):
+        """
+        Abre o diário. Ao retomar, ele é antes reescrito a partir do histórico
+        já lido: um registro parcial deixado por uma queda de energia ficaria
+        no meio do arquivo e read_journal pararia nele na próxima recuperação.
+        """
+        self._ensure_dir_exists()
+        try:
+            if resume:
+                tmp_path = JOURNAL_PATH + '.tmp'
+                with open(tmp_path, 'wb') as f:
+                    write_journal(f, self.log)
+                _os.rename(tmp_path, JOURNAL_PATH)
+            self._journal = open(JOURNAL_PATH, 'ab' if resume else 'wb')
+        except OSError as e:
+            print(f"Erro ao abrir o diário do rascunho: {e}")
+            self._journal = None
+
+    def _journal_write(self, record):
+        """Anexa um traço (ou OP_UNDO/OP_REDO) ao diário, sem reescrever o desenho."""
+        if self._journal is None:
+            return
+        try:
+            if isinstance(record, int):
+                self._journal.write(bytes((record,)))
+            else:
+                record.write_to(self._journal)
+            self._journal.flush()
+        except OSError as e:
+            print(f"Erro ao gravar o diário do rascunho: {e}")
+
+    def _journal_close(self, discard):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if discard:
+            try:
+                _os.remove(JOURNAL_PATH)
+            except OSError:
+                pass
+
+    def _has_draft(self):
+        try:
+            return _os.stat(JOURNAL_PATH)[6] > 0
+        except OSError:
+            return False
 
     def _save_drawing(self):
         """Salva o buffer de desenho em um arquivo."""
@@ -100,33 +898,78 @@ class SketchApp:
         
         try:
             with open(filepath, 'wb') as f:
-                # Salva as dimensões para referência futura
-                f.write(bytes([self.display.width // 256, self.display.width % 256]))
-                f.write(bytes([self.display.height // 256, self.display.height % 256]))
-                f.write(self.draw_buffer)
+                write_sketch(f, self.draw_buffer, self.display.width, self.display.height)
             return True
         except OSError:
             return False
 
+    def _color_bytes(self):
+        """Cores de frente e fundo na ordem de bytes que o display espera."""
+        colors = bytearray(4)
+        for i, color in enumerate((DRAW_COLOR, BG_COLOR)):
+            hi, lo = color >> 8, color & 0xFF
+            if self.display.needs_swap:
+                hi, lo = lo, hi
+            colors[i * 2] = hi
+            colors[i * 2 + 1] = lo
+        return colors
+
+    def _blit_bitmap(self, bits, start, x, y, width, height):
+        """
+        Desenha um bitmap de 1 bit (linhas de width // 8 bytes a partir de
+        'start'): cada bloco de linhas que cabe no buffer é expandido para
+        RGB565 e enviado com um único blit.
+        """
+        if self._blit_buffer is None:
+            self._blit_buffer = bytearray(self.display.width * 2 * BLIT_ROWS)
+        colors = self._color_bytes()
+        mv = memoryview(self._blit_buffer)
+        max_rows = len(self._blit_buffer) // (width * 2)
+        row_bytes = width // 8
+        row = 0
+        while row < height:
+            rows = min(max_rows, height - row)
+            chunk = mv[:rows * width * 2]
+            _expand_rows(bits, start + row * row_bytes, chunk, colors)
+            self.display.blit_buffer(chunk, x, y + row, width, rows)
+            row += rows
+
+    def _draw_buffer_rows(self, y0=0, y1=None):
+        """Desenha as linhas [y0, y1) do bitmap na tela."""
+        if y1 is None:
+            y1 = self.display.height
+        self._blit_bitmap(self.draw_buffer, y0 * self._row_bytes, 0, y0, self.display.width, y1 - y0)
+
     def _load_drawing_to_display(self, filename):
-        """Carrega um desenho do arquivo e o exibe na tela."""
+        """Carrega um desenho do arquivo para o bitmap e o exibe na tela."""
         filepath = f"{SKETCH_DIR}/{filename}"
         try:
             with open(filepath, 'rb') as f:
-                f.read(4) # Pula as dimensões por enquanto
-                buffer = f.read()
-                
-                self.display.fill(BG_COLOR)
-                for y in range(self.display.height):
-                    for x in range(self.display.width):
-                        index = (y * self.display.width + x) // 8
-                        bit = 7 - ((y * self.display.width + x) % 8)
-                        if (buffer[index] >> bit) & 1:
-                            self.display.pixel(x, y, DRAW_COLOR)
+                self.draw_buffer = bytearray(len(self.draw_buffer))
+                read_sketch(f, self.draw_buffer)
+            self._draw_buffer_rows()
             return True
-        except OSError:
+        except (OSError, ValueError, EOFError) as e:
+            print(f"Erro ao abrir o desenho {filename}: {e}")
             return False
 
+    def _draw_thumbnail(self, filename):
+        """Mostra a miniatura do desenho ao lado da lista (ou limpa a área)."""
+        w = self.display.width // THUMB_SCALE
+        h = self.display.height // THUMB_SCALE
+        x = self.display.width - w - THUMB_MARGIN
+        if filename is None:
+            self.display.fill_rect(x - 1, THUMB_Y - 1, w + 2, h + 2, BG_COLOR)
+            return
+        thumb = bytearray(w * h // 8)
+        try:
+            with open(f"{SKETCH_DIR}/{filename}", 'rb') as f:
+                read_thumbnail(f, thumb, self.display.width, self.display.height)
+        except OSError:
+            return
+        self.display.rect(x - 1, THUMB_Y - 1, w + 2, h + 2, HIGHLIGHT_COLOR)
+        self._blit_bitmap(thumb, 0, x, THUMB_Y, w, h)
+
     def _delete_drawing(self, filename):
         """Apaga um arquivo de desenho do SD card."""
         filepath = f"{SKETCH_DIR}/{filename}"
@@ -136,11 +979,11 @@ class SketchApp:
         except OSError:
             return False
 
-    def _confirm_delete_ui(self):
-        """Mostra uma UI de confirmação para apagar um desenho, similar ao Notepad."""
+    def _confirm_delete_ui(self, question="Apagar este desenho?"):
+        """Mostra uma UI de confirmação para apagar um desenho (ou o rascunho), similar ao Notepad."""
         self.display.fill_rect(40, 80, 240, 80, BG_COLOR)
         self.display.rect(40, 80, 240, 80, HIGHLIGHT_COLOR)
-        self.display.text(font, "Apagar este desenho?", 60, 95, TEXT_COLOR, BG_COLOR)
+        self.display.text(font, question, 60, 95, TEXT_COLOR, BG_COLOR)
         
         confirm_focus = 'no' # 'yes' ou 'no'
         while True:
@@ -149,7 +992,7 @@ class SketchApp:
             self.display.text(font, "[ Nao ]", 60, 130, no_color, BG_COLOR)
             self.display.text(font, "[ Sim ]", 180, 130, yes_color, BG_COLOR)
 
-            direction, click = self.trackball.get_direction()
+            direction, click = self.input.get_direction()
 
             if direction and direction in ['left', 'right']:
                 confirm_focus = 'yes' if confirm_focus == 'no' else 'no'
@@ -157,12 +1000,15 @@ class SketchApp:
             elif click:
                 self.sound.play_confirm()
                 return confirm_focus == 'yes'
+            self.input.wait(50)
 
     # --- Telas (Modos) do Aplicativo ---
 
     def run_main_menu(self):
         """Tela do menu principal."""
         menu_items = ["Novo Desenho", "Ver Salvos", "[ Sair ]"]
+        if self._has_draft():
+            menu_items.insert(1, "Continuar Rascunho")
         self.selected_index = 0
 
         # Função auxiliar para desenhar o menu e evitar repetição de código
@@ -176,7 +1022,7 @@ class SketchApp:
         draw_menu() # Desenha o menu uma vez no início
 
         while self.mode == 'main_menu':
-            direction, click = self.trackball.get_direction()
+            direction, click = self.input.get_direction()
             
             if direction in ['up', 'down']:
                 if direction == 'up':
@@ -188,15 +1034,22 @@ class SketchApp:
             
             if click:
                 self.sound.play_confirm()
-                if self.selected_index == 0:
-                    self.mode = 'drawing'
-                elif self.selected_index == 1:
+                item = menu_items[self.selected_index]
+                if item == "Novo Desenho":
+                    # Um desenho novo reescreve o diário: o rascunho se perderia
+                    if "Continuar Rascunho" in menu_items and not self._confirm_delete_ui("Descartar o rascunho?"):
+                        draw_menu()
+                    else:
+                        self.mode = 'drawing'
+                elif item == "Continuar Rascunho":
+                    self.mode = 'resume_drawing'
+                elif item == "Ver Salvos":
                     self._load_saved_files()
                     self.mode = 'file_browser'
-                elif self.selected_index == 2:
+                else:
                     self.mode = 'exit' # Sinaliza para o loop principal sair
             
-            time.sleep_ms(50)
+            self.input.wait(50)
 
     def run_file_browser(self):
         """Tela para visualizar arquivos salvos."""
@@ -211,11 +1064,18 @@ class SketchApp:
             if index < len(self.saved_files):
                 # É um arquivo de desenho
                 text = self.saved_files[index].replace('.sketch', '')
-                self.display.text(font, text[:30], 40, y_pos, color, BG_COLOR) # Recuo padronizado
+                self.display.text(font, text[:LIST_NAME_CHARS], 40, y_pos, color, BG_COLOR) # Recuo padronizado
             else:
                 # É o botão "Voltar"
                 self.display.text(font, "[ Voltar ]", 40, y_pos, color, BG_COLOR) # Recuo padronizado
 
+        # Miniatura do item selecionado (lê só o cabeçalho do arquivo)
+        def show_thumbnail():
+            if self.selected_index < len(self.saved_files):
+                self._draw_thumbnail(self.saved_files[self.selected_index])
+            else:
+                self._draw_thumbnail(None)
+
         # Desenha a tela inicial uma vez
         self.display.fill(BG_COLOR)
         self.display.text(font, "Desenhos Salvos", 10, 10, TEXT_COLOR, BG_COLOR)
@@ -227,23 +1087,23 @@ class SketchApp:
         for i in range(len(self.saved_files) + 1): # +1 para o botão Voltar
             if i > 10: break
             draw_list_item(i, i == self.selected_index)
+        show_thumbnail()
 
         while self.mode == 'file_browser':
-            direction, click = self.trackball.get_direction()
+            # dy já vem acelerado: um giro rápido pula vários arquivos
+            dx, dy, click = self.input.get_motion()
 
-            if direction:
+            if dy:
                 old_selected_index = self.selected_index
-                if direction == 'up':
-                    self.selected_index = max(0, self.selected_index - 1)
-                elif direction == 'down':
-                    # O limite agora é o número de arquivos + o botão Voltar
-                    self.selected_index = min(len(self.saved_files), self.selected_index + 1)
+                # O limite agora é o número de arquivos + o botão Voltar
+                self.selected_index = max(0, min(len(self.saved_files), self.selected_index + dy))
                 
                 if old_selected_index != self.selected_index:
                     self.sound.play_navigation()
                     # Redesenha apenas os itens afetados para evitar piscar
                     draw_list_item(old_selected_index, False) # Apaga o highlight antigo
                     draw_list_item(self.selected_index, True)  # Desenha o novo highlight
+                    show_thumbnail()
 
             if click:
                 if self.selected_index < len(self.saved_files): # Clicou em um arquivo
@@ -255,11 +1115,12 @@ class SketchApp:
                     for i in range(len(self.saved_files) + 1):
                         if i > 5: break # Limita a 5 itens visíveis para não sobrepor o texto inferior
                         draw_list_item(i, i == self.selected_index)
+                    show_thumbnail()
                 else: # Clicou em "Voltar"
                     self.sound.play_navigation()
                     self.mode = 'main_menu'
 
-            time.sleep_ms(50)
+            self.input.wait(50)
 
     def run_viewing_canvas(self, filename):
         """Tela para visualizar um desenho salvo (read-only)."""
@@ -277,7 +1138,7 @@ class SketchApp:
         draw_buttons()
 
         while True:
-            direction, click = self.trackball.get_direction()
+            direction, click = self.input.get_direction()
 
             if direction in ['left', 'right']:
                 focus = 'delete' if focus == 'back' else 'back'
@@ -298,51 +1159,94 @@ class SketchApp:
                         self._load_drawing_to_display(filename)
                         draw_buttons()
 
-            time.sleep_ms(50)
+            self.input.wait(50)
 
-    def run_drawing_canvas(self):
-        """Tela principal de desenho."""
-        # Limpa o buffer e a tela
-        self.draw_buffer = bytearray(len(self.draw_buffer))
-        self.display.fill(BG_COLOR)
+    def _show_brush_hint(self):
+        """Mostra o pincel atual por HINT_MS no rodapé do canvas."""
+        tool, size = BRUSHES[self.brush_index]
+        label = "Balde  " if tool == TOOL_FILL else f"Pincel {size}"
+        self.display.text(font, label, 4, HINT_Y, HIGHLIGHT_COLOR, BG_COLOR)
+        self._hint_until = time.ticks_add(time.ticks_ms(), HINT_MS)
 
-        # Reseta as coordenadas do toque anterior ao entrar no modo de desenho
-        self.prev_touch_x = -1
-        self.prev_touch_y = -1
+    def run_drawing_canvas(self, resume=False):
+        """
+        Tela principal de desenho. Trackball: esquerda desfaz, direita refaz,
+        cima/baixo troca o pincel (o último é o balde de preenchimento), clique
+        salva e sai. Cada traço terminado vai para o diário, então um rascunho
+        interrompido pode ser retomado pelo menu.
+        """
+        self.log = StrokeLog()
+        self._stroke = None
+        if resume:
+            try:
+                read_journal(JOURNAL_PATH, self.log)
+            except OSError as e:
+                print(f"Erro ao ler o rascunho: {e}")
+            self._rebuild_from_log()
+        else:
+            # Limpa o buffer e a tela
+            self.draw_buffer = bytearray(len(self.draw_buffer))
+            self.display.fill(BG_COLOR)
+        self._journal_open(resume)
+        self.mode = 'drawing'
 
         while self.mode == 'drawing':
-            # Lógica de Desenho por Toque
-            event_type, tx, ty = self.touch.read()
-            if event_type == self.touch.TAP or event_type == self.touch.DRAG:
-                if self.prev_touch_x != -1:
-                    # Se houver um ponto anterior, desenha uma linha até o ponto atual
-                    self.display.line(self.prev_touch_x, self.prev_touch_y, tx, ty, DRAW_COLOR) # Desenha na tela
-                    self._line_to_buffer(self.prev_touch_x, self.prev_touch_y, tx, ty, True) # Salva a linha no buffer
+            # Consome todas as amostras pendentes do touch de uma vez: um
+            # traço rápido continua contínuo mesmo com o loop atrasado
+            count, _ = self.touch.read_points(self._touch_xs, self._touch_ys, True)
+            for i in range(count):
+                x = self._touch_xs[i]
+                if x < 0:
+                    # O dedo saiu e voltou dentro do mesmo lote: são dois traços
+                    self._touch_used = False
+                    self._end_stroke()
                 else:
-                    # Se for o primeiro ponto, apenas desenha um pixel
-                    self.display.pixel(tx, ty, DRAW_COLOR)
-                    self._set_pixel_in_buffer(tx, ty, True) # Salva o pixel no buffer
-                
-                self.prev_touch_x, self.prev_touch_y = tx, ty
+                    self._feed_touch(x, self._touch_ys[i])
+            if not self.touch.is_down:
+                self._touch_used = False
+                if self._stroke is not None:
+                    self._end_stroke()
+
+            direction, click = self.input.get_direction()
+
+            if direction == 'left' and self._stroke is None:
+                if self._undo():
+                    self.sound.play_navigation()
+            elif direction == 'right' and self._stroke is None:
+                if self._redo():
+                    self.sound.play_navigation()
+            elif direction in ('up', 'down') and self._stroke is None:
+                step = 1 if direction == 'up' else -1
+                self.brush_index = (self.brush_index + step) % len(BRUSHES)
+                self.sound.play_navigation()
+                self._show_brush_hint()
 
-            direction, click = self.trackball.get_direction()
+            if self._hint_until is not None and time.ticks_diff(time.ticks_ms(), self._hint_until) >= 0:
+                # Devolve ao canvas as linhas cobertas pelo aviso
+                self._hint_until = None
+                self._draw_buffer_rows(HINT_Y, HINT_Y + font.HEIGHT)
 
             # Lógica para salvar e sair com um clique
             if click:
+                self._end_stroke()
                 self.sound.play_confirm()
-                if self._save_drawing():
+                saved = self._save_drawing()
+                if saved:
                     self.display.text(font, "Salvo!", 200, 230, st7789.GREEN, BG_COLOR)
                 else:
                     self.display.text(font, "Falha!", 200, 230, st7789.RED, BG_COLOR)
+                # O rascunho só é descartado depois que o desenho foi salvo
+                self._journal_close(discard=saved)
                 time.sleep_ms(1000)
                 self.mode = 'main_menu'
                 return
 
-            # Um pequeno delay para não sobrecarregar a CPU
-            time.sleep_ms(20)
+            # Dorme até a próxima amostra do touch, tecla ou giro
+            self.input.wait(20)
 
     def run(self):
         """Ponto de entrada principal do aplicativo."""
+        self.input = get_input(self.trackball, self.i2c, self.touch)
         while True:
             if self.mode == 'main_menu':
                 self.run_main_menu()
@@ -350,6 +1254,8 @@ class SketchApp:
                 self.run_file_browser()
             elif self.mode == 'drawing': # type: ignore
                 self.run_drawing_canvas()
+            elif self.mode == 'resume_drawing':
+                self.run_drawing_canvas(resume=True)
             elif self.mode == 'exit':
                 break # Sai do loop principal do app
             else: # Se o modo for desconhecido, volta ao menu
@@ -360,7 +1266,9 @@ try:
     app = SketchApp(display, touch, trackball, i2c, sound)
     app.run()
 except Exception as e:
-    _display = globals().get('display')
+    # No modo bytecode o hardware vem de builtins, não dos globais do módulo
+    try: _display = display
+    except NameError: _display = None
     if _display:
         _display.fill(st7789.RED)
         _display.text(font, "ERRO NO APP SKETCH", 10, 10, st7789.WHITE, st7789.RED)
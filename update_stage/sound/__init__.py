@@ -7,6 +7,7 @@ Permite ajustar o volume do sistema em 5 níveis.
 import time
 import st7789py as st7789
 from romfonts import vga1_8x8 as font
+from lib.events import get_input
 
 # --- Constantes ---
 BG_COLOR = st7789.color565(20, 20, 30)
@@ -19,6 +20,7 @@ class SoundApp:
         self.display = display
         self.trackball = trackball
         self.sound = sound
+        self.input = get_input(trackball, i2c, touch) # Entrada via fila de eventos (lib/events.py)
         
         # O nível de volume é carregado do SoundManager
         self.selected_level = self.sound.volume_level
@@ -56,7 +58,7 @@ class SoundApp:
             
             # Loop de entrada
             while True:
-                direction, click = self.trackball.get_direction()
+                direction, click = self.input.get_direction()
 
                 if direction:
                     old_level = self.selected_level
@@ -78,14 +80,16 @@ class SoundApp:
                     time.sleep_ms(200) # Pequena pausa para o som tocar
                     return
 
-                time.sleep_ms(50)
+                self.input.wait(50)
 
 # --- Ponto de Entrada do App ---
 try:
     app = SoundApp(display, touch, trackball, i2c, sound)
     app.run()
 except Exception as e:
-    _display = globals().get('display')
+    # No modo bytecode o hardware vem de builtins, não dos globais do módulo
+    try: _display = display
+    except NameError: _display = None
     if _display:
         _display.fill(st7789.RED)
         _display.text(font, "ERRO NO APP", 10, 10, st7789.WHITE, st7789.RED)
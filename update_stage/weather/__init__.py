@@ -3,6 +3,7 @@
 import time
 import st7789py as st7789
 from romfonts import vga1_8x8 as font
+from lib.events import get_input
 import network
 import urequests
 import json
@@ -27,6 +28,7 @@ class WeatherApp:
         self.display = display
         self.trackball = trackball
         self.sound = sound
+        self.input = get_input(trackball, i2c, touch) # Entrada via fila de eventos (lib/events.py)
         self.wlan = network.WLAN(network.STA_IF)
         
         self.weather_data = None
@@ -153,7 +155,7 @@ class WeatherApp:
 
             # Loop de entrada
             while True:
-                direction, click = self.trackball.get_direction()
+                direction, click = self.input.get_direction()
 
                 if direction in ['left', 'right']:
                     self.focused_button = 'exit' if self.focused_button == 'refresh' else 'refresh'
@@ -169,7 +171,7 @@ class WeatherApp:
                         self.sound.play_confirm()
                         return # Fecha o app
                 
-                time.sleep_ms(50)
+                self.input.wait(50)
 
 # --- Ponto de Entrada do App ---
 try:
@@ -177,7 +179,9 @@ try:
     app.run()
 except Exception as e:
     print(f"!!! ERRO ao executar Weather App: {e}")
-    _display = globals().get('display')
+    # No modo bytecode o hardware vem de builtins, não dos globais do módulo
+    try: _display = display
+    except NameError: _display = None
     if _display:
         _display.fill(st7789.RED)
         _display.text(font, "ERRO NO APP", 10, 10, st7789.WHITE, st7789.RED)
@@ -8,6 +8,7 @@ import time
 import network
 import st7789py as st7789
 from romfonts import vga1_8x8 as font
+from lib.events import get_input
 
 # --- Constantes ---
 BG_COLOR = st7789.color565(10, 20, 40)
@@ -16,7 +17,6 @@ HIGHLIGHT_COLOR = st7789.CYAN
 INPUT_BG_COLOR = st7789.color565(20, 40, 60)
 SUCCESS_COLOR = st7789.GREEN
 ERROR_COLOR = st7789.RED
-KBD_I2C_ADDR = 0x55
 # Caminho absoluto para o arquivo de senhas, não depende do módulo 'os'.
 KNOWN_NETWORKS_FILE = '/sd/app/wifi_connect/known_networks.txt'
 
@@ -25,6 +25,7 @@ class App:
         self.display = display
         self.trackball = trackball
         self.i2c = i2c
+        self.input = get_input(trackball, i2c, touch) # Entrada via fila de eventos (lib/events.py)
         self.sound = sound
         self.wlan = network.WLAN(network.STA_IF)
 
@@ -59,14 +60,8 @@ class App:
         except OSError: pass # Falha silenciosa ao salvar
 
     def get_key_simple(self):
-        """Lê uma tecla do teclado, sem importar bibliotecas externas."""
-        try:
-            key = self.i2c.readfrom(KBD_I2C_ADDR, 1)
-            if key != b'\x00':
-                return key
-        except OSError:
-            pass
-        return None
+        """Lê uma tecla do buffer do teclado."""
+        return self.input.get_key()
 
     def run(self):
         # --- ETAPA 1: Ligar WiFi e Escanear ---
@@ -115,7 +110,7 @@ class App:
             self.display.text(font, password, 15, 86, TEXT_COLOR, INPUT_BG_COLOR)
 
             key = self.get_key_simple()
-            _, click = self.trackball.get_direction()
+            _, click = self.input.get_direction()
 
             if click or (key and key == b'\r'):
                 self.sound.play_confirm()
@@ -130,7 +125,7 @@ class App:
                     except UnicodeError:
                         pass
                 self.sound.play_keypress()
-            time.sleep_ms(20)
+            self.input.wait(20)
 
     def attempt_connection(self, ssid, password):
         try:
@@ -173,7 +168,7 @@ class App:
             self.display.text(font, "[ Sair ]", 10, 225, exit_color, BG_COLOR)
 
             while True:
-                direction, click = self.trackball.get_direction()
+                direction, click = self.input.get_direction()
                 key = self.get_key_simple()
                 if direction:
                     old_index = selected_index
@@ -191,7 +186,7 @@ class App:
                     else:
                         self.sound.play_confirm()
                         return ssids[selected_index]
-                time.sleep_ms(50)
+                self.input.wait(50)
 
 # --- Ponto de Entrada do App ---
 try: # type: ignore
@@ -117,7 +117,9 @@ try: # type: ignore
     app.run()
 except Exception as e:
     print(f"!!! ERRO ao executar WiFi Status App: {e}")
-    _display = globals().get('display')
+    # No modo bytecode o hardware vem de builtins, não dos globais do módulo
+    try: _display = display
+    except NameError: _display = None
     if _display:
         _display.fill(st7789.RED)
         _display.text(font, "ERRO NO APP", 10, 10, st7789.WHITE, st7789.RED)
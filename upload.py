@@ -1,7 +1,12 @@
 # upload.py - Script para automatizar o upload de arquivos para o T-Deck
 
 import os
+import sys
+import hashlib
 import subprocess
+from tools.bundle_packer import pack_bundle
+from tools.device_sync import sync
+from tools.build import MPY_CROSS, MPY_CROSS_ARGS
 
 # --- Configuração ---
 # Caminho para a raiz do seu projeto local
@@ -11,6 +16,15 @@ LOCAL_PROJECT_PATH = '.'
 LIB_DIR = 'lib'
 UPDATE_STAGE_DIR = 'update_stage'
 
+# Cache de bytecode dos apps (ver lib/app_runner.py)
+APP_SOURCE_FILE = '__init__.py'
+BYTECODE_FILE = '__app__.mpy'
+BYTECODE_KEY_FILE = '__app__.key'
+
+# Bundle comprimido com os apps (ver lib/updater.py e tools/bundle_packer.py)
+BUNDLE_LOCAL_PATH = 'update.bundle'
+BUNDLE_REMOTE_PATH = 'update.bundle'
+
 # --- Funções ---
 
 def run_command(command, ignore_not_found=False, ignore_exists=False):
@@ -84,6 +98,55 @@ def discover_files():
     
     return items
 
+def build_app_bytecode(app_dir):
+    """
+    Compila o __init__.py do app com o mpy-cross e grava a chave do cache.
+
+    A chave tem o formato "<tamanho> <sha256> <mtime>". O mtime vai como 0,
+    pois o do PC não vale no SD; o dispositivo o preenche na primeira
+    validação. Sem mpy-cross, remove o bytecode antigo para não enviar um
+    cache desatualizado.
+    """
+    source_path = os.path.join(app_dir, APP_SOURCE_FILE)
+    mpy_path = os.path.join(app_dir, BYTECODE_FILE)
+    key_path = os.path.join(app_dir, BYTECODE_KEY_FILE)
+    if not os.path.isfile(source_path):
+        return False
+
+    try:
+        subprocess.run([MPY_CROSS, *MPY_CROSS_ARGS, '-o', mpy_path, source_path],
+                       check=True, capture_output=True, text=True)
+    except (FileNotFoundError, subprocess.CalledProcessError) as e:
+        print(f"Aviso: bytecode não gerado para '{app_dir}' ({e}). O app rodará do fonte.")
+        for path in (mpy_path, key_path):
+            if os.path.exists(path):
+                os.remove(path)
+        return False
+
+    with open(source_path, 'rb') as f:
+        data = f.read()
+    with open(key_path, 'w') as f:
+        f.write(f"{len(data)} {hashlib.sha256(data).hexdigest()} 0")
+    print(f"Bytecode gerado: {mpy_path}")
+    return True
+
+def upload_apps_bundle(app_items):
+    """
+    Empacota os apps em um único bundle comprimido e o envia com uma só
+    cópia. O dispositivo descomprime direto para /sd/app no próximo boot.
+    """
+    for item in app_items:
+        print(f"Preparando o app '{item['name']}'...")
+        # Gera o bytecode do app no PC para o dispositivo não compilar o fonte
+        build_app_bytecode(item['local_path'])
+
+    raw, packed = pack_bundle([item['local_path'] for item in app_items], BUNDLE_LOCAL_PATH)
+    print(f"Bundle gerado: {raw} -> {packed} bytes ({packed * 100 // max(raw, 1)}%)")
+    try:
+        return run_command(['mpremote', 'fs', 'cp', BUNDLE_LOCAL_PATH, f":{BUNDLE_REMOTE_PATH}"])
+    finally:
+        os.remove(BUNDLE_LOCAL_PATH)
+
 def upload_item(item):
     """Faz o upload de um único item (arquivo ou app) para o dispositivo."""
     
@@ -94,42 +157,19 @@ def upload_item(item):
         return run_command(command)
     
     elif item['type'] == 'app':
-        # Para um app, primeiro garantimos que o diretório de staging exista no dispositivo
-        print(f"Preparando para subir o app '{item['name']}'...")
-        
-        # 1. Cria o diretório de staging (agora usa ignore_exists=True para sucesso)
-        # Se o comando falhar, mas for por 'File exists', ele retorna True e continua.
-        if not run_command(['mpremote', 'fs', 'mkdir', 'update_stage'], ignore_exists=True):
-            print("Erro fatal ao tentar criar ou verificar o diretório 'update_stage' remoto.")
-            return False
-
-        # 2. Removemos a versão antiga do app no staging, se existir (ignora 'No such file')
-        run_command(['mpremote', 'fs', 'rm', '-r', f":{item['remote_path']}"], ignore_not_found=True)
-        
-        # 3. Garantimos que o diretório do app exista no dispositivo antes de copiar o conteúdo
-        run_command(['mpremote', 'fs', 'mkdir', f":{item['remote_path']}"], ignore_exists=True)
-        
-        # 4. Copiamos o CONTEÚDO da pasta do app (solução robusta sem depender do shell)
-        local_dir = item['local_path'] # Ex: 'update_stage/sketch'
-        remote_dir = f":{item['remote_path']}" # Ex: ':update_stage/sketch'
-
-        # Lista todos os itens dentro do diretório local
-        local_items_to_copy = os.listdir(local_dir)
-
-        # Constrói a lista de caminhos de ORIGEM
-        sources = [os.path.join(local_dir, f) for f in local_items_to_copy]
-
-        # O DESTINO é sempre o último argumento
-        destination = [remote_dir]
-
-        # O comando completo será: mpremote fs cp -r [sources...] [destination]
-        # Note que a flag '-r' ainda é necessária se houver subdiretórios no app!
-        command = ['mpremote', 'fs', 'cp', '-r'] + sources + destination
-
-        return run_command(command)
+        return upload_apps_bundle([item])
     
     return False
 
+def sync_items(items, dry_run=False):
+    """
+    Envia só o que mudou: compara os hashes do dispositivo com os locais e
+    faz todas as cópias e remoções em uma única sessão do mpremote.
+    """
+    app_dirs = [item['local_path'] for item in items if item['type'] == 'app']
+    return sync(app_dirs, dry_run=dry_run, bundle_path=BUNDLE_LOCAL_PATH,
+                prepare_app=build_app_bytecode)
+
 # --- Execução Principal ---
 if __name__ == "__main__":
     print("--- Script de Upload para T-Deck ---")
@@ -139,18 +179,29 @@ if __name__ == "__main__":
         print("Nenhum arquivo ou app encontrado para upload.")
         exit()
 
+    # Modo não interativo: python upload.py --sync [--dry-run]
+    if '--sync' in sys.argv[1:] or '--dry-run' in sys.argv[1:]:
+        ok = sync_items(upload_items, dry_run='--dry-run' in sys.argv[1:])
+        sys.exit(0 if ok else 1)
+
     while True:
         print("\nArquivos e Apps disponíveis para atualização:")
         for i, item in enumerate(upload_items):
             print(f"  {i+1:2d}) {item['name']}")
         print("   0) Sair")
         print("  'all') Atualizar tudo")
+        print("  'sync') Enviar só o que mudou (compara hashes com o dispositivo)")
 
         try:
-            choice_str = input("\nDigite o(s) número(s) do(s) item(ns) para atualizar (separados por espaço), ou 'all': ").strip().lower()
+            choice_str = input("\nDigite o(s) número(s) do(s) item(ns) para atualizar (separados por espaço), 'all' ou 'sync': ").strip().lower()
             
             if choice_str == '0':
                 break
+
+            if choice_str == 'sync':
+                print("-" * 30)
+                sync_items(upload_items)
+                break
             
             selected_indices = []
             if choice_str == 'all':
@@ -161,9 +212,14 @@ if __name__ == "__main__":
             success_count = 0
             fail_count = 0
             
+            selected_apps = []
             for index in selected_indices:
                 if 0 <= index < len(upload_items):
                     item_to_upload = upload_items[index]
+                    if item_to_upload['type'] == 'app':
+                        # Os apps vão juntos em um único bundle, enviado no final
+                        selected_apps.append(item_to_upload)
+                        continue
                     print("-" * 30)
                     if upload_item(item_to_upload):
                         success_count += 1
@@ -172,6 +228,13 @@ if __name__ == "__main__":
                 else:
                     print(f"Índice inválido: {index + 1}")
                     fail_count += 1
+
+            if selected_apps:
+                print("-" * 30)
+                if upload_apps_bundle(selected_apps):
+                    success_count += len(selected_apps)
+                else:
+                    fail_count += len(selected_apps)
             
             print("-" * 30)
             print(f"Resumo: {success_count} item(ns) atualizado(s) com sucesso, {fail_count} falha(s).")